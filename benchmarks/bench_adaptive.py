@@ -0,0 +1,62 @@
+"""Compare fixed delays with the adaptive host limiter against a stand-in that throttles and has missing texts.
+
+The stand-in answers 429 (with Retry-After) beyond `capacity` requests in flight, and 404 for the text of
+every fifth French work. With fixed delays, every saved work is followed by a random pause and every failure
+by an exponential backoff, 404s included. The adaptive limiter grows each host's concurrency while responses
+are healthy, halves it on 429s and holds the host until Retry-After, and gives up on 404s at once.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_adaptive [n_works] [latency_seconds] [capacity] [max_concurrency]
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bibliothecaire.downloaders import GutenbergDownloader, WikisourceDownloader
+from bibliothecaire.downloaders.rate_limit import AdaptiveLimiter
+
+from .fixture_server import start_server
+
+DELAY_RANGE = (0.5, 1.0)
+
+
+async def run(folder: str, base_url: str, max_concurrency: int, limiter) -> float:
+    downloaders = [
+        cls(folder, delay_range=DELAY_RANGE, max_concurrency=max_concurrency, host_limiter=limiter)
+        for cls in (GutenbergDownloader, WikisourceDownloader)
+    ]
+    for downloader in downloaders:
+        downloader.base_url = base_url
+    start = time.perf_counter()
+    await asyncio.gather(*(downloader.adownload("Auteur Test") for downloader in downloaders))
+    return time.perf_counter() - start
+
+
+def main():
+    n_works = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    capacity = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    max_concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    logging.getLogger("bibliothecaire").setLevel(logging.CRITICAL)
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    server, base_url = start_server(n_works=n_works, latency=latency, capacity=capacity, retry_after=1,
+                                    missing_every=5)
+    print(f"{n_works} works per source, {latency * 1000:.0f} ms latency, 429 beyond {capacity} in flight")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, limiter in [("fixed delays", None), ("adaptive", AdaptiveLimiter(max_concurrency))]:
+                elapsed = asyncio.run(run(f"{tmp}/{name}", base_url, max_concurrency, limiter))
+                saved = sum(1 for _ in Path(tmp, name).rglob("*.txt"))
+                print(f"{name:<13} {elapsed:6.2f}s  {saved} works saved")
+                if limiter:
+                    print(f"  {limiter.snapshot()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare downloading several authors one after the other with the batch scheduler of `download_many`.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_batch [n_authors] [n_works] [latency_seconds] [workers]
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+
+from bibliothecaire.downloaders import CombinedDownloader
+
+from .fixture_server import start_server
+
+DELAY_RANGE = (0.05, 0.1)
+
+
+def build(folder: str, base_url: str, **kwargs) -> CombinedDownloader:
+    downloader = CombinedDownloader(folder, delay_range=DELAY_RANGE, **kwargs)
+    downloader.gutenberg.base_url = base_url
+    downloader.wikisource.base_url = base_url
+    return downloader
+
+
+async def one_author_at_a_time(downloader: CombinedDownloader, authors) -> None:
+    for author in authors:
+        await downloader.adownload_all(author)
+
+
+def main():
+    n_authors = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    n_works = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    authors = [f"Auteur {i}" for i in range(n_authors)]
+    server, base_url = start_server(n_works=n_works, latency=latency)
+    print(f"{n_authors} authors, {n_works} works per source, {latency * 1000:.0f} ms latency")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            asyncio.run(one_author_at_a_time(build(tmp + "/serial", base_url), authors))
+            serial = time.perf_counter() - start
+            print(f"one author at a time:  {serial:6.2f}s")
+
+            report = build(tmp + "/batch", base_url).download_many(authors, max_workers=workers)
+            print(f"download_many ({workers} workers): {report['elapsed_s']:6.2f}s  "
+                  f"speedup x{serial / report['elapsed_s']:.2f}")
+
+            rates = {"gutenberg": 20.0, "wikisource": 20.0}
+            report = build(tmp + "/rated", base_url, rate_limits=rates).download_many(authors, max_workers=workers)
+            print(f"download_many at 20 req/s per source: {report['elapsed_s']:6.2f}s  "
+                  f"({report['requests']} requests, {report['works_saved']} works, {report['works_per_s']} works/s)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the Gutenberg catalog index (build, refresh) and compare catalog mode with search scraping.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_catalog [catalog_rows] [n_works] [latency_seconds]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from bibliothecaire.downloaders import GutenbergDownloader
+from bibliothecaire.downloaders.catalog import GutenbergCatalog
+
+from .fixture_server import start_server, write_catalog
+
+AUTHOR = "Auteur Test"
+
+
+def timed_download(folder: str, base_url: str, catalog=None):
+    downloader = GutenbergDownloader(folder, enable_delay=False, catalog=catalog)
+    downloader.base_url = base_url
+    requests_before = downloader.sessions.stats.snapshot()["requests"]
+    start = time.perf_counter()
+    downloader.download(AUTHOR)
+    elapsed = time.perf_counter() - start
+    return elapsed, downloader.sessions.stats.snapshot()["requests"] - requests_before, downloader.outcomes
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 75_000
+    n_works = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "pg_catalog.csv")
+        write_catalog(csv_path, [AUTHOR], n_works=n_works, filler=rows)
+        catalog = GutenbergCatalog(os.path.join(tmp, "catalog.sqlite"))
+
+        start = time.perf_counter()
+        changes = catalog.refresh(csv_path)
+        print(f"build index ({len(catalog)} books):  {time.perf_counter() - start:6.2f}s  {changes}")
+        start = time.perf_counter()
+        catalog.refresh(csv_path)
+        print(f"refresh, dump unchanged:       {time.perf_counter() - start:6.3f}s")
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write(f'{rows + 10**9},Text,2024-01-01,Nouveau,fr,"Hugo, Victor, 1802-1885",,,\n')
+        start = time.perf_counter()
+        changes = catalog.refresh(csv_path)
+        print(f"refresh, one row added:        {time.perf_counter() - start:6.2f}s  {changes}")
+        start = time.perf_counter()
+        for _ in range(1000):
+            catalog.works("Victor Hugo")
+        print(f"author lookup:                 {(time.perf_counter() - start) * 1000:6.1f} µs")
+
+        server, base_url = start_server(n_works=n_works, latency=latency)
+        try:
+            for name, mode_catalog in (("search scraping", None), ("catalog", catalog)):
+                elapsed, requests, outcomes = timed_download(os.path.join(tmp, name), base_url, mode_catalog)
+                print(f"{name:16} {elapsed:6.2f}s  {requests:3d} requests  {dict(outcomes)}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
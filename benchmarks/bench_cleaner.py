@@ -0,0 +1,43 @@
+"""Measure the throughput of `clean_up` on a synthetic Gutenberg-shaped book.
+
+With `extra_markers`, the book is also cleaned by a pipeline with that many more beginning and ending
+markers, none of which occurs in it, to show what a longer marker list costs.
+
+Usage (from the repository root): python -m benchmarks.bench_cleaner [size_in_mb] [repeats] [extra_markers]
+"""
+import sys
+import time
+
+from bibliothecaire.cleaner import CleaningPipeline, clean_up
+from bibliothecaire.cleaner.pipeline import BEGINNING_MARKERS, ENDING_MARKERS
+
+from .corpus import synthetic_book
+
+
+def measure(label: str, clean, text: str, repeats: int) -> None:
+    megabytes = len(text.encode("utf-8")) / 1_000_000
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        clean(text)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label}: {megabytes:.1f} MB in {best:.3f}s (best of {repeats}) -> {megabytes / best:.2f} MB/s")
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    extra_markers = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    text = synthetic_book(int(size_mb * 1_000_000))
+
+    measure("clean_up", clean_up, text, repeats)
+    if extra_markers:
+        pipeline = CleaningPipeline(
+            beginnings=BEGINNING_MARKERS + tuple(f"KAPITEL {i}" for i in range(extra_markers)),
+            endings=ENDING_MARKERS + tuple(f"ENDE {i}" for i in range(extra_markers)),
+        )
+        measure(f"+{extra_markers} markers", pipeline.clean, text, repeats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare the wall-clock time of the sequential and the asyncio download paths against a local stand-in.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_download [n_works] [latency_seconds] [max_concurrency]
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+
+from bibliothecaire.downloaders import GutenbergDownloader, WikisourceDownloader
+
+from .fixture_server import start_server
+
+DELAY_RANGE = (0.05, 0.1)
+
+
+def build(folder: str, base_url: str, max_concurrency: int):
+    downloaders = [
+        GutenbergDownloader(folder, delay_range=DELAY_RANGE, max_concurrency=max_concurrency),
+        WikisourceDownloader(folder, delay_range=DELAY_RANGE, max_concurrency=max_concurrency),
+    ]
+    for downloader in downloaders:
+        downloader.base_url = base_url
+    return downloaders
+
+
+async def download_concurrently(downloaders, author: str) -> None:
+    await asyncio.gather(*(downloader.adownload(author) for downloader in downloaders))
+
+
+def main():
+    n_works = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    max_concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server, base_url = start_server(n_works=n_works, latency=latency)
+    print(f"{n_works} works per source, {latency * 1000:.0f} ms latency, delay {DELAY_RANGE}s")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            for downloader in build(tmp + "/sync", base_url, max_concurrency):
+                downloader.download("Auteur Test")
+            sequential = time.perf_counter() - start
+            print(f"sequential:            {sequential:6.2f}s")
+
+            start = time.perf_counter()
+            asyncio.run(download_concurrently(build(tmp + "/async", base_url, max_concurrency), "Auteur Test"))
+            concurrent = time.perf_counter() - start
+            print(f"asyncio (max {max_concurrency}/host): {concurrent:6.2f}s  speedup x{sequential / concurrent:.2f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
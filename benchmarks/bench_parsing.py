@@ -0,0 +1,125 @@
+"""Time page parsing with each HTML backend, on full trees and on the targeted (strained) parse.
+
+Pages are synthetic, at the size and shape of the real ones, unless a folder of saved pages is given,
+e.g. a response cache (`downloads/.http_cache`): every `*.body`/`*.html` file in it is classified by content.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_parsing [pages_folder] [repeat]
+"""
+import sys
+import time
+from pathlib import Path
+
+from bibliothecaire.downloaders import GutenbergDownloader, WikisourceDownloader
+from bibliothecaire.downloaders import parsing
+
+from .corpus import synthetic_book
+
+gutenberg, wikisource = GutenbergDownloader("."), WikisourceDownloader(".")
+NAVIGATION = "".join(f'<li><a href="/wiki/Special:Page_{i}" title="Page {i}">Lien {i}</a></li>' for i in range(150))
+
+
+def gutenberg_book_page(book_id: int) -> str:
+    rows = "".join(f"<tr><th>Subject</th><td><a href='/ebooks/subject/{i}'>Sujet {i}</a></td></tr>" for i in range(10))
+    files = "".join(
+        f'<tr><td><a href="/ebooks/{book_id}.{ext}" class="link">{ext}</a></td><td>{i * 100} kB</td></tr>'
+        for i, ext in enumerate(["epub3.images", "epub.noimages", "kf8.images", "kindle.images", "txt.utf-8", "zip"])
+    )
+    return (
+        f"<html><head><title>Livre {book_id}</title></head><body><nav><ul>{NAVIGATION[:8000]}</ul></nav>"
+        '<table class="bibrec"><tr><th>Author</th><td><a href="/ebooks/author/1">Hugo, Victor</a></td></tr>'
+        f"<tr><th>Title</th><td>Livre {book_id}</td></tr><tr><th>Language</th><td>French</td></tr>{rows}</table>"
+        f'<table class="files">{files}</table><footer>{NAVIGATION[:4000]}</footer></body></html>'
+    )
+
+
+def gutenberg_search_page() -> str:
+    items = "".join(
+        f'<li class="booklink"><a class="link" href="/ebooks/{i}"><span class="cell leftcell with-cover">'
+        f'<img class="cover-thumb" src="/cache/{i}.jpg" alt=""></span><span class="cell content">'
+        f'<span class="title">Livre {i}</span><span class="subtitle">Victor Hugo</span>'
+        f'<span class="extra">{i * 37} downloads</span></span></a></li>'
+        for i in range(1, 26)
+    )
+    return f"<html><body><nav><ul>{NAVIGATION}</ul></nav><ul class='results'>{items}</ul></body></html>"
+
+
+def wikisource_page(content: str) -> str:
+    return (
+        f"<html><body><div id='mw-navigation'><ul>{NAVIGATION}</ul></div>"
+        f'<div id="content"><div class="mw-body-content"><div class="mw-parser-output">{content}</div></div></div>'
+        f"<div id='footer'><ul>{NAVIGATION}</ul></div></body></html>"
+    )
+
+
+def synthetic_pages():
+    author = "<ul>" + "".join(f'<li><a href="/wiki/Oeuvre_{i}">Œuvre {i}</a> (18{i % 100:02d})</li>' for i in range(120)) + "</ul>"
+    work = "".join(f"<p>{paragraph}</p>" for paragraph in synthetic_book(200_000, seed=1).split("\n\n"))
+    return {
+        "gutenberg search": [gutenberg_search_page()],
+        "gutenberg book": [gutenberg_book_page(i) for i in range(1, 6)],
+        "wikisource author": [wikisource_page(author)],
+        "wikisource work": [wikisource_page(work)],
+    }
+
+
+def saved_pages(folder: Path):
+    pages = {"gutenberg search": [], "gutenberg book": [], "wikisource author": [], "wikisource work": []}
+    for path in sorted(folder.rglob("*")):
+        if path.suffix not in (".body", ".html"):
+            continue
+        page = path.read_bytes().decode("utf-8", "replace")
+        if "booklink" in page:
+            pages["gutenberg search"].append(page)
+        elif "bibrec" in page:
+            pages["gutenberg book"].append(page)
+        elif "mw-parser-output" in page:
+            pages["wikisource author" if "Auteur:" in path.name or "Auteur" in page[:2000] else "wikisource work"].append(page)
+    return {kind: found for kind, found in pages.items() if found}
+
+
+def extract(kind: str, page: str, parse_only):
+    if kind == "gutenberg search":
+        return gutenberg._extract_links(parsing.parse_html(page, parse_only and parsing.SEARCH_RESULTS))
+    if kind == "gutenberg book":
+        soup = parsing.parse_html(page, parse_only and parsing.BOOK_PAGE)
+        return gutenberg._extract_metadata(soup), gutenberg._extract_text_link(soup)
+    if kind == "wikisource author":
+        return wikisource._extract_links(parsing.parse_html(page, parse_only and parsing.WIKISOURCE_CONTENT))
+    soup = parsing.parse_html(page, parse_only and parsing.WIKISOURCE_CONTENT)
+    content = soup.find("div", class_="mw-parser-output")
+    return [p.get_text().strip() for p in content.find_all("p")]
+
+
+def main():
+    folder = Path(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "-" else None
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    pages = saved_pages(folder) if folder else synthetic_pages()
+    backends = ["html.parser"] + (["lxml"] if parsing.DEFAULT_PARSER == "lxml" else [])
+    print(f"backends: {', '.join(backends)}  (lxml {'installed' if 'lxml' in backends else 'not installed'})")
+
+    for kind, documents in pages.items():
+        size = sum(len(page) for page in documents) / len(documents) / 1000
+        reference = None
+        timings = []
+        for backend in backends:
+            parsing.HTML_PARSER = backend
+            for targeted in (False, True):
+                results = [extract(kind, page, targeted) for page in documents]
+                if reference is None:
+                    reference = results
+                assert results == reference, f"{kind}: {backend} targeted={targeted} extracts something else"
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    for page in documents:
+                        extract(kind, page, targeted)
+                timings.append((f"{backend}{' + strainer' if targeted else ''}",
+                                (time.perf_counter() - start) / repeat / len(documents) * 1000))
+        baseline = timings[0][1]
+        print(f"{kind} ({len(documents)} pages, {size:.0f} kB avg)")
+        for name, ms in timings:
+            print(f"    {name:24} {ms:8.2f} ms/page  x{baseline / ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
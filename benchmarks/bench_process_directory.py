@@ -0,0 +1,41 @@
+"""Measure how `process_directory` throughput scales with the number of worker processes.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_process_directory [n_files] [file_size_kb] [max_workers]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bibliothecaire.cleaner import process_directory
+
+from .corpus import write_corpus
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    file_size = int(sys.argv[2]) * 1000 if len(sys.argv) > 2 else 200_000
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    worker_counts = sorted({1, max_workers} | {2 ** k for k in range(max_workers.bit_length()) if 2 ** k <= max_workers})
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "corpus"
+        total_bytes = write_corpus(corpus, n_files, file_size)
+        print(f"Corpus: {n_files} files, {total_bytes / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            errors = process_directory(str(corpus), str(Path(tmp) / f"out_{workers}"), workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {elapsed:7.2f}s  {n_files / elapsed:7.1f} files/s  "
+                  f"{total_bytes / 1e6 / elapsed:6.2f} MB/s  speedup x{baseline / elapsed:.2f}  errors={len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
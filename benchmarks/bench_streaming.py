@@ -0,0 +1,51 @@
+"""Time header detection, and compare the peak memory and time of `process_file` and `stream_file`, on one
+large Gutenberg-shaped file.
+
+Usage (from the repository root): python -m benchmarks.bench_streaming [size_in_mb]
+"""
+import importlib
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from .corpus import gutenberg_text
+
+# The package re-exports the `clean_up` function under the module's name.
+clean_up = importlib.import_module("bibliothecaire.cleaner.clean_up")
+
+
+def measure(label: str, run) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<13} {elapsed:6.2f}s  peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "book.txt"
+        source.write_text(gutenberg_text(int(size_mb * 1_000_000)), encoding="utf-8")
+        print(f"Input: {source.stat().st_size / 1e6:.1f} MB (timings include tracemalloc overhead)")
+
+        measure("read + bounds", lambda: clean_up.find_gutenberg_bounds(source.read_text(encoding="utf-8")))
+        measure("locate_body", lambda: clean_up.locate_body(str(source)))
+
+        in_memory, streamed = Path(tmp) / "in_memory.txt", Path(tmp) / "streamed.txt"
+        measure("process_file", lambda: in_memory.write_text(clean_up.process_file(str(source)), encoding="utf-8"))
+        measure("stream_file", lambda: clean_up.stream_file(str(source), str(streamed)))
+        same = in_memory.read_bytes() == streamed.read_bytes()
+        print(f"Outputs identical: {same}")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
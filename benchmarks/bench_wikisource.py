@@ -0,0 +1,49 @@
+"""Compare Wikisource ingestion from rendered HTML with the MediaWiki API mode on the local stand-in.
+
+Half of the works are split into chapter subpages, which only the API mode follows.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_wikisource [n_works] [latency_seconds]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bibliothecaire.downloaders import WikisourceDownloader
+
+from .fixture_server import start_server
+
+AUTHOR = "Auteur Test"
+
+
+def main():
+    n_works = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    logging.getLogger("bibliothecaire").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server, base_url = start_server(n_works=n_works, latency=latency, split_works=True)
+    print(f"{n_works} works, {latency * 1000:.0f} ms latency, even works split into chapters")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, use_api in (("html", False), ("api", True)):
+                downloader = WikisourceDownloader(os.path.join(tmp, name), enable_delay=False, use_api=use_api)
+                downloader.base_url = base_url
+                before = downloader.sessions.stats.snapshot()
+                start = time.perf_counter()
+                downloader.download(AUTHOR)
+                elapsed = time.perf_counter() - start
+                after = downloader.sessions.stats.snapshot()
+                chars = sum(len(path.read_text(encoding="utf-8")) for path in Path(tmp, name).rglob("*.txt"))
+                print(f"{name:5} {elapsed:6.2f}s  {after['requests'] - before['requests']:3d} requests  "
+                      f"{(after['bytes_decoded'] - before['bytes_decoded']) / 1e6:6.2f} MB  "
+                      f"{downloader.outcomes['saved']:3d} works saved  {chars / 1e6:5.2f} M chars")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
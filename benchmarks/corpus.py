@@ -0,0 +1,129 @@
+"""Deterministic synthetic corpus: Gutenberg- and Wikisource-shaped French books of any size.
+
+The same arguments always give the same bytes, so benchmark results stay comparable across runs.
+
+Usage (from the repository root):
+    python -m benchmarks.corpus output_dir [n_files] [file_size_kb] [wikisource_share]
+"""
+import random
+import sys
+from pathlib import Path
+
+WORDS = (
+    "le la les un une des et à de du il elle nous vous ils dit fit vit maison jardin rue nuit jour "
+    "homme femme enfant Paris Jean Valjean Cosette Marius évêque soldat porte fenêtre lumière ombre "
+    "était avait fut regarda pensa marcha silence cœur âme vie mort"
+).split()
+
+GUTENBERG_HEADER = (
+    "The Project Gutenberg eBook of Livre {i}\n\n"
+    "This ebook is for the use of anyone anywhere in the United States and most other parts of the world\n"
+    "at no cost and with almost no restrictions whatsoever.\n\n"
+    "Title: Livre {i}\n\nAuthor: Auteur Test\n\nRelease date: January 1, 2001 [eBook #{i}]\n\n"
+    "Language: French\n\n"
+    "*** START OF THE PROJECT GUTENBERG EBOOK LIVRE {i} ***\n"
+)
+# Real footers carry the full licence, about 18 KB of it.
+LICENCE = (
+    "Section 1. General Terms of Use and Redistributing Project Gutenberg electronic works. By reading or\n"
+    "using any part of this Project Gutenberg electronic work, you indicate that you have read, understand,\n"
+    "agree to and accept all the terms of this license and intellectual property (trademark/copyright)\n"
+    "agreement.\n\n"
+) * 50
+GUTENBERG_FOOTER = (
+    "\n*** END OF THE PROJECT GUTENBERG EBOOK LIVRE {i} ***\n\n"
+    "Updated editions will replace the previous one.\n\n" + LICENCE
+)
+
+WIKISOURCE_HEADER = "Livre {i}\nAuteur Test\n1862\n\nExporté de Wikisource le 1 janvier 2024\n\n"
+WIKISOURCE_FOOTER = (
+    "\n\nÀ propos de cette édition électronique\n\n"
+    "Ce livre électronique est issu de la bibliothèque numérique Wikisource.\n"
+    "Cette bibliothèque numérique multilingue, construite par des bénévoles, a pour but de mettre\n"
+    "à la disposition du plus grand nombre tout type de documents publiés.\n"
+)
+
+
+def synthetic_book(size: int, seed: int = 0) -> str:
+    """Build a deterministic book of roughly `size` characters with Gutenberg-like layout."""
+    rng = random.Random(seed)
+    parts = [
+        "The Project Gutenberg eBook of Les Misérables\n\n",
+        "Title: Les Misérables\nAuthor: Victor Hugo\nLanguage: French\n\n",
+        "Produced by Distributed Proofreaders\n\nLES MISÉRABLES\n\nTOME I\n\nLES MISÉRABLES\n\n",
+        "PRÉFACE\n\n",
+    ]
+    length = sum(map(len, parts))
+    chapter = 0
+    while length < size:
+        chapter += 1
+        parts.append(f"\n\nCHAPITRE {chapter}.\n\n")
+        for _ in range(rng.randint(5, 15)):
+            sentences = []
+            for _ in range(rng.randint(2, 8)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(4, 18))]
+                sentence = " ".join(words).capitalize() + rng.choice([".", ".", "!", "?", ";"])
+                if rng.random() < 0.1:
+                    sentence = f"« {sentence} »"
+                if rng.random() < 0.05:
+                    sentence += " [Illustration: gravure]"
+                sentences.append(sentence)
+            paragraph = " ".join(sentences)
+            # Hard-wrap paragraphs at ~70 columns like Gutenberg plain text files.
+            lines, line = [], ""
+            for word in paragraph.split(" "):
+                if len(line) + len(word) > 70:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}" if line else word
+            lines.append(line)
+            block = "\n".join(lines) + "\n\n"
+            if rng.random() < 0.05:
+                block += "* * *\n\n"
+            parts.append(block)
+            length += len(block)
+    parts.append("\n\nFIN\n\nTABLE DES MATIÈRES\n\nI. Fantine\nII. Cosette\n")
+    return "".join(parts)
+
+
+def gutenberg_text(size: int, seed: int = 0) -> str:
+    """A book as a Project Gutenberg plain text file: header, START line, text, END line and licence."""
+    return GUTENBERG_HEADER.format(i=seed) + synthetic_book(size, seed) + GUTENBERG_FOOTER.format(i=seed)
+
+
+def wikisource_text(size: int, seed: int = 0) -> str:
+    """A book as a Wikisource text export: title block, export line, text and the edition notice."""
+    return WIKISOURCE_HEADER.format(i=seed) + synthetic_book(size, seed) + WIKISOURCE_FOOTER
+
+
+def write_corpus(folder: Path, n_files: int, file_size: int, wikisource_share: float = 0.0) -> int:
+    """
+    Write `n_files` books of about `file_size` characters spread over a few author folders, laid out
+    like the downloaders' output; a `wikisource_share` of them are Wikisource exports. Returns total bytes.
+    """
+    total = 0
+    every = round(1 / wikisource_share) if wikisource_share else 0
+    for i in range(n_files):
+        author = Path(folder) / f"Auteur_{i % 10}"
+        author.mkdir(parents=True, exist_ok=True)
+        wikisource = every and i % every == every - 1
+        text = wikisource_text(file_size, seed=i) if wikisource else gutenberg_text(file_size, seed=i)
+        path = author / f"Livre_{i}.txt"
+        path.write_text(text, encoding="utf-8")
+        total += path.stat().st_size
+    return total
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    n_files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    file_size = int(sys.argv[3]) * 1000 if len(sys.argv) > 3 else 200_000
+    wikisource_share = float(sys.argv[4]) if len(sys.argv) > 4 else 0.25
+    total = write_corpus(Path(sys.argv[1]), n_files, file_size, wikisource_share)
+    print(f"Wrote {n_files} files, {total / 1e6:.1f} MB to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Local stand-in for gutenberg.org and fr.wikisource.org serving synthetic pages.
+
+Routes mirror the ones the downloaders use:
+    /ebooks/search/?query=...    search results with `li.booklink` entries
+    /ebooks/<id>                 book page with a `bibrec` table and a `.txt.utf-8` link
+    /ebooks/<id>.txt.utf-8       plain text file
+    /wiki/Auteur:<name>          author page listing works
+    /wiki/Oeuvre_<id>            work page with a `mw-parser-output` content block
+    /w/api.php                   MediaWiki API: `list=allpages` and `prop=revisions` (wikitext)
+
+Through the API, odd works transclude their text from scanned `Page:` pages. With `split_works`, even
+works are split into chapter subpages, and their rendered page only shows a table of contents.
+With `capacity`, requests beyond that many in flight get a 429 with a `Retry-After` of `retry_after`
+seconds; with `missing_every`, the text of every work whose id is a multiple of it is a 404.
+With a `log` list, the arrival time (`time.monotonic()`) and path of every request are appended to it.
+With `recordings`, a list of recorded `{"params": ..., "response": ...}` API exchanges, the API answers
+requests whose parameters match a recording with its response, and any other request with an API error.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote
+
+from .corpus import gutenberg_text, synthetic_book
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse can be observed
+    n_works = 20
+    text_size = 50_000
+    latency = 0.05
+    split_works = False
+    chapters = 4
+    capacity = 0
+    retry_after = 1
+    missing_every = 0
+    gate: Optional[threading.BoundedSemaphore] = None
+    log: Optional[List[Tuple[float, str]]] = None
+    recordings: Optional[List[dict]] = None
+
+    def do_GET(self):
+        if self.log is not None:
+            self.log.append((time.monotonic(), self.path))
+        if self.gate and not self.gate.acquire(blocking=False):
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            self._serve()
+        finally:
+            if self.gate:
+                self.gate.release()
+
+    def _serve(self):
+        time.sleep(self.latency)
+        path, _, query = self.path.partition("?")
+        if path == "/ebooks/search/":
+            first = self._first_work(parse_qs(query).get("query", [""])[0])
+            items = "".join(
+                f'<li class="booklink"><a href="/ebooks/{i}">Livre {i}</a></li>'
+                for i in range(first, first + self.n_works)
+            )
+            self._send(f"<html><body><ul>{items}</ul></body></html>")
+        elif path.startswith("/ebooks/") and path.endswith(".txt.utf-8"):
+            book_id = int(path[len("/ebooks/"):-len(".txt.utf-8")])
+            if self.missing_every and book_id % self.missing_every == 0:
+                self.send_error(404)
+                return
+            self._send(gutenberg_text(self.text_size, seed=book_id), "text/plain; charset=utf-8")
+        elif path.startswith("/ebooks/"):
+            book_id = int(path[len("/ebooks/"):])
+            language = "French" if book_id % 5 else "English"
+            self._send(
+                '<html><body><table class="bibrec">'
+                f"<tr><th>Title</th><td>Livre {book_id}</td></tr>"
+                f"<tr><th>Language</th><td>{language}</td></tr>"
+                f'</table><a href="/ebooks/{book_id}.txt.utf-8">Plain Text UTF-8</a></body></html>'
+            )
+        elif path.startswith("/wiki/Auteur:"):
+            first = self._first_work(unquote(path[len("/wiki/Auteur:"):]).replace("_", " "))
+            items = "".join(
+                f'<li><a href="/wiki/Oeuvre_{i}">Œuvre {i}</a></li>' for i in range(first, first + self.n_works)
+            )
+            self._send(f'<html><body><div class="mw-parser-output"><ul>{items}</ul></div></body></html>')
+        elif path.startswith("/wiki/Oeuvre_"):
+            book_id = int(path[len("/wiki/Oeuvre_"):])
+            if self._is_split(book_id):
+                content = "".join(
+                    f'<li><a href="/wiki/Oeuvre_{book_id}/Chapitre_{k}">Chapitre {k}</a></li>'
+                    for k in range(1, self.chapters + 1)
+                )
+                content = f"<ul>{content}</ul>"
+            else:
+                content = "".join(
+                    f"<p>{paragraph}</p>" for paragraph in synthetic_book(self.text_size, seed=book_id).split("\n\n")
+                )
+            self._send(f'<html><body><div class="mw-parser-output">{content}</div></body></html>')
+        elif path == "/w/api.php":
+            self._send(json.dumps(self._api(parse_qs(query))), "application/json; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def _is_split(self, book_id: int) -> bool:
+        return self.split_works and book_id % 2 == 0
+
+    def _chapter(self, book_id: int, k: int) -> List[str]:
+        paragraphs = synthetic_book(self.text_size, seed=book_id).split("\n\n")
+        size = -(-len(paragraphs) // self.chapters)
+        return paragraphs[(k - 1) * size:k * size]
+
+    def _wikitext(self, title: str) -> Optional[str]:
+        match = re.fullmatch(r"Oeuvre (\d+)(?:/Chapitre (\d+))?|Page:Oeuvre (\d+)\.djvu/(\d+)", title)
+        if not match:
+            return None
+        work, chapter, scan, page = match.groups()
+        if scan:
+            if int(page) > self.chapters:
+                return None
+            body = "\n\n".join(self._chapter(int(scan), int(page)))
+            return f"<noinclude>{{{{nr||{page}|}}}}</noinclude>{body}<noinclude>{{{{Références}}}}</noinclude>"
+        book_id = int(work)
+        if chapter:
+            return "\n\n".join(self._chapter(book_id, int(chapter))) if self._is_split(book_id) else None
+        if self._is_split(book_id):
+            return "\n".join(f"* [[/Chapitre {k}|Chapitre {k}]]" for k in range(1, self.chapters + 1))
+        return f'{{{{TextQuality|100%}}}}\n<pages index="Oeuvre_{book_id}.djvu" from=1 to={self.chapters} />'
+
+    def _api(self, params: Dict[str, List[str]]) -> dict:
+        if self.recordings is not None:
+            request = {name: values[0] for name, values in params.items()}
+            for exchange in self.recordings:
+                if exchange["params"] == request:
+                    return exchange["response"]
+            return {"error": {"code": "unrecorded", "info": f"no recorded response for {request}"}}
+        if params.get("list") == ["allpages"]:
+            match = re.fullmatch(r"Oeuvre (\d+)/", params.get("apprefix", [""])[0])
+            titles = []
+            if match and self._is_split(int(match.group(1))):
+                titles = [f"{match.group(0)}Chapitre {k}" for k in range(1, self.chapters + 1)]
+            return {"batchcomplete": True, "query": {"allpages": [{"ns": 0, "title": title} for title in titles]}}
+
+        requested = params.get("titles", [""])[0].split("|")
+        normalized = [{"from": title, "to": title.replace("_", " ")} for title in requested if "_" in title]
+        pages = []
+        for title in (title.replace("_", " ") for title in requested):
+            wikitext = self._wikitext(title)
+            if wikitext is None:
+                pages.append({"ns": 0, "title": title, "missing": True})
+            else:
+                pages.append({"title": title, "revisions": [{"slots": {"main": {"content": wikitext}}}]})
+        return {"batchcomplete": True, "query": {"normalized": normalized, "pages": pages}}
+
+    @staticmethod
+    def _first_work(author: str) -> int:
+        """Every author gets their own block of work ids, so several authors can be downloaded together."""
+        return 1 + (zlib.crc32(author.encode("utf-8")) % 100_000) * 1000
+
+    def _send(self, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_catalog(path: str, authors, n_works: int = 20, filler: int = 0) -> None:
+    """Write a `pg_catalog.csv` listing the works the stand-in serves for `authors`, plus `filler` unrelated rows."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Text#", "Type", "Issued", "Title", "Language", "Authors", "Subjects", "LoCC", "Bookshelves"])
+        for author in authors:
+            first = FixtureHandler._first_work(author)
+            last_name, _, first_name = author.rpartition(" ")
+            for book_id in range(first, first + n_works):
+                language = "fr" if book_id % 5 else "en"
+                writer.writerow([book_id, "Text", "2001-01-01", f"Livre {book_id}", language,
+                                 f"{first_name}, {last_name}, 1800-1880", "", "", ""])
+        for book_id in range(1, filler + 1):
+            writer.writerow([book_id, "Text", "2001-01-01", f"Ouvrage {book_id}", "fr" if book_id % 3 else "en",
+                             f"Auteur{book_id % 5000}, Prénom; Traducteur{book_id % 700}, X [Translator]", "", "", ""])
+
+
+def start_server(**settings) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in on a free local port; returns the server and its base URL."""
+    if settings.get("capacity"):
+        settings["gate"] = threading.BoundedSemaphore(settings["capacity"])
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,), settings)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -0,0 +1,287 @@
+"""Run the benchmark suite and keep a history of its results, to catch performance regressions.
+
+Each benchmark runs in a fresh interpreter, so the peak memory it reports (max RSS) is its own. Cleaning
+runs on the deterministic corpus of `benchmarks.corpus`, downloads against the local stand-in of
+`benchmarks.fixture_server`. Results are appended to a JSON Lines history with the commit, Python version
+and machine they were measured on, and compared with the previous run of the same scale on that machine.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--quick] [--only NAME ...] [--history PATH] [--max-regression PCT]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory
+    resource = None
+
+from bibliothecaire.cleaner import clean_up, process_directory
+from bibliothecaire.cleaner.clean_up import stream_file
+from bibliothecaire.cleaner.index import SearchIndex, index_folder
+from bibliothecaire.cleaner.quality import batch_stats
+from bibliothecaire.cleaner.sink import CleaningSink
+from bibliothecaire.downloaders import CombinedDownloader, GutenbergDownloader, WikisourceDownloader
+
+from .corpus import gutenberg_text, write_corpus
+from .fixture_server import start_server
+
+HISTORY = Path(".benchmarks") / "history.jsonl"
+QUICK_SCALE = 0.25
+AUTHOR = "Auteur Test"
+
+# Each benchmark takes a scale factor (1 for a full run) and returns its throughput metrics,
+# named <unit>_per_s; the runner adds its wall time and peak memory.
+BENCHMARKS: Dict[str, Callable[[float], Dict[str, float]]] = {}
+
+
+def benchmark(function: Callable[[float], Dict[str, float]]) -> Callable[[float], Dict[str, float]]:
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+@benchmark
+def clean_text(scale: float) -> Dict[str, float]:
+    text = gutenberg_text(int(4_000_000 * scale))
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        clean_up(text)
+        timings.append(time.perf_counter() - start)
+    return {"mb_per_s": len(text.encode("utf-8")) / 1e6 / min(timings)}
+
+
+@benchmark
+def clean_directory(scale: float) -> Dict[str, float]:
+    n_files = max(4, int(40 * scale))
+    with tempfile.TemporaryDirectory() as tmp:
+        total_bytes = write_corpus(Path(tmp) / "corpus", n_files, 100_000, wikisource_share=0.25)
+        start = time.perf_counter()
+        process_directory(os.path.join(tmp, "corpus"), os.path.join(tmp, "out"), incremental=False)
+        elapsed = time.perf_counter() - start
+    return {"mb_per_s": total_bytes / 1e6 / elapsed, "files_per_s": n_files / elapsed}
+
+
+@benchmark
+def stream_large_file(scale: float) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "book.txt"
+        source.write_text(gutenberg_text(int(16_000_000 * scale)), encoding="utf-8")
+        start = time.perf_counter()
+        stream_file(str(source), os.path.join(tmp, "out.txt"))
+        elapsed = time.perf_counter() - start
+        return {"mb_per_s": source.stat().st_size / 1e6 / elapsed}
+
+
+@benchmark
+def quality_stats(scale: float) -> Dict[str, float]:
+    texts = [clean_up(gutenberg_text(int(200_000 * scale), seed=i)).encode("utf-8") for i in range(20)]
+    start = time.perf_counter()
+    batch_stats(texts)
+    return {"mb_per_s": sum(map(len, texts)) / 1e6 / (time.perf_counter() - start)}
+
+
+@benchmark
+def search_index(scale: float) -> Dict[str, float]:
+    n_files = max(4, int(40 * scale))
+    with tempfile.TemporaryDirectory() as tmp:
+        total_bytes = write_corpus(Path(tmp) / "corpus", n_files, 100_000, wikisource_share=0.25)
+        start = time.perf_counter()
+        index_dir = index_folder(os.path.join(tmp, "corpus"))
+        elapsed = time.perf_counter() - start
+        with SearchIndex(index_dir) as index:
+            queries = [index.term, index.phrase, index.prefix]
+            timings = {query.__name__: [] for query in queries}
+            for _ in range(5):
+                for query, text in zip(queries, ["lumière", "de la", "fen"]):
+                    start = time.perf_counter()
+                    query(text)
+                    timings[query.__name__].append((time.perf_counter() - start) * 1000)
+    return {"mb_per_s": total_bytes / 1e6 / elapsed,
+            **{f"{name}_ms": statistics.median(values) for name, values in timings.items()}}
+
+
+def _startup_ms(command: List[str], runs: int) -> float:
+    """Median wall time of a command in a fresh interpreter, in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@benchmark
+def cold_start(scale: float) -> Dict[str, float]:
+    runs = max(3, int(10 * scale))
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp) / "corpus", 1, 10_000)
+        return {
+            "python_ms": _startup_ms([sys.executable, "-c", "pass"], runs),
+            "import_ms": _startup_ms([sys.executable, "-c", "import bibliothecaire"], runs),
+            "clean_ms": _startup_ms([sys.executable, "-m", "bibliothecaire", "clean", "--force",
+                                     os.path.join(tmp, "corpus"), os.path.join(tmp, "out")], runs),
+            "download_ms": _startup_ms([sys.executable, "-m", "bibliothecaire", "download", "--help"], runs),
+        }
+
+
+def _download(downloader_class, scale: float, **kwargs) -> Dict[str, float]:
+    server, base_url = start_server(n_works=max(5, int(20 * scale)), latency=0.005)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = downloader_class(tmp, enable_delay=False, **kwargs)
+            downloader.base_url = base_url
+            start = time.perf_counter()
+            downloader.download(AUTHOR)
+            elapsed = time.perf_counter() - start
+            works = sum(1 for _ in Path(tmp).rglob("*.txt"))
+            mb = sum(path.stat().st_size for path in Path(tmp).rglob("*.txt")) / 1e6
+    finally:
+        server.shutdown()
+    return {"works_per_s": works / elapsed, "mb_per_s": mb / elapsed}
+
+
+@benchmark
+def download_gutenberg(scale: float) -> Dict[str, float]:
+    return _download(GutenbergDownloader, scale)
+
+
+@benchmark
+def download_wikisource(scale: float) -> Dict[str, float]:
+    return _download(WikisourceDownloader, scale)
+
+
+@benchmark
+def download_and_clean(scale: float) -> Dict[str, float]:
+    server, base_url = start_server(n_works=max(5, int(20 * scale)), latency=0.005)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            downloads, cleaned = os.path.join(tmp, "downloads"), os.path.join(tmp, "cleaned")
+            start = time.perf_counter()
+            with CleaningSink(downloads, cleaned, workers=2) as sink:
+                downloader = CombinedDownloader(downloads, enable_delay=False, sink=sink)
+                downloader.gutenberg.base_url = downloader.wikisource.base_url = base_url
+                downloader.download_many([AUTHOR])
+            elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    return {"works_per_s": sink.cleaned / elapsed}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)  # bytes on macOS, KiB elsewhere
+
+
+def _run(name: str, scale: float) -> Dict[str, float]:
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger("bibliothecaire").setLevel(logging.ERROR)
+    start = time.perf_counter()
+    metrics = BENCHMARKS[name](scale)
+    metrics["seconds"] = time.perf_counter() - start
+    metrics["peak_rss_mb"] = _peak_rss_mb()
+    return metrics
+
+
+def run_benchmark(name: str, scale: float) -> Dict[str, float]:
+    """Run one benchmark in a fresh interpreter and return its metrics."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run, name, scale).result()
+
+
+def _commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.stdout.strip() + ("+" if dirty.stdout.strip() else "")
+
+
+def load_history(path: Path) -> List[dict]:
+    if not path.is_file():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(results: Dict[str, dict], previous: Optional[dict], max_regression: Optional[float]) -> List[str]:
+    """Print the results next to the previous run's; return the regressions beyond `max_regression` percent."""
+    regressions = []
+    print(f"{'benchmark':<20} {'metric':<12} {'value':>10}  {'change':>8}")
+    for name, metrics in results.items():
+        before = (previous or {}).get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            if value is None or metric == "seconds":
+                continue
+            change = ""
+            if before.get(metric):
+                percent = (value - before[metric]) / before[metric] * 100
+                change = f"{percent:+7.1f}%"
+                # Throughput should not drop, memory should not grow.
+                worse = -percent if metric.endswith("_per_s") else percent
+                if max_regression is not None and worse > max_regression:
+                    regressions.append(f"{name} {metric}: {before[metric]:.2f} -> {value:.2f} ({percent:+.1f}%)")
+            print(f"{name:<20} {metric:<12} {value:10.2f}  {change:>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and record its results.")
+    parser.add_argument("--quick", action="store_true", help=f"run at {QUICK_SCALE:g} of the full sizes")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), metavar="NAME",
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--history", type=Path, default=HISTORY, help=f"results history (default: {HISTORY})")
+    parser.add_argument("--max-regression", type=float, metavar="PCT",
+                        help="exit with an error if a throughput drops or a peak memory grows by more than PCT%%")
+    parser.add_argument("--no-record", action="store_true", help="do not append the results to the history")
+    args = parser.parse_args()
+
+    scale = QUICK_SCALE if args.quick else 1.0
+    machine = f"{platform.node()}/{platform.machine()}/{os.cpu_count()}cpu"
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = run_benchmark(name, scale)
+
+    history = load_history(args.history)
+    previous = next((run for run in reversed(history) if run["machine"] == machine and run["scale"] == scale), None)
+    if previous:
+        print(f"compared with {previous['commit']} ({previous['timestamp']})")
+    regressions = compare(results, previous, args.max_regression)
+
+    if not args.no_record:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "machine": machine,
+            "scale": scale,
+            "results": results,
+        }
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    if regressions:
+        print("Regressions:\n" + "\n".join(f"  {line}" for line in regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,40 @@
-from .downloaders import GutenbergDownloader, WikisourceDownloader, CombinedDownloader
-from .cleaner import clean_up, process_file, process_directory
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# Public names and the subpackage each comes from. They are imported on first use (PEP 562), so that
+# cleaning never loads the network stack (requests, bs4) the downloaders need.
+_EXPORTS = {
+    "GutenbergDownloader": ".downloaders",
+    "WikisourceDownloader": ".downloaders",
+    "CombinedDownloader": ".downloaders",
+    "clean_up": ".cleaner",
+    "process_file": ".cleaner",
+    "process_text": ".cleaner",
+    "process_directory": ".cleaner",
+    "CleaningPipeline": ".cleaner",
+    "RuleProfile": ".cleaner",
+    "PackedCorpus": ".cleaner",
+    "find_duplicates": ".cleaner",
+    "CleaningSink": ".cleaner",
+    "SearchIndex": ".cleaner",
+    "index_folder": ".cleaner",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .downloaders import GutenbergDownloader, WikisourceDownloader, CombinedDownloader
+    from .cleaner import (clean_up, process_file, process_text, process_directory, CleaningPipeline, RuleProfile,
+                          PackedCorpus, find_duplicates, CleaningSink, SearchIndex, index_folder)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
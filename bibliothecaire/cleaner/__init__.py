@@ -1 +1,7 @@
-from .clean_up import clean_up, process_file, process_directory
\ No newline at end of file
+from .clean_up import clean_up, process_file, process_text, process_directory
+from .dedup import find_duplicates
+from .index import SearchIndex, index_folder
+from .packed import PackedCorpus
+from .pipeline import CleaningPipeline
+from .profiling import RuleProfile
+from .sink import CleaningSink
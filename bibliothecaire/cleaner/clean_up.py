@@ -1,7 +1,49 @@
+import argparse
+import logging
+import mmap
 import os
 import re
+import shutil
+import signal
 import sys
-from typing import Tuple
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, TextIO, Tuple
+
+from .. import metrics
+from .dedup import CACHE_NAME, KEEP_POLICIES, THRESHOLD, Document, find_duplicates
+from .index import INDEX_DIR, index_folder
+from .manifest import Manifest, file_digest
+from .packed import SHARD_SIZE, ShardWriter
+from .pipeline import CleaningPipeline
+from .profiling import RuleProfile
+from .quality import REJECTED_DIR, STATS_NAME, assess, load_thresholds
+from .streaming import (
+    CHUNK_SIZE, Source, StreamingCleaner, joined_lines, read_text, strip_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+GUTENBERG_MARKER = "START OF THE PROJECT GUTENBERG"
+GUTENBERG_START = re.compile(r"\*\*\* START OF THE PROJECT GUTENBERG EBOOK .* \*\*\*")
+GUTENBERG_END = re.compile(r"\*\*\* END OF THE PROJECT GUTENBERG EBOOK .* \*\*\*")
+WIKISOURCE_MARKER = "Exporté de Wikisource"
+# Names of the folders the downloaders keep each source's texts in.
+SOURCES = ("gutenberg", "wikisource")
+
+# Files are searched for these only within their first and last HEADER_WINDOW bytes, which hold the
+# Gutenberg licence header and footer and the Wikisource export header many times over.
+HEADER_WINDOW = 128 * 1024
+GUTENBERG_START_BYTES = re.compile(rb"\*\*\* START OF THE PROJECT GUTENBERG EBOOK [^\r\n]* \*\*\*")
+GUTENBERG_END_BYTES = re.compile(rb"\*\*\* END OF THE PROJECT GUTENBERG EBOOK [^\r\n]* \*\*\*")
+# What `str.splitlines` treats as a line boundary, encoded in UTF-8.
+LINE_BOUNDARY_BYTES = re.compile(rb"\r\n|[\n\r\x0b\x0c\x1c-\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+LINE_SEPARATORS = {ord(char): "\n" for char in "\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"}
+
+# Files larger than this are cleaned by `stream_file` instead of being read whole.
+STREAM_ABOVE = 32 * 1024 * 1024
 
 # --- Exception classes ---
 class UnGutenbergError(Exception):
@@ -12,23 +54,27 @@ class UnWikisourceError(Exception):
     """Raised when there is an error processing the Wikisource text."""
     pass
 
+class CleaningTimeout(Exception):
+    """Raised when cleaning a file takes longer than its time limit."""
+    pass
+
 # --- Gutenberg cleaning functions ---
 def find_gutenberg_bounds(text: str) -> Tuple[int, int]:
     """Find start and end boundaries in a Gutenberg text."""
-    start_pattern = r"\*\*\* START OF THE PROJECT GUTENBERG EBOOK .* \*\*\*"
-    end_pattern = r"\*\*\* END OF THE PROJECT GUTENBERG EBOOK .* \*\*\*"
-
-    start_match = re.search(start_pattern, text)
-    end_match = re.search(end_pattern, text)
+    start_match = GUTENBERG_START.search(text)
+    end_match = GUTENBERG_END.search(text)
+    return _check_gutenberg_bounds(
+        start_match.end() if start_match else None, end_match.start() if end_match else None
+    )
 
-    if not start_match:
+def _check_gutenberg_bounds(start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+    if start is None:
         raise UnGutenbergError("Start pattern not found in the provided text")
-    if not end_match:
+    if end is None:
         raise UnGutenbergError("End pattern not found in the provided text")
-    if end_match.start() <= start_match.end():
+    if end <= start:
         raise UnGutenbergError("End position is before the start position, invalid text boundaries.")
-
-    return start_match.end(), end_match.start()
+    return start, end
 
 def un_gutenberg(text: str) -> str:
     """Remove the Project Gutenberg intro and outro."""
@@ -45,12 +91,12 @@ def un_wikisource(text: str) -> str:
     Assumes that the text contains a line with 'Exporté de Wikisource' and removes everything before
     the first non-empty line following that marker.
     """
-    if "Exporté de Wikisource" not in text:
+    if WIKISOURCE_MARKER not in text:
         raise UnWikisourceError("Wikisource marker not found in text")
     lines = text.splitlines()
     start_idx = 0
     for i, line in enumerate(lines):
-        if "Exporté de Wikisource" in line:
+        if WIKISOURCE_MARKER in line:
             start_idx = i + 1
             break
     while start_idx < len(lines) and not lines[start_idx].strip():
@@ -61,197 +107,598 @@ def un_wikisource(text: str) -> str:
     return cleaned_text
 
 # --- Further cleaning function ---
-def clean_up(text: str) -> str:
+_default_pipeline = CleaningPipeline()
+
+
+def clean_up(text: str, profile: Optional[RuleProfile] = None) -> str:
     """Clean up and standardize the text by removing extraneous markers and metadata.
     - Beginning markers are searched for in the first 20% of the text.
     - Ending markers are searched for in the last 20% of the text.
     - A header block produced by publication metadata is removed.
     - French chapter headings using ordinal words (e.g. 'Chapitre Deuxième') are removed.
     - The markers 'prologue' and 'épilogue' are removed entirely.
-    """
-    total_length = len(text)
-
-    # --- Revised Header Block Removal ---
-    header_indicators = re.compile(r"(Produced by|Translated by)", re.IGNORECASE)
-    first_20 = text[:int(total_length * 0.2)]
-    if header_indicators.search(first_20):
-        lines = text.splitlines()
-        uppercase_occurrences = {}
-        for i, line in enumerate(lines):
-            cline = line.strip()
-            if cline and cline.isupper() and 3 < len(cline) < 100:
-                uppercase_occurrences.setdefault(cline, []).append(i)
-        candidate_index = None
-        for candidate, indices in uppercase_occurrences.items():
-            if len(indices) >= 2:
-                candidate_index = indices[1]  # second occurrence
-                break
-        if candidate_index is not None:
-            text = "\n".join(lines[candidate_index+1:])
-
-    # --- Remove common metadata lines ---
-    metadata_patterns = [
-        r"^Title:.*$", r"^Author:.*$", r"^Release date:.*$", r"^Language:.*$",
-        r"^Original publication:.*$"
-    ]
-    for pattern in metadata_patterns:
-        text = re.sub(pattern, "", text, flags=re.MULTILINE | re.IGNORECASE)
-
-    total_length = len(text)
-
-    # --- Remove word joiner characters ---
-    text = text.replace('\u2060', '')
-
-    # --- Remove beginning markers (search in first 20% of the text) ---
-    first_20 = text[:int(total_length * 0.2)]
-    beginnings = [
-        # English markers
-        "PART ONE", "PART 1", "PART I",
-        "CHAPTER", "CHAPTER I", "CHAPTER 1", "Volume", "VOL.", "BOOK ONE", "BOOK I",
-        "DEDICATION", "INTRODUCTION", "PREFACE",
-        # French markers
-        "PREMIÈRE PARTIE", "PARTIE 1", "PARTIE I",
-        "CHAPITRE", "CHAPITRE I", "CHAPITRE 1", "CHAPITRE PREMIER",
-        "TOME", "DEDICACE", "PRÉFACE"
-    ]
-    for marker in beginnings:
-        pattern = r"(^|\n)" + re.escape(marker) + r"(?=[\n\.:])"
-        match = re.search(pattern, first_20, flags=re.IGNORECASE)
-        if match:
-            text = text[match.end():]
-            break
-
-    # --- Remove ending markers (search in last 20% of the text) ---
-    last_20 = text[int(total_length * 0.8):]
-    endings = [
-        "NOTES", "NOTE", "TABLE OF CONTENTS", "INDEX", "END OF THE TEXT",
-        "ADDENDUM", "AFTERWORD", "APPENDIX", "FINALE", "THE END",
-        # French endings
-        "NOTES", "TABLE DES MATIÈRES", "INDEX", "ANNEXE", "FIN", "À propos de cette édition électronique"
-    ]
-    for marker in endings:
-        if marker.strip().upper() == "FIN":
-            pattern = r"(?i)(?:^|\n)" + re.escape(marker) + r"\b.*"
-        else:
-            pattern = r"(?i)(?:^|\n)" + re.escape(marker) + r"(?=[\n\.:])"
-        matches = list(re.finditer(pattern, last_20))
-        if matches:
-            last_match = matches[-1]
-            cutoff_index = int(total_length * 0.8) + last_match.start()
-            text = text[:cutoff_index]
-            break
-
-    # --- Remove junk characters and unwanted patterns ---
-    text = re.sub(r"_", "", text)
-    text = re.sub(r"[─|—]+\n", "", text)
-    text = re.sub(r"\[.*?\]", "", text)
-    text = re.sub(r"\.\s*\.", ".", text)
-    text = re.sub(r"\*\s*\*", "", text)
-    text = re.sub(r"\[Illustration:\s*.*?\s*]", "", text, flags=re.DOTALL)
-    text = re.sub(r"\[Footnotes:\s*.*?\s*]", "", text, flags=re.DOTALL)
-    text = re.sub(r"\.\s{2,}\d+\n", ".\n", text)
-
-    # --- Remove isolated chapter/section headings ---
-    text = re.sub(
-        r"^\s*(?:(CHAPTER|BOOK|VOLUME|LIVRE|LETTER|CHAPITRE|TOME)\s+[IVXLCDM1234567890]+\.?|\d+?)\s*[:\.\s-]*(.*)\s*$",
-        "",
-        text, flags=re.MULTILINE | re.IGNORECASE
-    )
-    text = re.sub(
-        r"(?mi)^\s*(chapitre|tome|livre|volume)\s+(premier|première|deuxième|troisième|quatrième|cinquième|sixième|septième|huitième|neuvième|dixième|onzième|douzième|treizième|quatorzième|quinzième|seizième|dix[-\s]?septième|dix[-\s]?huitième|dix[-\s]?neuvième|vingtième)\s*[:\.\s-]*(.*)$",
-        "",
-        text
-    )
-    text = re.sub(r"^\s*[IVXLCDM]+\.?\s*$", "", text, flags=re.MULTILINE)
-    text = re.sub(r"^\s*\d+\.?\s*$", "", text, flags=re.MULTILINE)
-
-    # --- Standardize punctuation ---
-    text = re.sub(r"--", "—", text)
-    text = re.sub(r"(^|\s)([-–—])(\s)", r"\1—\3", text)
-    text = text.replace("—", "— ")
-    text = text.replace('«', '"').replace('»', '"')
-    text = text.replace('“', '"').replace('”', '"')
-    text = re.sub(r'"(.*?)"', lambda m: m.group(0).replace("\n", ""), text)
-
-    # --- Standardize line breaks and whitespace ---
-    text = re.sub(r"(?<![.!?])\n(?!\n)", " ", text)
-    lines = text.splitlines()
-    lines = [re.sub(r"\s+", " ", line.strip()) for line in lines if line.strip()]
-    text = "\n".join(lines)
-
-    # --- Remove chapter markers (e.g., "Chapter I:" or "Chapitre II:") and keep trailing text ---
-    text = re.sub(r"(?mi)^(?:chapter|chapitre)\s+(?:[ivxlcdm]+|premier)[:\.\s-]+(.*)$", r"\1", text)
 
-    # --- Remove any lines that consist solely of asterisks and whitespace ---
-    text = re.sub(r"(?m)^\s*\*[\s\*]*\s*$\n?", "", text)
-
-    # --- Remove lines that consist solely of punctuation (e.g. a lone period) ---
-    text = re.sub(r"(?m)^\s*[\.,:;\-]+\s*$\n?", "", text)
-
-    return text.strip()
+    The rules live in a precompiled `CleaningPipeline`; build one yourself to use other markers.
+    Pass a `RuleProfile` to record the time, lengths and match count of each rule.
+    """
+    return _default_pipeline.clean(text, profile)
 
 # --- Main processing functions ---
-def process_file(filepath: str) -> str:
-    """Read, process, and clean a file."""
+def locate_body(filepath: str) -> Tuple[Optional[str], int, Optional[int]]:
+    """
+    Find the text of a Gutenberg or Wikisource file without reading it whole.
+
+    The file is memory-mapped and only its first and last HEADER_WINDOW bytes are searched, so the
+    cost does not grow with the size of the book. Returns the source ("Gutenberg", "Wikisource" or None)
+    and the byte range of what follows its header: up to the last Gutenberg END line of the tail, or to
+    the end of the file. Raises UnGutenbergError for a Gutenberg file whose bounds cannot be found.
+    """
+    if not os.path.getsize(filepath):
+        return None, 0, None
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _locate(mm)
+
+def _locate(data) -> Tuple[Optional[str], int, Optional[int]]:
+    """`locate_body` on the UTF-8 bytes of a text (bytes or mmap)."""
+    size = len(data)
+    head = min(size, HEADER_WINDOW)
+    if data.find(GUTENBERG_MARKER.encode(), 0, head) != -1:
+        start_match = GUTENBERG_START_BYTES.search(data, 0, head)
+        end_match = None
+        for end_match in GUTENBERG_END_BYTES.finditer(data, max(0, size - HEADER_WINDOW)):
+            pass
+        start, end = _check_gutenberg_bounds(
+            start_match.end() if start_match else None, end_match.start() if end_match else None
+        )
+        return "Gutenberg", start, end
+    marker = data.find(WIKISOURCE_MARKER.encode(), 0, head)
+    if marker != -1:
+        line_end = LINE_BOUNDARY_BYTES.search(data, marker)
+        return "Wikisource", line_end.end() if line_end else size, None
+    return None, 0, None
+
+def detect_source(filepath: str) -> Optional[str]:
+    """"gutenberg" or "wikisource" if the file has the header of one of them (see `locate_body`), else None."""
+    try:
+        source = locate_body(filepath)[0]
+    except UnGutenbergError:
+        source = "Gutenberg"
+    return source.lower() if source else None
+
+def source_of(rel_path: str, filepath: str) -> Optional[str]:
+    """The source of a text: the source folder in its path, else the one its header names."""
+    folders = os.path.normpath(rel_path).split(os.sep)[:-1]
+    return next((folder for folder in folders if folder in SOURCES), None) or detect_source(filepath)
+
+def _read_range(filepath: str, start: int, end: Optional[int]) -> str:
+    """Decode bytes `start` to `end` of a file, with the newline translation of `open().read()`."""
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        data = f.read() if end is None else f.read(end - start)
+    return _decode(data)
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+def _empty_body_error(source: str) -> Exception:
+    if source == "Gutenberg":
+        return UnGutenbergError("Text extraction failed, resulting in an empty string.")
+    return UnWikisourceError("Text extraction failed after Wikisource header removal.")
+
+def process_file(filepath: str, profile: Optional[RuleProfile] = None) -> str:
+    """Read, process, and clean a file. Only the text between the source's header and footer is decoded."""
     if not os.path.isfile(filepath):
         raise FileNotFoundError(filepath)
+    return _process(os.path.basename(filepath), lambda: locate_body(filepath),
+                    lambda start, end: _read_range(filepath, start, end), profile)
 
-    with open(filepath, "r", encoding='utf-8') as f:
-        text = f.read()
+def process_text(text: str, name: str = "text", profile: Optional[RuleProfile] = None) -> str:
+    """
+    `process_file` for a text already in memory, such as one just downloaded: the same header and
+    footer detection and cleaning, as if the text had been saved to a file and read back.
+    """
+    data = text.encode("utf-8")
+    return _process(name, lambda: _locate(data), lambda start, end: _decode(data[start:end]), profile)
 
-    # Decide which header removal process to use
-    cleaned = text
+def _process(name: str, locate: Callable[[], Tuple[Optional[str], int, Optional[int]]],
+             read: Callable[[int, Optional[int]], str], profile: Optional[RuleProfile]) -> str:
+    text = None
     try:
-        if "START OF THE PROJECT GUTENBERG" in text:
-            print(f"Processing Gutenberg file: {os.path.basename(filepath)}")
-            cleaned = un_gutenberg(text)
-        elif "Exporté de Wikisource" in text:
-            print(f"Processing Wikisource file: {os.path.basename(filepath)}")
-            cleaned = un_wikisource(text)
+        source, start, end = locate()
+        if source:
+            logger.debug(f"Processing {source} file: {name}")
+            text = read(start, end)
+            if source == "Wikisource":
+                # un_wikisource joins the remaining lines with "\n"
+                text = text.translate(LINE_SEPARATORS)
+            text = text.strip()
+            if not text:
+                raise _empty_body_error(source)
         else:
-            print(f"No specific header found in {os.path.basename(filepath)}. Proceeding with generic cleaning.")
+            logger.debug(f"No specific header found in {name}. Proceeding with generic cleaning.")
     except (UnGutenbergError, UnWikisourceError) as e:
-        print(f"Warning: {e}. Proceeding with the original text.")
+        logger.warning(f"{name}: {e}. Proceeding with the original text.")
+        text = None
+    if text is None:
+        text = read(0, None)
+
+    return clean_up(text, profile)
 
-    cleaned = clean_up(cleaned)
-    return cleaned
+def _streamed_body(filepath: str) -> Source:
+    """What `process_file` passes to `clean_up`, as a source for `StreamingCleaner` that re-reads the file on demand."""
+    name = os.path.basename(filepath)
+    try:
+        source, start, end = locate_body(filepath)
+        if source:
+            logger.debug(f"Processing {source} file: {name}")
+            if source == "Gutenberg":
+                def body() -> Iterator[str]:
+                    return strip_stream(read_text(filepath, start=start, end=end))
+            else:
+                def body() -> Iterator[str]:
+                    return strip_stream(joined_lines(read_text(filepath, start=start), 0))
+            if not any(body()):
+                raise _empty_body_error(source)
+            return body
+        logger.debug(f"No specific header found in {name}. Proceeding with generic cleaning.")
+    except (UnGutenbergError, UnWikisourceError) as e:
+        logger.warning(f"{name}: {e}. Proceeding with the original text.")
+    return lambda: read_text(filepath)
 
-def process_directory(input_dir: str, output_dir: str) -> None:
+@contextmanager
+def _atomic_output(output_file: str) -> Iterator[TextIO]:
     """
-    Recursively process all .txt files in input_dir.
-    The cleaned text for each file is written to output_dir, preserving the relative directory structure.
+    Open a temporary file next to `output_file` for writing text, and move it into place only once it is
+    completely written. An error midway (a timeout included) leaves no partial output behind.
     """
-    if not os.path.isdir(input_dir):
-        raise NotADirectoryError(f"{input_dir} is not a directory.")
+    directory, name = os.path.split(output_file)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f_out:
+            yield f_out
+        os.replace(tmp_path, output_file)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def stream_file(filepath: str, output_file: str, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Clean a file like `process_file` and write the result to `output_file`, without ever holding the
+    whole text: memory stays bounded by a few chunks of `chunk_size` characters (see `StreamingCleaner`).
+    The output is replaced atomically, so it is never left half written.
+    """
+    if not os.path.isfile(filepath):
+        raise FileNotFoundError(filepath)
+    source = _streamed_body(filepath)
+    with _atomic_output(output_file) as f_out:
+        StreamingCleaner(_default_pipeline, chunk_size).clean(source, f_out.write)
 
-    for root, _, files in os.walk(input_dir):
+def _collect_tasks(input_dir: str, output_dir: str, staging: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    List (input, output) path pairs for every .txt file, creating the output directories.
+    With a `staging` folder, outputs are numbered files there instead of a mirror of the input tree.
+    """
+    tasks = []
+    for root, dirs, files in os.walk(input_dir):
+        # Skip hidden folders such as the downloaders' response cache
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        texts = sorted(filename for filename in files if filename.lower().endswith(".txt"))
+        if not texts:
+            continue
+        if staging:
+            for filename in texts:
+                tasks.append((os.path.join(root, filename), os.path.join(staging, f"{len(tasks)}.txt")))
+            continue
         # Calculate relative path from the input directory
         rel_path = os.path.relpath(root, input_dir)
         # Create the corresponding output directory
         target_dir = os.path.join(output_dir, rel_path)
         os.makedirs(target_dir, exist_ok=True)
 
-        for filename in files:
-            if filename.lower().endswith(".txt"):
-                input_file = os.path.join(root, filename)
-                try:
-                    cleaned_text = process_file(input_file)
-                    output_file = os.path.join(target_dir, filename)
-                    with open(output_file, 'w', encoding='utf-8') as f_out:
-                        f_out.write(cleaned_text)
-                    print(f"Cleaned file saved to: {output_file}")
-                except Exception as e:
-                    print(f"Error processing {input_file}: {e}")
+        for filename in texts:
+            tasks.append((os.path.join(root, filename), os.path.join(target_dir, filename)))
+    return tasks
 
+@contextmanager
+def _time_limit(seconds: Optional[float]):
+    """
+    Raise CleaningTimeout in the block once `seconds` have passed. Regex matching checks for signals,
+    so this also stops a rule stuck in catastrophic backtracking. Needs SIGALRM and the main thread
+    (as in pool workers); elsewhere the block runs without a limit.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python cleaner.py <input_dir>")
-        sys.exit(1)
+    def expire(signum, frame):
+        raise CleaningTimeout(f"cleaning took longer than {seconds:g}s")
 
-    input_directory = sys.argv[1]
-    output_directory = sys.argv[2]
-    process_directory(input_directory, output_directory)
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+class CleanResult(NamedTuple):
+    digest: Optional[str]
+    cleaned: bool
+    error: Optional[str]
+    timed_out: bool
+    profile: Optional[RuleProfile]
+
+def _clean_to_file(task: Tuple[str, str, Optional[str], Optional[int], Optional[float], bool]) -> CleanResult:
+    """Clean one file and write the result.
+
+    If the input still hashes to `known_digest`, the existing output is kept and the file is not cleaned.
+    Inputs larger than `stream_above` bytes are cleaned with `stream_file`. Cleaning is stopped after
+    `timeout` seconds. Outputs are replaced atomically, and the output of a file that failed or timed out
+    is removed. With `profiling`, the rules are timed in a `RuleProfile` returned with the result.
+    Errors are returned instead of raised, so that one bad file does not abort a whole worker chunk.
+    """
+    input_file, output_file, known_digest, stream_above, timeout, profiling = task
+    profile = RuleProfile() if profiling else None
+    digest = None
+    try:
+        digest = file_digest(input_file)
+        if digest == known_digest:
+            return CleanResult(digest, False, None, False, None)
+        streamed = stream_above is not None and os.path.getsize(input_file) > stream_above
+        if profile:
+            profile.start_file(input_file)
+        with _time_limit(timeout):
+            if streamed:
+                # Only the file as a whole is timed: the streaming cleaner runs its rules chunk by chunk.
+                stream_file(input_file, output_file)
+            else:
+                cleaned_text = process_file(input_file, profile)
+        if not streamed:
+            with _atomic_output(output_file) as f_out:
+                f_out.write(cleaned_text)
+        if profile:
+            profile.end_file("streamed" if streamed else "ok")
+    except Exception as e:
+        # An earlier output would otherwise pass for the result of this input in the steps that follow.
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        if isinstance(e, CleaningTimeout):
+            if profile:
+                profile.end_file("timeout")
+            return CleanResult(digest, False, str(e), True, profile)
+        if profile:
+            profile.end_file("error")
+        return CleanResult(None, False, f"{type(e).__name__}: {e}", False, profile)
+    return CleanResult(digest, True, None, False, profile)
+
+def _count_file(rel_path: str, input_file: str, output_file: str, result: CleanResult) -> None:
+    """Record a file handled by `process_directory` in the metrics, when they are enabled."""
+    if not metrics.enabled():
+        return
+    outcome = "timeout" if result.timed_out else "error" if result.error else "cleaned" if result.cleaned else "unchanged"
+    metrics.inc(metrics.FILES_CLEANED, outcome=outcome)
+    fields = {}
+    if result.cleaned:
+        fields = {"bytes_in": os.path.getsize(input_file), "bytes_out": os.path.getsize(output_file)}
+        metrics.inc(metrics.CLEANED_BYTES, fields["bytes_in"], direction="in")
+        metrics.inc(metrics.CLEANED_BYTES, fields["bytes_out"], direction="out")
+    if result.profile:
+        if result.profile.files:
+            fields["seconds"] = round(result.profile.files[-1]["seconds"], 4)
+            metrics.observe(metrics.CLEAN_SECONDS, result.profile.files[-1]["seconds"])
+        for rule, stats in result.profile.rules.items():
+            metrics.inc(metrics.RULE_REMOVED_CHARS, stats["chars_in"] - stats["chars_out"], rule=rule)
+    metrics.event("file", path=rel_path, outcome=outcome, error=result.error, **fields)
+
+def _prune_outputs(manifest: Manifest, present: List[str], output_dir: str) -> None:
+    """Delete the outputs of inputs that were removed or renamed since the last run."""
+    for rel_path in manifest.prune(present):
+        output_file = os.path.join(output_dir, rel_path)
+        rejected_file = os.path.join(output_dir, REJECTED_DIR, rel_path)
+        if os.path.isfile(rejected_file):
+            os.remove(rejected_file)
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+            logger.info(f"Removed stale output: {output_file}")
+        _remove_empty_dirs(os.path.dirname(output_file), output_dir)
+
+def _remove_empty_dirs(folder: str, output_dir: str) -> None:
+    """Remove `folder` and its parents while they are empty, up to the output root."""
+    while os.path.normpath(folder) != os.path.normpath(output_dir) and os.path.isdir(folder) and not os.listdir(folder):
+        os.rmdir(folder)
+        folder = os.path.dirname(folder)
+
+def _deduplicate(outputs: List[Tuple[str, str, str]], output_dir: str, keep: str, threshold: float, workers: int,
+                 manifest: Optional[Manifest], stats: Dict[str, os.stat_result]) -> Set[str]:
+    """
+    Find near-duplicates among the cleaned (relative path, input, output) triples. Returns the relative
+    paths of the copies to drop, which the manifest records as duplicates of the copy kept.
+    """
+    documents = [Document(rel_path, output_file, source_of(rel_path, input_file))
+                 for rel_path, input_file, output_file in outputs]
+    duplicates = find_duplicates(documents, keep=keep, threshold=threshold, workers=workers,
+                                 cache_path=os.path.join(output_dir, CACHE_NAME))
+    dropped = set()
+    for kept, copies in duplicates.items():
+        logger.info(f"Keeping {kept.rel_path} over its duplicate(s): {', '.join(copy.rel_path for copy in copies)}")
+        for copy in copies:
+            dropped.add(copy.rel_path)
+            if manifest:
+                manifest.mark_duplicate(copy.rel_path, stats[copy.rel_path], kept.rel_path)
+    logger.info(f"{len(dropped)} duplicate(s) dropped from {len(duplicates)} group(s)")
+    return dropped
+
+def _filter_quality(outputs: List[Tuple[str, str, str]], output_dir: str, thresholds: Optional[dict],
+                    workers: int, mirrored: bool) -> Set[str]:
+    """
+    Check the cleaned (relative path, input, output) triples against the quality thresholds and write
+    their stats table to the output folder. Returns the relative paths of the outputs rejected. Mirrored
+    outputs are moved to `REJECTED_DIR` when they fail, and back when an earlier rejected one now passes.
+    """
+    documents = []
+    for rel_path, input_file, output_file in outputs:
+        path = output_file
+        if mirrored and not os.path.isfile(output_file):
+            path = os.path.join(output_dir, REJECTED_DIR, rel_path)
+        documents.append(Document(rel_path, path, source_of(rel_path, input_file)))
+    verdicts = assess(documents, thresholds, workers, table_path=os.path.join(output_dir, STATS_NAME))
+    rejected = set()
+    for (rel_path, _, output_file), document, reasons in zip(outputs, documents, verdicts):
+        if reasons:
+            rejected.add(rel_path)
+            logger.info(f"Rejected {rel_path}: {'; '.join(reasons)}")
+        if mirrored:
+            target = os.path.join(output_dir, REJECTED_DIR, rel_path) if reasons else output_file
+            if document.path != target:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(document.path, target)
+    logger.info(f"{len(rejected)} of {len(outputs)} text(s) rejected by the quality thresholds")
+    return rejected
+
+def _pack(writer: ShardWriter, staged: List[Tuple[str, str, str]]) -> None:
+    """Append the staged outputs to the shards, indexed by author folder, title and source."""
+    for rel_path, input_file, output_file in staged:
+        parts = os.path.normpath(rel_path).split(os.sep)
+        writer.add_file(output_file, author=parts[0] if len(parts) > 1 else None,
+                        title=os.path.splitext(parts[-1])[0], source=source_of(rel_path, input_file),
+                        path="/".join(parts))
+        os.remove(output_file)
+
+def process_directory(
+    input_dir: str,
+    output_dir: str,
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    incremental: bool = True,
+    stream_above: Optional[int] = STREAM_ABOVE,
+    timeout: Optional[float] = None,
+    profile: Optional[str] = None,
+    packed: bool = False,
+    shard_size: int = SHARD_SIZE,
+    dedup: Optional[str] = None,
+    dedup_threshold: float = THRESHOLD,
+    quality: bool = False,
+    quality_thresholds: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    index: bool = False,
+) -> Dict[str, str]:
+    """
+    Recursively process all .txt files in input_dir.
+    The cleaned text for each file is written to output_dir, preserving the relative directory structure.
+
+    With workers > 1 (or 0 for one per CPU), files are cleaned by a pool of processes that is started
+    once and fed in chunks. Progress is reported in input order either way.
+
+    With incremental=True, a manifest kept in output_dir records the size, mtime and hash of every
+    input and the fingerprint of the cleaning rules. Files whose entry still matches are skipped, and
+    outputs whose input has disappeared are deleted.
+
+    Files larger than `stream_above` bytes are streamed through the cleaner in bounded memory instead
+    of being read whole (None disables streaming); the output is the same either way.
+
+    With a `timeout`, cleaning a file is stopped after that many seconds. Such files are reported as
+    errors and, in incremental mode, quarantined: later runs skip them until they change (or `incremental=False`).
+    With `profile`, a path ending in .json or .csv, every rule is timed on every file and a report of the
+    slowest rules and files is written there (see `RuleProfile`).
+
+    With packed=True, the cleaned texts are not mirrored as files but packed into shards of about
+    `shard_size` bytes with an index of their author (top folder), title (file name), source, byte
+    range and hash, readable with `PackedCorpus` (see `ShardWriter`). A packed corpus is rebuilt
+    on every run, so `incremental` does not apply.
+
+    With `dedup`, a keep policy of `find_duplicates` ("gutenberg", "wikisource" or "longest"), near-duplicate
+    texts (e.g. the Gutenberg and Wikisource editions of a work) are found with MinHash/LSH once cleaning
+    is done, and only the copy the policy keeps is written or packed. The others are marked as duplicates
+    in the manifest and skipped while they and the kept copy are unchanged.
+
+    With quality=True, the length, character class ratios, French-ness and leftover boilerplate of every
+    cleaned text are computed and written to a `quality_stats.csv` table in output_dir, and texts outside
+    `quality_thresholds` (by default `quality.THRESHOLDS`) are dropped before deduplication. Mirrored
+    outputs that fail are moved to `.rejected/`, and moved back if a later run's thresholds accept them.
+
+    With index=True, the texts kept in output_dir are then indexed into `output_dir/.search_index`, an
+    inverted index of their accent-folded words queried with `SearchIndex` (see `index_folder`). It is
+    rebuilt on every run.
+    Returns a mapping of each input file that failed to its error message.
+    """
+    if not os.path.isdir(input_dir):
+        raise NotADirectoryError(f"{input_dir} is not a directory.")
+
+    manifest = Manifest(output_dir, _default_pipeline.fingerprint) if incremental and not packed else None
+    writer = staging = None
+    if packed:
+        os.makedirs(output_dir, exist_ok=True)
+        writer = ShardWriter(output_dir, shard_size)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=output_dir)
+    tasks = _collect_tasks(input_dir, output_dir, staging)
+    # Rule statistics also feed the metrics, when they are recorded.
+    profiling = profile is not None or metrics.enabled()
+    pending, stats, set_aside = [], {}, 0
+    for input_file, output_file in tasks:
+        known_digest = None
+        if manifest:
+            rel_path = os.path.relpath(input_file, input_dir)
+            stat = stats[rel_path] = os.stat(input_file)
+            reason = manifest.quarantined(rel_path, stat)
+            if reason:
+                set_aside += 1
+                logger.warning(f"Skipping quarantined file {input_file} ({reason})")
+                continue
+            canonical = manifest.duplicate_of(rel_path, stat) if dedup else None
+            if canonical and os.path.isfile(os.path.join(input_dir, canonical)) \
+                    and manifest.is_current(canonical, os.stat(os.path.join(input_dir, canonical))) \
+                    and os.path.isfile(os.path.join(output_dir, canonical)):
+                set_aside += 1
+                logger.info(f"Skipping {input_file}, a duplicate of {canonical}")
+                continue
+            rejected_file = os.path.join(output_dir, REJECTED_DIR, rel_path)
+            if os.path.isfile(output_file) or (quality and os.path.isfile(rejected_file)):
+                if manifest.is_current(rel_path, stat):
+                    continue
+                known_digest = manifest.known_digest(rel_path, stat)
+        pending.append((input_file, output_file, known_digest, stream_above, timeout, profiling))
+
+    total = len(pending)
+    workers = workers or os.cpu_count() or 1
+    errors: Dict[str, str] = {}
+    report = RuleProfile() if profile else None
+    if manifest:
+        logger.info(f"{len(stats) - total - set_aside} unchanged file(s) skipped, {total} to clean")
+        metrics.inc(metrics.FILES_CLEANED, len(stats) - total - set_aside, outcome="skipped")
+        metrics.inc(metrics.FILES_CLEANED, set_aside, outcome="set_aside")
+        _prune_outputs(manifest, list(stats), output_dir)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and total > 1 else None
+    staged: List[Tuple[str, str, str]] = []
+    try:
+        if executor:
+            # Large enough chunks to amortize IPC, small enough to keep progress flowing and cores busy.
+            chunksize = chunksize or max(1, min(64, total // (workers * 4)))
+            results = executor.map(_clean_to_file, pending, chunksize=chunksize)
+        else:
+            results = map(_clean_to_file, pending)
+
+        for done, ((input_file, output_file, *_), result) in enumerate(zip(pending, results), 1):
+            digest, cleaned, error, timed_out, file_profile = result
+            rel_path = os.path.relpath(input_file, input_dir)
+            if report and file_profile:
+                report.merge(file_profile)
+            _count_file(rel_path, input_file, output_file, result)
+            if timed_out:
+                errors[input_file] = error
+                if manifest:
+                    manifest.quarantine(rel_path, stats[rel_path], error)
+                logger.error(f"[{done}/{total}] Quarantined {input_file}: {error}")
+                continue
+            if error:
+                errors[input_file] = error
+                if manifest:
+                    manifest.forget(rel_path)
+                logger.error(f"[{done}/{total}] Error processing {input_file}: {error}")
+                continue
+            if manifest:
+                manifest.record(rel_path, stats[rel_path], digest)
+            if writer:
+                staged.append((rel_path, input_file, output_file))
+                logger.info(f"[{done}/{total}] Cleaned file staged for packing: {rel_path}")
+            elif cleaned:
+                rejected_file = os.path.join(output_dir, REJECTED_DIR, rel_path)
+                if os.path.isfile(rejected_file):
+                    # Superseded by the new output, which gets checked again.
+                    os.remove(rejected_file)
+                logger.info(f"[{done}/{total}] Cleaned file saved to: {output_file}")
+            else:
+                logger.info(f"[{done}/{total}] Unchanged content, kept: {output_file}")
+        if executor:
+            executor.shutdown()
+            executor = None
+
+        outputs = staged
+        if (quality or dedup) and not writer:
+            outputs = []
+            for input_file, output_file in tasks:
+                rel_path = os.path.relpath(input_file, input_dir)
+                rejected_file = os.path.join(output_dir, REJECTED_DIR, rel_path)
+                if os.path.isfile(output_file) or (quality and os.path.isfile(rejected_file)):
+                    outputs.append((rel_path, input_file, output_file))
+        if quality:
+            rejected = _filter_quality(outputs, output_dir, quality_thresholds, workers, mirrored=not writer)
+            outputs = [entry for entry in outputs if entry[0] not in rejected]
+        if dedup:
+            dropped = _deduplicate(outputs, output_dir, dedup, dedup_threshold, workers, manifest, stats)
+            outputs = [entry for entry in outputs if entry[0] not in dropped]
+            if not writer:
+                for rel_path in dropped:
+                    os.remove(os.path.join(output_dir, rel_path))
+                    _remove_empty_dirs(os.path.dirname(os.path.join(output_dir, rel_path)), output_dir)
+        if writer:
+            _pack(writer, outputs)
+            writer.close()
+            logger.info(f"Packed {len(writer.records)} texts into {output_dir}")
+            writer = None
+        if index:
+            index_folder(output_dir, workers)
+    finally:
+        if executor:
+            executor.shutdown()
+        if writer:
+            writer.abort()
+        if staging:
+            shutil.rmtree(staging, ignore_errors=True)
+        if manifest:
+            manifest.save()
+        if report:
+            report.write(profile)
+            logger.info(f"Rule profile written to {profile}")
+
+    logger.info(f"Cleaned {total - len(errors)}/{total} files from {input_dir}")
+    if errors:
+        logger.warning(f"{len(errors)} file(s) failed:\n" + "\n".join(f"  {path}: {error}" for path, error in errors.items()))
+    return errors
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Clean every .txt file under a directory.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of cleaning processes (0 = one per CPU, default: 1)")
+    parser.add_argument("--force", action="store_true",
+                        help="re-clean every file, ignoring the manifest of the previous run")
+    parser.add_argument("--stream-above", type=float, default=STREAM_ABOVE / 1024 / 1024, metavar="MB",
+                        help="stream files larger than this through the cleaner in bounded memory "
+                             f"(default: {STREAM_ABOVE // 1024 // 1024} MB, 0 = stream every file)")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="stop cleaning a file after this long and quarantine it until it changes")
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="time every cleaning rule and write a report to this .json or .csv file")
+    parser.add_argument("--packed", action="store_true",
+                        help="pack the cleaned texts into indexed shards instead of one file per text")
+    parser.add_argument("--shard-size", type=float, default=SHARD_SIZE / 1024 / 1024, metavar="MB",
+                        help=f"size of the packed shards (default: {SHARD_SIZE // 1024 // 1024} MB)")
+    parser.add_argument("--dedup", choices=sorted(KEEP_POLICIES), metavar="KEEP",
+                        help="drop near-duplicate texts, keeping one copy of each: prefer a source (gutenberg, "
+                             "wikisource), then the longest text, or just the longest (longest)")
+    parser.add_argument("--dedup-threshold", type=float, default=THRESHOLD,
+                        help=f"estimated similarity above which texts are duplicates (default: {THRESHOLD})")
+    parser.add_argument("--quality", action="store_true",
+                        help="write a table of quality features of the cleaned texts and drop those outside the thresholds")
+    parser.add_argument("--quality-thresholds", metavar="JSON",
+                        help='JSON file of bounds overriding the default ones, e.g. {"chars": [5000, null]}')
+    parser.add_argument("--index", action="store_true",
+                        help=f"build a full-text index of the cleaned texts in OUTPUT_DIR/{INDEX_DIR}")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    with metrics.recording(args.metrics, args.events):
+        errors = process_directory(args.input_dir, args.output_dir, workers=args.workers, incremental=not args.force,
+                                   stream_above=int(args.stream_above * 1024 * 1024),
+                                   timeout=args.timeout, profile=args.profile,
+                                   packed=args.packed, shard_size=int(args.shard_size * 1024 * 1024),
+                                   dedup=args.dedup, dedup_threshold=args.dedup_threshold,
+                                   quality=args.quality or bool(args.quality_thresholds),
+                                   quality_thresholds=load_thresholds(args.quality_thresholds) if args.quality_thresholds else None,
+                                   index=args.index)
+    sys.exit(1 if errors else 0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .manifest import file_digest
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+# Estimated Jaccard similarity of word 5-grams above which two texts are the same work.
+THRESHOLD = 0.8
+CACHE_NAME = ".bibliothecaire_minhash.sqlite"
+DUPLICATES_DIR = ".duplicates"
+
+WORD = re.compile(r"\w+")
+EMPTY = (1 << 64) - 1
+
+
+class Document(NamedTuple):
+    """A cleaned text: its path relative to the corpus root, where it is, and the source it came from."""
+    rel_path: str
+    path: str
+    source: Optional[str]
+
+
+# How to pick the copy to keep in a group of near-duplicates: the smallest key wins.
+KEEP_POLICIES: Dict[str, Callable[[Document, int], tuple]] = {
+    "longest": lambda document, length: (-length, document.rel_path),
+    "gutenberg": lambda document, length: (document.source != "gutenberg", -length, document.rel_path),
+    "wikisource": lambda document, length: (document.source != "wikisource", -length, document.rel_path),
+}
+
+
+def minhash(text: str, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE) -> array:
+    """
+    One-permutation MinHash signature of the word shingles of a text.
+
+    Each shingle is hashed once: its hash picks one of `num_perm` bins, which keeps the smallest value it
+    receives. Empty bins borrow from the next filled one (rotation densification). The fraction of bins
+    two signatures agree on estimates the Jaccard similarity of their shingle sets, at the cost of one hash
+    per shingle instead of `num_perm`. A text without words gets a signature of EMPTY bins.
+    """
+    words = WORD.findall(text.lower())
+    signature = array("Q", [EMPTY]) * num_perm
+    if not words:
+        return signature
+    for i in range(max(len(words) - shingle_size + 1, 1)):
+        shingle = " ".join(words[i:i + shingle_size]).encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "little")
+        slot, value = value % num_perm, value // num_perm
+        if value < signature[slot]:
+            signature[slot] = value
+    filled = array("Q", signature)
+    for i in range(num_perm):
+        if filled[i] == EMPTY:
+            distance = 1
+            while filled[(i + distance) % num_perm] == EMPTY:
+                distance += 1
+            # Offset borrowed values by the distance so that two texts only agree on a bin they filled alike.
+            signature[i] = (filled[(i + distance) % num_perm] + distance * 0x9E3779B97F4A7C15) % EMPTY
+    return signature
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the texts two signatures were computed from."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def lsh_bands(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    Number of bands and rows per band to split signatures into: texts sharing all the rows of any band
+    are compared. The similarity at which that becomes likely, (1/bands)^(1/rows), is kept just below
+    `threshold`, so that few duplicates are missed while few dissimilar pairs are compared.
+    """
+    candidates = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    below = [(bands, rows) for bands, rows in candidates if (1 / bands) ** (1 / rows) <= threshold]
+    return max(below or candidates[-1:], key=lambda band: (1 / band[0]) ** (1 / band[1]))
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing of MinHash signatures, grouping near-duplicates without comparing every pair."""
+
+    def __init__(self, threshold: float = THRESHOLD, num_perm: int = NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[array] = []
+        self._parents: List[int] = []
+
+    def _find(self, i: int) -> int:
+        while self._parents[i] != i:
+            self._parents[i] = self._parents[self._parents[i]]
+            i = self._parents[i]
+        return i
+
+    def add(self, signature: array) -> int:
+        """Index a signature, join it to the group of any near-duplicate already indexed, and return its number."""
+        key = len(self._signatures)
+        self._signatures.append(signature)
+        self._parents.append(key)
+        if signature[0] == EMPTY:
+            return key
+        raw = signature.tobytes()
+        width = self.rows * signature.itemsize
+        for band, buckets in enumerate(self._buckets):
+            # Bands are keyed by their hash: candidates are checked anyway, and ints take less memory than bytes.
+            members = buckets.setdefault(hash(raw[band * width:(band + 1) * width]), [])
+            for other in members:
+                root, other_root = self._find(key), self._find(other)
+                if root != other_root and similarity(signature, self._signatures[other]) >= self.threshold:
+                    self._parents[max(root, other_root)] = min(root, other_root)
+            members.append(key)
+        return key
+
+    def groups(self) -> List[List[int]]:
+        """Groups of two or more near-duplicates, as lists of the numbers `add` returned."""
+        groups: Dict[int, List[int]] = {}
+        for key in range(len(self._signatures)):
+            groups.setdefault(self._find(key), []).append(key)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+class SignatureCache:
+    """Signatures already computed, in SQLite, keyed by the SHA-256 of the text they were computed from."""
+
+    def __init__(self, db_path: str, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE):
+        self._db = sqlite3.connect(db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS signatures"
+            " (digest TEXT, settings TEXT, length INTEGER, signature BLOB, PRIMARY KEY (digest, settings))"
+        )
+        self.settings = f"{num_perm}:{shingle_size}"
+
+    def get(self, digest: str) -> Optional[Tuple[int, array]]:
+        """Length and signature of the text with this hash, if known."""
+        row = self._db.execute(
+            "SELECT length, signature FROM signatures WHERE digest = ? AND settings = ?", (digest, self.settings)
+        ).fetchone()
+        return (row[0], array("Q", row[1])) if row else None
+
+    def put(self, digest: str, length: int, signature: array) -> None:
+        self._db.execute("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)",
+                         (digest, self.settings, length, signature.tobytes()))
+
+    def retain(self, digests: Iterable[str]) -> None:
+        """Forget the signatures of texts that are no longer in the corpus."""
+        with self._db:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS kept (digest TEXT PRIMARY KEY)")
+            self._db.execute("DELETE FROM kept")
+            self._db.executemany("INSERT OR IGNORE INTO kept VALUES (?)", ((digest,) for digest in digests))
+            self._db.execute("DELETE FROM signatures WHERE digest NOT IN (SELECT digest FROM kept)")
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+
+def _read_signature(task: Tuple[str, int, int]) -> Tuple[str, int, array]:
+    """(SHA-256, length, signature) of a UTF-8 file."""
+    path, num_perm, shingle_size = task
+    with open(path, "rb") as f:
+        data = f.read()
+    text = data.decode("utf-8")
+    return hashlib.sha256(data).hexdigest(), len(text), minhash(text, num_perm, shingle_size)
+
+
+def _signatures(documents: Sequence[Document], cache: Optional[SignatureCache], num_perm: int,
+                shingle_size: int, workers: int) -> List[Tuple[str, int, array]]:
+    """(SHA-256, length, signature) of every document, from the cache when it has them."""
+    results: List[Optional[Tuple[str, int, array]]] = [None] * len(documents)
+    missing = []
+    for i, document in enumerate(documents):
+        if cache:
+            # Hashing is much cheaper than shingling: look every text up first.
+            digest = file_digest(document.path)
+            known = cache.get(digest)
+            if known:
+                results[i] = (digest, *known)
+                continue
+        missing.append(i)
+
+    tasks = [(documents[i].path, num_perm, shingle_size) for i in missing]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            computed = executor.map(_read_signature, tasks, chunksize=max(1, min(64, len(tasks) // (workers * 4))))
+            for i, result in zip(missing, computed):
+                results[i] = result
+    else:
+        for i, task in zip(missing, tasks):
+            results[i] = _read_signature(task)
+
+    if cache:
+        for i in missing:
+            cache.put(*results[i])
+        cache.retain(digest for digest, _, _ in results)
+    return results
+
+
+def find_duplicates(
+    documents: Sequence[Document],
+    keep: str = "gutenberg",
+    threshold: float = THRESHOLD,
+    workers: int = 1,
+    cache_path: Optional[str] = None,
+    num_perm: int = NUM_PERM,
+    shingle_size: int = SHINGLE_SIZE,
+) -> Dict[Document, List[Document]]:
+    """
+    Group near-duplicate texts and pick the copy to keep in each group by the `keep` policy
+    ("gutenberg" or "wikisource": prefer that source, then the longest text; "longest").
+    Signatures are computed by `workers` processes and, with `cache_path`, kept for the next run.
+    Returns a mapping of each kept document to the duplicates it stands for.
+    """
+    policy = KEEP_POLICIES[keep]
+    cache = SignatureCache(cache_path, num_perm, shingle_size) if cache_path else None
+    try:
+        results = _signatures(documents, cache, num_perm, shingle_size, workers)
+    finally:
+        if cache:
+            cache.close()
+
+    index = LSHIndex(threshold, num_perm)
+    for _, _, signature in results:
+        index.add(signature)
+    duplicates = {}
+    for group in index.groups():
+        kept = min(group, key=lambda i: policy(documents[i], results[i][1]))
+        duplicates[documents[kept]] = [documents[i] for i in group if i != kept]
+    return duplicates
+
+
+def corpus_documents(folder: str) -> List[Document]:
+    """Every .txt file under a folder (hidden folders excepted), with its source when its path names one."""
+    from .clean_up import source_of  # clean_up imports this module
+
+    documents = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for filename in sorted(files):
+            if filename.lower().endswith(".txt"):
+                path = os.path.join(root, filename)
+                rel_path = os.path.relpath(path, folder)
+                documents.append(Document(rel_path, path, source_of(rel_path, path)))
+    return documents
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=f"Find near-duplicate texts under a folder and move all but one copy of each to {DUPLICATES_DIR}/."
+    )
+    parser.add_argument("folder")
+    parser.add_argument("--keep", choices=sorted(KEEP_POLICIES), default="gutenberg",
+                        help="copy to keep: prefer a source (then the longest), or the longest (default: gutenberg)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"estimated Jaccard similarity of word {SHINGLE_SIZE}-grams above which texts are duplicates "
+                             f"(default: {THRESHOLD})")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes computing signatures (0 = one per CPU)")
+    parser.add_argument("--dry-run", action="store_true", help="only report the duplicates")
+    parser.add_argument("--report", metavar="JSON", help="write the groups found to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    duplicates = find_duplicates(
+        corpus_documents(args.folder), keep=args.keep, threshold=args.threshold,
+        workers=args.workers or os.cpu_count() or 1, cache_path=os.path.join(args.folder, CACHE_NAME),
+    )
+    for kept, copies in duplicates.items():
+        logger.info(f"Keeping {kept.rel_path}, duplicated by: {', '.join(copy.rel_path for copy in copies)}")
+        if not args.dry_run:
+            for copy in copies:
+                target = os.path.join(args.folder, DUPLICATES_DIR, copy.rel_path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(copy.path, target)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({kept.rel_path: [copy.rel_path for copy in copies] for kept, copies in duplicates.items()},
+                      f, ensure_ascii=False, indent=2)
+    logger.info(f"{sum(map(len, duplicates.values()))} duplicate(s) in {len(duplicates)} group(s)")
+
+
+if __name__ == "__main__":
+    main()
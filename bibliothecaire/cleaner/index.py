@@ -0,0 +1,370 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import struct
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .dedup import corpus_documents
+from .packed import INDEX_NAME, PackedCorpus
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = ".search_index"
+TERMS_NAME = "terms.bin"
+POSTINGS_NAME = "postings.bin"
+DOCUMENTS_NAME = "documents.jsonl"
+
+MAGIC = b"BIBIDX01"
+HEADER = struct.Struct("<8sQ")  # magic, number of terms
+# Per term, sorted by UTF-8 bytes: offset and length of its name in the names blob after the table,
+# number of documents it occurs in, offset and length of its postings in POSTINGS_NAME.
+ENTRY = struct.Struct("<QIIQQ")
+
+WORD = re.compile(r"[^\W_]+")
+LIGATURES = str.maketrans({"œ": "oe", "æ": "ae"})
+
+# A text to index: the file holding it, and its byte offset and length there (None for the whole file).
+Span = Tuple[str, Optional[int], Optional[int]]
+
+
+class Match(NamedTuple):
+    """A document matching a query, and the character offsets of every match in its text."""
+    doc: int
+    offsets: List[int]
+
+
+@lru_cache(maxsize=1 << 16)
+def fold(word: str) -> str:
+    """Lowercase a word and strip its accents: "Misérables" and "misérables" both index as "miserables"."""
+    decomposed = unicodedata.normalize("NFKD", word.lower().translate(LIGATURES))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int]]:
+    """The folded words of a text with their character offsets. Apostrophes and hyphens split words."""
+    for match in WORD.finditer(text):
+        yield fold(match.group()), match.start()
+
+
+def _write_varints(out: bytearray, values: Sequence[int]) -> None:
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _read_varint(buffer, pos: int) -> Tuple[int, int]:
+    """The varint at `pos` and the position after it."""
+    value = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _read_text(span: Span) -> str:
+    path, offset, length = span
+    if offset is None:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length).decode("utf-8")
+
+
+def _document_postings(span: Span) -> Tuple[int, Dict[str, bytes]]:
+    """
+    Tokenize one text. Returns its number of words and, for each term, its encoded occurrences:
+    their count, then the delta-encoded word position and character offset of each.
+    """
+    occurrences: Dict[str, List[int]] = defaultdict(list)
+    n_words = 0
+    for n_words, (term, offset) in enumerate(tokenize(_read_text(span)), 1):
+        occurrences[term] += (n_words - 1, offset)
+    encoded = {}
+    for term, flat in occurrences.items():
+        block = bytearray()
+        _write_varints(block, [len(flat) // 2])
+        previous_position = previous_offset = 0
+        for i in range(0, len(flat), 2):
+            _write_varints(block, (flat[i] - previous_position, flat[i + 1] - previous_offset))
+            previous_position, previous_offset = flat[i], flat[i + 1]
+        encoded[term] = bytes(block)
+    return n_words, encoded
+
+
+def build_index(spans: List[Span], documents: List[dict], index_dir: str, workers: int = 1) -> None:
+    """
+    Build an inverted index of the texts in `spans`, described by `documents` (document i is spans[i]).
+
+    The postings of a term list the documents it occurs in, delta-encoded as varints, each followed by
+    the byte length of its occurrences so that a query can skip documents without decoding them. The
+    term dictionary is a sorted table of fixed-size entries, binary searched in place through mmap.
+    Everything is written under a temporary folder that replaces `index_dir` once complete.
+    """
+    documents = list(documents)
+    postings: Dict[str, bytearray] = defaultdict(bytearray)
+    last_doc: Dict[str, int] = {}
+    doc_freq: Dict[str, int] = defaultdict(int)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(spans) > 1 else None
+    try:
+        if executor:
+            results = executor.map(_document_postings, spans, chunksize=max(1, min(16, len(spans) // (workers * 4))))
+        else:
+            results = map(_document_postings, spans)
+        for doc, (n_words, encoded) in enumerate(results):
+            documents[doc] = {**documents[doc], "id": doc, "words": n_words}
+            for term, block in encoded.items():
+                buffer = postings[term]
+                _write_varints(buffer, (doc - last_doc.get(term, 0), len(block)))
+                buffer += block
+                last_doc[term] = doc
+                doc_freq[term] += 1
+    finally:
+        if executor:
+            executor.shutdown()
+
+    tmp_dir = index_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    names = sorted(term.encode("utf-8") for term in postings)
+    table, blob = bytearray(HEADER.pack(MAGIC, len(names))), bytearray()
+    with open(os.path.join(tmp_dir, POSTINGS_NAME), "wb") as f:
+        for name in names:
+            term = name.decode("utf-8")
+            buffer = postings.pop(term)
+            table += ENTRY.pack(len(blob), len(name), doc_freq[term], f.tell(), len(buffer))
+            blob += name
+            f.write(buffer)
+    with open(os.path.join(tmp_dir, TERMS_NAME), "wb") as f:
+        f.write(table)
+        f.write(blob)
+    with open(os.path.join(tmp_dir, DOCUMENTS_NAME), "w", encoding="utf-8") as f:
+        for document in documents:
+            f.write(json.dumps(document, ensure_ascii=False) + "\n")
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    logger.info(f"Indexed {len(names)} terms of {len(documents)} texts into {index_dir}")
+
+
+def index_folder(folder: str, workers: int = 1) -> str:
+    """
+    Index the cleaned texts of a folder into `folder/.search_index` and return that path. A packed
+    corpus (see `ShardWriter`) is indexed by record id; otherwise every .txt file outside hidden
+    folders is, in path order.
+    """
+    if os.path.isfile(os.path.join(folder, INDEX_NAME)):
+        with PackedCorpus(folder) as corpus:
+            documents = [dict(record) for record in corpus]
+        spans = [(os.path.join(folder, record["shard"]), record["offset"], record["length"]) for record in documents]
+    else:
+        found = corpus_documents(folder)
+        documents = [{"path": document.rel_path.replace(os.sep, "/"), "source": document.source} for document in found]
+        spans = [(document.path, None, None) for document in found]
+    index_dir = os.path.join(folder, INDEX_DIR)
+    build_index(spans, documents, index_dir, workers)
+    return index_dir
+
+
+class SearchIndex:
+    """Term, phrase and prefix queries on an index written by `build_index`.
+
+    Both files of the index are memory-mapped: a term is found by binary search of the dictionary, and
+    only the postings of the documents a query can match are decoded. Offsets are character offsets in
+    the texts as read (or, for a packed corpus, as returned by `PackedCorpus.text`).
+
+        with SearchIndex("cleaned_texts/.search_index") as index:
+            for match in index.phrase("les misérables"):
+                print(index.documents[match.doc]["path"], match.offsets)
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, DOCUMENTS_NAME), "r", encoding="utf-8") as f:
+            self.documents: List[dict] = [json.loads(line) for line in f if line.strip()]
+        self._files, self._maps = [], []
+        self._terms = self._map(TERMS_NAME)
+        self._postings = self._map(POSTINGS_NAME)
+        magic, self.n_terms = HEADER.unpack_from(self._terms, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_dir} is not a search index")
+        self._names_start = HEADER.size + self.n_terms * ENTRY.size
+
+    def _map(self, name: str):
+        f = open(os.path.join(self.index_dir, name), "rb")
+        self._files.append(f)
+        if not os.fstat(f.fileno()).st_size:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int, int]:
+        return ENTRY.unpack_from(self._terms, HEADER.size + i * ENTRY.size)
+
+    def _name(self, i: int) -> bytes:
+        offset, length = self._entry(i)[:2]
+        start = self._names_start + offset
+        return self._terms[start:start + length]
+
+    def _lower_bound(self, name: bytes) -> int:
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, term: str) -> Optional[int]:
+        name = term.encode("utf-8")
+        i = self._lower_bound(name)
+        return i if i < self.n_terms and self._name(i) == name else None
+
+    def _prefix_range(self, prefix: str) -> range:
+        name = prefix.encode("utf-8")
+        # No UTF-8 byte is 0xFF, so this sorts after every term starting with the prefix.
+        return range(self._lower_bound(name), self._lower_bound(name + b"\xff"))
+
+    def _docs(self, i: int) -> Dict[int, Tuple[int, int]]:
+        """The documents term `i` occurs in, with the byte range of its occurrences in each."""
+        postings_offset, postings_length = self._entry(i)[3:]
+        pos, end = postings_offset, postings_offset + postings_length
+        docs, doc = {}, 0
+        while pos < end:
+            delta, pos = _read_varint(self._postings, pos)
+            length, pos = _read_varint(self._postings, pos)
+            doc += delta
+            docs[doc] = (pos, pos + length)
+            pos += length
+        return docs
+
+    def _occurrences(self, block: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """(word position, character offset) of the occurrences in a postings block."""
+        buffer = self._postings
+        count, pos = _read_varint(buffer, block[0])
+        occurrences = []
+        position = offset = 0
+        for _ in range(count):
+            delta, pos = _read_varint(buffer, pos)
+            position += delta
+            delta, pos = _read_varint(buffer, pos)
+            offset += delta
+            occurrences.append((position, offset))
+        return occurrences
+
+    def terms(self, prefix: str = "") -> List[str]:
+        """The indexed terms starting with a (folded) prefix."""
+        return [self._name(i).decode("utf-8") for i in self._prefix_range(fold(prefix))]
+
+    def doc_freq(self, word: str) -> int:
+        """Number of documents a word occurs in."""
+        i = self._find(fold(word))
+        return 0 if i is None else self._entry(i)[2]
+
+    def term(self, word: str) -> List[Match]:
+        """Documents containing a word, accents and case ignored."""
+        i = self._find(fold(word))
+        if i is None:
+            return []
+        return [Match(doc, [offset for _, offset in self._occurrences(block)]) for doc, block in self._docs(i).items()]
+
+    def phrase(self, text: str) -> List[Match]:
+        """Documents containing the words of `text` in a row, with the offset of each occurrence's first word."""
+        terms = [term for term, _ in tokenize(text)]
+        if not terms:
+            return []
+        ids = [self._find(term) for term in terms]
+        if None in ids:
+            return []
+        postings = {i: self._docs(i) for i in set(ids)}
+        candidates = set.intersection(*(set(docs) for docs in postings.values()))
+        matches = []
+        for doc in sorted(candidates):
+            occurrences = {i: self._occurrences(postings[i][doc]) for i in postings}
+            positions = {i: {position for position, _ in occurrences[i]} for i in postings}
+            offsets = [
+                offset for position, offset in occurrences[ids[0]]
+                if all(position + k in positions[i] for k, i in enumerate(ids[1:], 1))
+            ]
+            if offsets:
+                matches.append(Match(doc, offsets))
+        return matches
+
+    def prefix(self, prefix: str) -> List[Match]:
+        """Documents containing a word that starts with `prefix`, accents and case ignored."""
+        found: Dict[int, List[int]] = defaultdict(list)
+        for i in self._prefix_range(fold(prefix)):
+            for doc, block in self._docs(i).items():
+                found[doc] += (offset for _, offset in self._occurrences(block))
+        return [Match(doc, sorted(found[doc])) for doc in sorted(found)]
+
+    def search(self, query: str) -> List[Match]:
+        """`prefix` for a word ending with '*', `term` for a single word, `phrase` otherwise."""
+        query = query.strip()
+        if query.endswith("*") and len(WORD.findall(query)) == 1:
+            return self.prefix(query.rstrip("*").strip())
+        if len(WORD.findall(query)) == 1:
+            return self.term(query)
+        return self.phrase(query)
+
+    def close(self) -> None:
+        for mapped in self._maps:
+            mapped.close()
+        for f in self._files:
+            f.close()
+        self._maps, self._files = [], []
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description=f"Index the cleaned texts of a folder into {INDEX_DIR}/, or search that index."
+    )
+    parser.add_argument("folder", help="a folder of cleaned texts, mirrored or packed")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes tokenizing texts (0 = one per CPU)")
+    parser.add_argument("-q", "--query", action="append", default=[],
+                        help="search the existing index instead of building it: a word, a phrase, or a prefix "
+                             "ending with * (repeatable)")
+    parser.add_argument("--limit", type=int, default=10, help="offsets printed per document (default: 10)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    if not args.query:
+        index_folder(args.folder, workers=args.workers or os.cpu_count() or 1)
+        return
+    with SearchIndex(os.path.join(args.folder, INDEX_DIR)) as index:
+        for query in args.query:
+            matches = index.search(query)
+            print(f"{query}: {len(matches)} document(s)")
+            for match in matches:
+                document = index.documents[match.doc]
+                shown = ", ".join(map(str, match.offsets[:args.limit]))
+                more = f", ... ({len(match.offsets)} in all)" if len(match.offsets) > args.limit else ""
+                print(f"  {document.get('path', match.doc)}: {shown}{more}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".bibliothecaire_manifest.json"
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Record of the inputs cleaned into an output directory.
+
+    Each entry is keyed by the input path relative to the input directory and stores the size,
+    mtime and content hash of the input together with the fingerprint of the rules it was
+    cleaned with. A file whose size, mtime and rules still match is skipped without being read.
+
+    Inputs that could not be cleaned in time are quarantined, and inputs whose cleaned text duplicates
+    another one's are marked as duplicates: their entry holds the reason (or the other input) instead
+    of a hash, and they are skipped until they change or the rules do.
+    """
+
+    def __init__(self, output_dir: str, rules: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.rules = rules
+        self.entries: Dict[str, dict] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def is_current(self, rel_path: str, stat: os.stat_result) -> bool:
+        """True if the input is unchanged since it was last cleaned with the same rules."""
+        entry = self.entries.get(rel_path)
+        return (
+            entry is not None
+            and "sha256" in entry
+            and entry["rules"] == self.rules
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        )
+
+    def known_digest(self, rel_path: str, stat: os.stat_result) -> Optional[str]:
+        """Hash to compare against when only the mtime changed (e.g. a file that was touched or copied)."""
+        entry = self.entries.get(rel_path)
+        if entry is None or entry["rules"] != self.rules or entry["size"] != stat.st_size:
+            return None
+        return entry.get("sha256")
+
+    def quarantined(self, rel_path: str, stat: os.stat_result) -> Optional[str]:
+        """Why the input was quarantined, if it was and has not changed since."""
+        return self._aside_reason(rel_path, stat, "quarantined")
+
+    def duplicate_of(self, rel_path: str, stat: os.stat_result) -> Optional[str]:
+        """The input this one was found to duplicate, if it was and has not changed since."""
+        return self._aside_reason(rel_path, stat, "duplicate_of")
+
+    def _aside_reason(self, rel_path: str, stat: os.stat_result, field: str) -> Optional[str]:
+        entry = self.entries.get(rel_path)
+        if (
+            entry is None
+            or entry["rules"] != self.rules
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            return None
+        return entry.get(field)
+
+    def record(self, rel_path: str, stat: os.stat_result, digest: str) -> None:
+        self.entries[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "rules": self.rules,
+        }
+
+    def quarantine(self, rel_path: str, stat: os.stat_result, reason: str) -> None:
+        self._set_aside(rel_path, stat, quarantined=reason)
+
+    def mark_duplicate(self, rel_path: str, stat: os.stat_result, canonical: str) -> None:
+        self._set_aside(rel_path, stat, duplicate_of=canonical)
+
+    def _set_aside(self, rel_path: str, stat: os.stat_result, **why) -> None:
+        self.entries[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rules": self.rules, **why}
+
+    def forget(self, rel_path: str) -> None:
+        self.entries.pop(rel_path, None)
+
+    def prune(self, present: Iterable[str]) -> List[str]:
+        """Drop the entries of inputs that no longer exist and return their relative paths."""
+        present = set(present)
+        removed = [rel_path for rel_path in self.entries if rel_path not in present]
+        for rel_path in removed:
+            del self.entries[rel_path]
+        return removed
+
+    def save(self) -> None:
+        """Write the manifest atomically, so that an interrupted run never leaves it truncated."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": self.entries}, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional
+
+INDEX_NAME = "index.jsonl"
+SHARD_PATTERN = "shard-{:05d}.txt"
+# Shards are closed once they reach this many bytes (a text is never split across two shards).
+SHARD_SIZE = 256 * 1024 * 1024
+
+
+class ShardWriter:
+    """Pack texts into a few large files instead of one file per text.
+
+    Texts are appended, UTF-8 encoded and back to back, to `shard-00000.txt`, `shard-00001.txt`, ...
+    and described in `index.jsonl`, one JSON record per text: its id, author, title, source and input
+    path, the shard holding it, its byte offset and length there, and its SHA-256. Everything is
+    written under a temporary folder and moved into `output_dir` by `close`, index last, so readers
+    never see a half-written corpus; `abort` drops it instead.
+    """
+
+    def __init__(self, output_dir: str, shard_size: int = SHARD_SIZE):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.records: List[dict] = []
+        self._tmp_dir = os.path.join(output_dir, ".packing")
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        os.makedirs(self._tmp_dir)
+        self._shards: List[str] = []
+        self._shard = None
+
+    def _open_shard(self):
+        if self._shard is None or self._shard.tell() >= self.shard_size:
+            if self._shard is not None:
+                self._shard.close()
+            self._shards.append(SHARD_PATTERN.format(len(self._shards)))
+            self._shard = open(os.path.join(self._tmp_dir, self._shards[-1]), "wb")
+        return self._shard
+
+    def add_file(self, filename: str, **metadata) -> dict:
+        """Append the content of a UTF-8 file and index it with `metadata` (author, title, source, path)."""
+        shard = self._open_shard()
+        offset = shard.tell()
+        digest = hashlib.sha256()
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+                shard.write(block)
+        return self._index(metadata, offset, shard.tell() - offset, digest.hexdigest())
+
+    def add(self, text: str, **metadata) -> dict:
+        """Append a text and index it with `metadata`."""
+        data = text.encode("utf-8")
+        shard = self._open_shard()
+        offset = shard.tell()
+        shard.write(data)
+        return self._index(metadata, offset, len(data), hashlib.sha256(data).hexdigest())
+
+    def _index(self, metadata: dict, offset: int, length: int, digest: str) -> dict:
+        record = {
+            "id": len(self.records),
+            **metadata,
+            "shard": self._shards[-1],
+            "offset": offset,
+            "length": length,
+            "sha256": digest,
+        }
+        self.records.append(record)
+        return record
+
+    def close(self) -> None:
+        """Publish the shards and the index, replacing any previous packed corpus in `output_dir`."""
+        if self._shard is not None:
+            self._shard.close()
+        with open(os.path.join(self._tmp_dir, INDEX_NAME), "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        previous = os.path.join(self.output_dir, INDEX_NAME)
+        if os.path.isfile(previous):
+            os.remove(previous)
+        for name in os.listdir(self.output_dir):
+            if name.startswith("shard-") and name not in self._shards:
+                os.remove(os.path.join(self.output_dir, name))
+        for name in self._shards + [INDEX_NAME]:
+            os.replace(os.path.join(self._tmp_dir, name), os.path.join(self.output_dir, name))
+        os.rmdir(self._tmp_dir)
+
+    def abort(self) -> None:
+        if self._shard is not None:
+            self._shard.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+class PackedCorpus:
+    """Random access to a corpus written by `ShardWriter`.
+
+    The index is loaded in memory and the shards are memory-mapped on first use, so reading a text
+    costs one slice and one decode, whatever its position; `raw` returns the bytes without copying them.
+
+        with PackedCorpus("cleaned_texts") as corpus:
+            for record in corpus.find(author="Victor Hugo"):
+                text = corpus.text(record["id"])
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        with open(os.path.join(folder, INDEX_NAME), "r", encoding="utf-8") as f:
+            self.records: List[dict] = [json.loads(line) for line in f if line.strip()]
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._files = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.records)
+
+    def __getitem__(self, i: int) -> str:
+        return self.text(i)
+
+    def _map(self, shard: str) -> mmap.mmap:
+        mapped = self._maps.get(shard)
+        if mapped is None:
+            f = open(os.path.join(self.folder, shard), "rb")
+            self._files.append(f)
+            # An empty shard cannot be mapped; it only ever holds empty texts.
+            size = os.fstat(f.fileno()).st_size
+            mapped = self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        return mapped
+
+    def raw(self, i: int) -> memoryview:
+        """The UTF-8 bytes of text `i`, as a view of the mapped shard; release it before `close`."""
+        record = self.records[i]
+        return memoryview(self._map(record["shard"]))[record["offset"]:record["offset"] + record["length"]]
+
+    def text(self, i: int) -> str:
+        record = self.records[i]
+        mapped = self._map(record["shard"])
+        return mapped[record["offset"]:record["offset"] + record["length"]].decode("utf-8")
+
+    def verify(self, i: int) -> bool:
+        """Whether text `i` still has the hash it was indexed with."""
+        return hashlib.sha256(self.raw(i)).hexdigest() == self.records[i]["sha256"]
+
+    def find(self, author: Optional[str] = None, title: Optional[str] = None, source: Optional[str] = None) -> List[dict]:
+        """Index records matching every given field."""
+        wanted = {key: value for key, value in (("author", author), ("title", title), ("source", source)) if value is not None}
+        return [record for record in self.records if all(record.get(key) == value for key, value in wanted.items())]
+
+    def close(self) -> None:
+        for mapped in self._maps.values():
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for f in self._files:
+            f.close()
+        self._maps, self._files = {}, []
+
+    def __enter__(self) -> "PackedCorpus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,250 @@
+import hashlib
+import re
+import time
+from typing import Callable, Dict, Iterator, List, Match, Optional, Sequence, Tuple
+
+from .profiling import RuleProfile
+
+# --- Default marker sets ---
+BEGINNING_MARKERS = (
+    # English markers
+    "PART ONE", "PART 1", "PART I",
+    "CHAPTER", "CHAPTER I", "CHAPTER 1", "Volume", "VOL.", "BOOK ONE", "BOOK I",
+    "DEDICATION", "INTRODUCTION", "PREFACE",
+    # French markers
+    "PREMIÈRE PARTIE", "PARTIE 1", "PARTIE I",
+    "CHAPITRE", "CHAPITRE I", "CHAPITRE 1", "CHAPITRE PREMIER",
+    "TOME", "DEDICACE", "PRÉFACE"
+)
+
+ENDING_MARKERS = (
+    "NOTES", "NOTE", "TABLE OF CONTENTS", "INDEX", "END OF THE TEXT",
+    "ADDENDUM", "AFTERWORD", "APPENDIX", "FINALE", "THE END",
+    # French endings
+    "NOTES", "TABLE DES MATIÈRES", "INDEX", "ANNEXE", "FIN", "À propos de cette édition électronique"
+)
+
+# Ending markers that may be followed by anything on their line (e.g. "FIN DU TOME PREMIER").
+OPEN_ENDING_MARKERS = ("FIN",)
+
+ORDINALS = (
+    "premier", "première", "deuxième", "troisième", "quatrième", "cinquième", "sixième", "septième",
+    "huitième", "neuvième", "dixième", "onzième", "douzième", "treizième", "quatorzième", "quinzième",
+    "seizième", r"dix[-\s]?septième", r"dix[-\s]?huitième", r"dix[-\s]?neuvième", "vingtième",
+)
+
+# Bump whenever the behavior of a step implemented in Python (not a plain substitution) changes,
+# so that fingerprints, and the incremental cleaning manifests that rely on them, are invalidated.
+RULES_VERSION = "1"
+
+METADATA_FIELDS = ("Title", "Author", "Release date", "Language", "Original publication")
+
+Step = Tuple[str, Callable[[str], str]]
+
+
+class Substitution:
+    """A ``re.sub`` rule, compiled once."""
+
+    def __init__(self, pattern: str, repl, flags: int = 0):
+        self.pattern = re.compile(pattern, flags)
+        self.repl = repl
+
+    def __call__(self, text: str) -> str:
+        return self.pattern.sub(self.repl, text)
+
+    def subn(self, text: str) -> Tuple[str, int]:
+        return self.pattern.subn(self.repl, text)
+
+
+class MarkerSet:
+    """Markers that open a line, compiled into a single case-insensitive alternation.
+
+    A marker must be followed by a newline, a period or a colon, except the `open_markers`, which may
+    be followed by anything on their line (a word boundary aside). Markers keep their list order as
+    a priority: one scan of a window finds the best-placed match of the first marker that occurs in
+    it, as searching for each marker in turn would, so a longer list costs little more. Markers are
+    matched within a line and should not contain newlines.
+    """
+
+    def __init__(self, markers: Sequence[str], open_markers: Sequence[str] = ()):
+        open_markers = {marker.strip().upper() for marker in open_markers}
+        # A later duplicate can never win. Each alternative ends with an empty group, so that
+        # match.lastindex is its rank; a group in front would keep the regex engine from skipping
+        # the alternatives whose first character does not match.
+        self.markers = tuple(dict.fromkeys(markers))
+        alternatives = "|".join(
+            re.escape(marker) + (r"\b.*" if marker.strip().upper() in open_markers else r"(?=[\n\.:])") + "()"
+            for marker in self.markers
+        ) or "(?!)"
+        # Matches at the start of a line; `_after_newline` finds them past the first line with a fast
+        # search for the newline, which a leading (^|\n) would prevent.
+        self.line_pattern = re.compile(alternatives, re.IGNORECASE)
+        self._after_newline = re.compile(r"\n(?:" + alternatives + ")", re.IGNORECASE)
+
+    def _matches(self, text: str, endpos: int) -> Iterator[Match]:
+        """Every match in text[:endpos], starting on the newline before its line or at the very start."""
+        match = self.line_pattern.match(text, 0, endpos)
+        if match:
+            yield match
+        yield from self._after_newline.finditer(text, match.end() if match else 0, endpos)
+
+    def first(self, text: str, endpos: Optional[int] = None) -> Optional[Match]:
+        """The first match, in text[:endpos], of the highest-priority marker found there."""
+        best = None
+        for match in self._matches(text, len(text) if endpos is None else endpos):
+            if best is None or match.lastindex < best.lastindex:
+                best = match
+                if best.lastindex == 1:
+                    break
+        return best
+
+    def last(self, text: str) -> Optional[Match]:
+        """The last match of the highest-priority marker found in the text."""
+        best = None
+        for match in self._matches(text, len(text)):
+            if best is None or match.lastindex <= best.lastindex:
+                best = match
+        return best
+
+
+class CleaningPipeline:
+    """Precompiled version of the ``clean_up`` rule set.
+
+    All patterns are compiled once at construction. Rules that give the same result when
+    applied in a single pass are merged into one alternation (metadata fields, lone numeral
+    lines, ornament lines), and whitespace normalization runs as one pass over the lines.
+    The `beginnings` and `endings` markers are each compiled into a `MarkerSet`, in priority
+    order; `open_endings` are the ending markers that may be followed by more words on their line.
+    """
+
+    def __init__(self, beginnings: Sequence[str] = BEGINNING_MARKERS, endings: Sequence[str] = ENDING_MARKERS,
+                 open_endings: Sequence[str] = OPEN_ENDING_MARKERS):
+        self.beginnings = tuple(beginnings)
+        self.endings = tuple(endings)
+        self.open_endings = tuple(open_endings)
+
+        self._header_indicators = re.compile(r"(Produced by|Translated by)", re.IGNORECASE)
+        self._beginning_markers = MarkerSet(self.beginnings)
+        self._ending_markers = MarkerSet(self.endings, self.open_endings)
+
+        self.steps: List[Step] = [
+            ("header_block", self._remove_header_block),
+            ("metadata", Substitution(
+                r"^(?:" + "|".join(METADATA_FIELDS) + r"):.*$", "", re.MULTILINE | re.IGNORECASE
+            )),
+            ("markers", self._remove_markers),
+            ("underscores", lambda text: text.replace("_", "")),
+            ("rules", Substitution(r"[─|—]+\n", "")),
+            ("brackets", Substitution(r"\[.*?\]", "")),
+            ("repeated_periods", Substitution(r"\.\s*\.", ".")),
+            ("asterisk_pairs", Substitution(r"\*\s*\*", "")),
+            ("illustrations", Substitution(r"\[Illustration:\s*.*?\s*]", "", re.DOTALL)),
+            ("footnotes", Substitution(r"\[Footnotes:\s*.*?\s*]", "", re.DOTALL)),
+            ("footnote_numbers", Substitution(r"\.\s{2,}\d+\n", ".\n")),
+            ("headings", Substitution(
+                r"^\s*(?:(CHAPTER|BOOK|VOLUME|LIVRE|LETTER|CHAPITRE|TOME)\s+[IVXLCDM1234567890]+\.?|\d+?)\s*[:\.\s-]*(.*)\s*$",
+                "", re.MULTILINE | re.IGNORECASE
+            )),
+            ("ordinal_headings", Substitution(
+                r"(?mi)^\s*(chapitre|tome|livre|volume)\s+(" + "|".join(ORDINALS) + r")\s*[:\.\s-]*(.*)$", ""
+            )),
+            ("numeral_lines", Substitution(r"^\s*(?:[IVXLCDM]+|\d+)\.?\s*$", "", re.MULTILINE)),
+            ("dashes", self._standardize_dashes),
+            ("quotes", self._standardize_quotes),
+            ("line_breaks", Substitution(r"(?<![.!?])\n(?!\n)", " ")),
+            ("whitespace", self._normalize_lines),
+            ("chapter_markers", Substitution(
+                r"(?mi)^(?:chapter|chapitre)\s+(?:[ivxlcdm]+|premier)[:\.\s-]+(.*)$", r"\1"
+            )),
+            ("ornament_lines", Substitution(r"(?m)^\s*(?:\*[\s\*]*|[\.,:;\-]+)\s*$\n?", "")),
+        ]
+
+    def clean(self, text: str, profile: Optional[RuleProfile] = None) -> str:
+        """Run every step over the text and return the stripped result.
+
+        With a `profile`, the time, input/output length and match count of each step are recorded in it.
+        """
+        if profile is not None:
+            return self._profiled_clean(text, profile)
+        for _, step in self.steps:
+            text = step(text)
+        return text.strip()
+
+    def _profiled_clean(self, text: str, profile: RuleProfile) -> str:
+        for name, step in self.steps:
+            profile.current = name
+            start = time.perf_counter()
+            if isinstance(step, Substitution):
+                result, matches = step.subn(text)
+            else:
+                result, matches = step(text), None
+            profile.record(name, time.perf_counter() - start, len(text), len(result), matches)
+            text = result
+        return text.strip()
+
+    __call__ = clean
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash identifying the rule set: step names, compiled patterns and marker lists."""
+        digest = hashlib.sha256(RULES_VERSION.encode())
+        for marker in self.beginnings + ("",) + self.endings:
+            digest.update(marker.encode() + b"\0")
+        if self.open_endings != OPEN_ENDING_MARKERS:  # keeps the fingerprint of the default rule set
+            for marker in ("",) + self.open_endings:
+                digest.update(marker.encode() + b"\0")
+        for name, step in self.steps:
+            digest.update(name.encode() + b"\0")
+            if isinstance(step, Substitution):
+                digest.update(f"{step.pattern.pattern}\0{step.pattern.flags}\0{step.repl}\0".encode())
+        return digest.hexdigest()
+
+    # --- Steps that need more than a single substitution ---
+    def _remove_header_block(self, text: str) -> str:
+        """Drop everything up to the second occurrence of the first repeated uppercase line,
+        if the first 20% of the text mentions a producer or translator."""
+        if not self._header_indicators.search(text, 0, int(len(text) * 0.2)):
+            return text
+        lines = text.splitlines()
+        uppercase_occurrences: Dict[str, List[int]] = {}
+        for i, line in enumerate(lines):
+            cline = line.strip()
+            if cline and cline.isupper() and 3 < len(cline) < 100:
+                uppercase_occurrences.setdefault(cline, []).append(i)
+        for indices in uppercase_occurrences.values():
+            if len(indices) >= 2:
+                return "\n".join(lines[indices[1] + 1:])
+        return text
+
+    def _remove_markers(self, text: str) -> str:
+        """Cut the text after the first beginning marker found in its first 20%
+        and before the last ending marker found in its last 20%."""
+        # Both windows are measured on the text as it was before word joiners are removed.
+        total_length = len(text)
+        text = text.replace('\u2060', '')
+
+        match = self._beginning_markers.first(text, int(total_length * 0.2))
+        if match:
+            text = text[match.end():]
+
+        tail_start = int(total_length * 0.8)
+        match = self._ending_markers.last(text[tail_start:])
+        if match:
+            text = text[:tail_start + match.start()]
+        return text
+
+    _spaced_dash = re.compile(r"(^|\s)([-–—])(\s)")
+
+    def _standardize_dashes(self, text: str) -> str:
+        text = text.replace("--", "—")
+        text = self._spaced_dash.sub(r"\1—\3", text)
+        return text.replace("—", "— ")
+
+    @staticmethod
+    def _standardize_quotes(text: str) -> str:
+        return text.replace('«', '"').replace('»', '"').replace('“', '"').replace('”', '"')
+
+    @staticmethod
+    def _normalize_lines(text: str) -> str:
+        """Strip every line, collapse inner whitespace and drop blank lines."""
+        return "\n".join(" ".join(words) for words in map(str.split, text.splitlines()) if words)
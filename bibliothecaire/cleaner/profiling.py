@@ -0,0 +1,93 @@
+import csv
+import json
+import time
+from typing import Dict, List, Optional
+
+RULE_FIELDS = ("rule", "calls", "seconds", "max_seconds", "slowest_file", "chars_in", "chars_out", "matches")
+
+
+class RuleProfile:
+    """Per-rule statistics of a `CleaningPipeline`, filled by `pipeline.clean(text, profile=...)`.
+
+    For each named step it sums the wall time, input and output lengths and match count (substitution
+    steps only; None for steps implemented in Python) over every text cleaned, and remembers its
+    slowest call. Between `start_file` and `end_file`, the time of each rule is also kept per file.
+    Profiles are plain data, so those of worker processes can be sent back and combined with `merge`.
+    """
+
+    def __init__(self):
+        self.rules: Dict[str, dict] = {}
+        self.files: List[dict] = []
+        # The step being run; left set when cleaning is interrupted (e.g. by a timeout) inside it.
+        self.current: Optional[str] = None
+        self._file: Optional[dict] = None
+        self._file_start = 0.0
+
+    def record(self, rule: str, seconds: float, chars_in: int, chars_out: int, matches: Optional[int]) -> None:
+        stats = self.rules.get(rule)
+        if stats is None:
+            stats = self.rules[rule] = {
+                "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "slowest_file": None,
+                "chars_in": 0, "chars_out": 0, "matches": None,
+            }
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["chars_in"] += chars_in
+        stats["chars_out"] += chars_out
+        if matches is not None:
+            stats["matches"] = (stats["matches"] or 0) + matches
+        if seconds > stats["max_seconds"]:
+            stats["max_seconds"] = seconds
+            stats["slowest_file"] = self._file["file"] if self._file else None
+        if self._file is not None:
+            self._file["rules"][rule] = self._file["rules"].get(rule, 0.0) + seconds
+        self.current = None
+
+    def start_file(self, path: str) -> None:
+        self._file = {"file": path, "status": "ok", "seconds": 0.0, "interrupted_in": None, "rules": {}}
+        self._file_start = time.perf_counter()
+        self.current = None
+
+    def end_file(self, status: str = "ok") -> None:
+        """Close the record of the current file; `status` says how its cleaning ended."""
+        record, self._file = self._file, None
+        if record is None:
+            return
+        record["seconds"] = time.perf_counter() - self._file_start
+        record["status"] = status
+        record["interrupted_in"] = self.current
+        self.files.append(record)
+        self.current = None
+
+    def merge(self, other: "RuleProfile") -> None:
+        """Add the statistics of another profile to this one."""
+        for rule, theirs in other.rules.items():
+            stats = self.rules.setdefault(rule, dict(theirs, calls=0, seconds=0.0, max_seconds=0.0,
+                                                     chars_in=0, chars_out=0, matches=None))
+            for field in ("calls", "seconds", "chars_in", "chars_out"):
+                stats[field] += theirs[field]
+            if theirs["matches"] is not None:
+                stats["matches"] = (stats["matches"] or 0) + theirs["matches"]
+            if theirs["max_seconds"] > stats["max_seconds"]:
+                stats["max_seconds"] = theirs["max_seconds"]
+                stats["slowest_file"] = theirs["slowest_file"]
+        self.files.extend(other.files)
+
+    def to_dict(self) -> dict:
+        """The report: rules and files, slowest first."""
+        return {
+            "rules": sorted(({"rule": rule, **stats} for rule, stats in self.rules.items()),
+                            key=lambda row: row["seconds"], reverse=True),
+            "files": sorted(self.files, key=lambda row: row["seconds"], reverse=True),
+        }
+
+    def write(self, path: str) -> None:
+        """Write the report as CSV (one row per rule) if `path` ends with .csv, else as JSON."""
+        report = self.to_dict()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=RULE_FIELDS)
+                writer.writeheader()
+                writer.writerows(report["rules"])
+            else:
+                json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,304 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .dedup import Document, corpus_documents
+
+logger = logging.getLogger(__name__)
+
+STATS_NAME = "quality_stats.csv"
+REJECTED_DIR = ".rejected"
+# Files are read and tallied this many bytes at a time, so that very large texts do not fill the memory.
+BLOCK_SIZE = 16 * 1024 * 1024
+# Words are only counted on the first bytes of each block: plenty to tell the language, and the
+# slowest part of the tally otherwise.
+SAMPLE_SIZE = 256 * 1024
+# Files per worker task.
+BATCH_SIZE = 32
+
+# Byte classes. UTF-8 continuation bytes are not characters of their own; a lead byte stands for the
+# character it starts: Latin-1 letters (é, à, ç...), Latin Extended-A (œ), common symbols (« », nbsp,
+# dashes, curly quotes) or anything else (other scripts).
+OTHER, UPPER, LOWER, DIGIT, SPACE, NEWLINE, PUNCT, CONTINUATION, LATIN1, LATIN_EXT, SYMBOL, FOREIGN = range(12)
+N_CLASSES = 12
+
+
+def _byte_class(b: int) -> int:
+    if b in (9, 13, 32):
+        return SPACE
+    if b == 10:
+        return NEWLINE
+    if 48 <= b <= 57:
+        return DIGIT
+    if 65 <= b <= 90:
+        return UPPER
+    if 97 <= b <= 122:
+        return LOWER
+    if 33 <= b <= 126:
+        return PUNCT
+    if 0x80 <= b <= 0xBF:
+        return CONTINUATION
+    if b == 0xC3:
+        return LATIN1
+    if b in (0xC4, 0xC5):
+        return LATIN_EXT
+    if b in (0xC2, 0xE2):
+        return SYMBOL
+    return FOREIGN if b >= 0xC0 else OTHER
+
+
+BYTE_CLASSES = bytes(_byte_class(b) for b in range(256))
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """
+    NumPy and the byte-to-class matrix, imported on first use so that cleaning without quality checks does
+    not pay for it; None without NumPy (`pip install .[numpy]`), byte classes are then counted with bytes.translate.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    return np, np.eye(N_CLASSES, dtype=np.int64)[list(BYTE_CLASSES)]
+
+
+FRENCH_WORDS = (b" de ", b" la ", b" le ", b" et ", b" les ", b" des ", b" que ", b" il ", b" une ")
+ENGLISH_WORDS = (b" the ", b" and ", b" of ", b" to ", b" was ", b" that ", b" with ")
+# Leftovers of the headers, licences and page furniture the cleaner is meant to remove.
+BOILERPLATE = (b"Gutenberg", b"GUTENBERG", b"Wikisource", b"http", b"www.", b"[Illustration", b"ISBN")
+REPLACEMENT_CHAR = "�".encode("utf-8")
+
+FEATURES = (
+    "bytes", "chars", "letter_ratio", "upper_ratio", "digit_ratio", "space_ratio", "punct_ratio",
+    "accent_ratio", "foreign_ratio", "replacement_ratio", "french_ratio", "function_word_ratio",
+    "boilerplate_per_10k",
+)
+# Features that count bytes or characters; the others are ratios.
+COUNT_FEATURES = ("bytes", "chars")
+# Bounds (minimum, maximum; None for none) a text must stay within to be kept.
+THRESHOLDS: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "chars": (1000, None),
+    "letter_ratio": (0.6, None),
+    "digit_ratio": (None, 0.05),
+    "foreign_ratio": (None, 0.05),
+    "replacement_ratio": (None, 0.001),
+    "french_ratio": (0.5, None),
+    "function_word_ratio": (0.03, None),
+    "boilerplate_per_10k": (None, 10.0),
+}
+
+
+def _class_counts(blocks: Sequence[bytes]) -> List[List[int]]:
+    """Number of bytes of each class in each block."""
+    loaded = _numpy()
+    if loaded is None:
+        counts = []
+        for block in blocks:
+            classes = block.translate(BYTE_CLASSES)
+            counts.append([classes.count(k) for k in range(N_CLASSES)])
+        return counts
+    np, class_matrix = loaded
+    histograms = np.stack([np.bincount(np.frombuffer(block, dtype=np.uint8), minlength=256) for block in blocks])
+    return (histograms @ class_matrix).tolist()
+
+
+def _tallies(blocks: Sequence[bytes]) -> List[List[int]]:
+    """
+    Additive counts of each block: size, byte classes, replacement characters and boilerplate, then
+    French function words, English ones and words in its sample.
+    """
+    tallies = []
+    for block, counts in zip(blocks, _class_counts(blocks) if blocks else []):
+        sample = block[:SAMPLE_SIZE]
+        tallies.append([
+            len(block), *counts,
+            block.count(REPLACEMENT_CHAR),
+            sum(block.count(marker) for marker in BOILERPLATE),
+            sum(sample.count(word) for word in FRENCH_WORDS),
+            sum(sample.count(word) for word in ENGLISH_WORDS),
+            sample.count(b" ") + sample.count(b"\n"),
+        ])
+    return tallies
+
+
+def _features(tally: Sequence[int]) -> Dict[str, float]:
+    size, counts = tally[0], tally[1:1 + N_CLASSES]
+    replacement, boilerplate, french, english, words = tally[1 + N_CLASSES:]
+    chars = size - counts[CONTINUATION]
+    letters = counts[UPPER] + counts[LOWER] + counts[LATIN1] + counts[LATIN_EXT]
+    per_char = 1 / chars if chars else 0.0
+    return {
+        "bytes": size,
+        "chars": chars,
+        "letter_ratio": letters * per_char,
+        "upper_ratio": counts[UPPER] / letters if letters else 0.0,
+        "digit_ratio": counts[DIGIT] * per_char,
+        "space_ratio": (counts[SPACE] + counts[NEWLINE]) * per_char,
+        "punct_ratio": (counts[PUNCT] + counts[SYMBOL]) * per_char,
+        "accent_ratio": counts[LATIN1] / letters if letters else 0.0,
+        "foreign_ratio": counts[FOREIGN] * per_char,
+        "replacement_ratio": replacement * per_char,
+        "french_ratio": french / (french + english) if french + english else 0.0,
+        "function_word_ratio": french / words if words else 0.0,
+        "boilerplate_per_10k": boilerplate * 10000 * per_char,
+    }
+
+
+def batch_stats(texts: Sequence[bytes]) -> List[Dict[str, float]]:
+    """Features of a batch of UTF-8 encoded texts."""
+    return [_features(tally) for tally in _tallies(texts)]
+
+
+def _file_stats(paths: Sequence[str]) -> List[Dict[str, float]]:
+    """
+    Features of a batch of UTF-8 files, read `BLOCK_SIZE` bytes at a time. Blocks are tallied together
+    (small files in one go) as soon as they add up to `BLOCK_SIZE` bytes, then dropped, so memory does
+    not grow with the size of the files.
+    """
+    totals = [[0] * (1 + N_CLASSES + 5) for _ in paths]
+    blocks: List[bytes] = []
+    owners: List[int] = []
+
+    def tally() -> None:
+        for i, block_tally in zip(owners, _tallies(blocks)):
+            totals[i] = [a + b for a, b in zip(totals[i], block_tally)]
+        blocks.clear()
+        owners.clear()
+
+    held = 0
+    for i, path in enumerate(paths):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                blocks.append(block)
+                owners.append(i)
+                held += len(block)
+                if held >= BLOCK_SIZE:
+                    tally()
+                    held = 0
+    tally()
+    return [_features(total) for total in totals]
+
+
+def check(stats: Dict[str, float], thresholds: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> List[str]:
+    """The thresholds a text's features break, as readable reasons; empty if it passes."""
+    reasons = []
+    for feature, (low, high) in (thresholds or THRESHOLDS).items():
+        value = stats[feature]
+        if low is not None and value < low:
+            reasons.append(f"{feature} {value:.4g} < {low:g}")
+        if high is not None and value > high:
+            reasons.append(f"{feature} {value:.4g} > {high:g}")
+    return reasons
+
+
+def load_thresholds(path: str) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """The default thresholds updated from a JSON file of `{"feature": [min, max]}`, null for no bound."""
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown quality feature(s) in {path}: {', '.join(sorted(unknown))}")
+    return {**THRESHOLDS, **{feature: tuple(bounds) for feature, bounds in overrides.items()}}
+
+
+def _previous_stats(table_path: str) -> Dict[Tuple[str, int, int], Dict[str, float]]:
+    """
+    Features of the last run's table, keyed by path, size and mtime: still valid for unchanged files.
+    Counts are read back as integers, also from older tables that wrote them as floats ("53547.0").
+    """
+    known = {}
+    if os.path.isfile(table_path):
+        with open(table_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    stats = {feature: float(row[feature]) for feature in FEATURES}
+                    for feature in COUNT_FEATURES:
+                        stats[feature] = int(stats[feature])
+                    known[(row["path"], stats["bytes"], int(row["mtime_ns"]))] = stats
+                except (KeyError, ValueError):
+                    continue
+    return known
+
+
+def assess(
+    documents: Sequence[Document],
+    thresholds: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    workers: int = 1,
+    table_path: Optional[str] = None,
+) -> List[List[str]]:
+    """
+    Compute the features of every document and check them against the thresholds. Files are tallied in
+    batches by `workers` processes. With `table_path`, a CSV of every document's features and verdict is
+    written there, and the features of files unchanged since the table was last written are reused. Ratios
+    are written unrounded, so reused features give the same verdicts as computed ones.
+    Returns the reasons each document was rejected for, in order (empty lists for those kept).
+    """
+    known = _previous_stats(table_path) if table_path else {}
+    results: List[Optional[Dict[str, float]]] = [None] * len(documents)
+    mtimes = []
+    for i, document in enumerate(documents):
+        stat = os.stat(document.path)
+        mtimes.append(stat.st_mtime_ns)
+        results[i] = known.get((document.rel_path, stat.st_size, stat.st_mtime_ns))
+    missing = [i for i, stats in enumerate(results) if stats is None]
+
+    batches = [missing[k:k + BATCH_SIZE] for k in range(0, len(missing), BATCH_SIZE)]
+    tasks = [[documents[i].path for i in batch] for batch in batches]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            computed = list(executor.map(_file_stats, tasks))
+    else:
+        computed = [_file_stats(task) for task in tasks]
+    for batch, batch_results in zip(batches, computed):
+        for i, stats in zip(batch, batch_results):
+            results[i] = stats
+
+    verdicts = [check(stats, thresholds) for stats in results]
+    if table_path:
+        with open(table_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("path", "source", "mtime_ns", *FEATURES, "kept", "reasons"))
+            for document, mtime, stats, reasons in zip(documents, mtimes, results, verdicts):
+                writer.writerow((document.rel_path, document.source or "", mtime,
+                                 *(stats[feature] for feature in FEATURES),
+                                 int(not reasons), "; ".join(reasons)))
+    return verdicts
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=f"Compute quality features of the texts under a folder and move those that fail to {REJECTED_DIR}/."
+    )
+    parser.add_argument("folder")
+    parser.add_argument("--thresholds", metavar="JSON",
+                        help='JSON file of bounds overriding the default ones, e.g. {"chars": [5000, null]}')
+    parser.add_argument("--table", help=f"where to write the features (default: FOLDER/{STATS_NAME})")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="processes computing features (0 = one per CPU)")
+    parser.add_argument("--dry-run", action="store_true", help="only write the table")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    documents = corpus_documents(args.folder)
+    verdicts = assess(documents, load_thresholds(args.thresholds) if args.thresholds else None,
+                      workers=args.workers or os.cpu_count() or 1,
+                      table_path=args.table or os.path.join(args.folder, STATS_NAME))
+    for document, reasons in zip(documents, verdicts):
+        if reasons:
+            logger.info(f"Rejected {document.rel_path}: {'; '.join(reasons)}")
+            if not args.dry_run:
+                target = os.path.join(args.folder, REJECTED_DIR, document.rel_path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(document.path, target)
+    logger.info(f"{sum(map(bool, verdicts))} of {len(documents)} text(s) rejected")
+
+
+if __name__ == "__main__":
+    main()
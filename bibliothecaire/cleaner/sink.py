@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from .. import metrics
+from .clean_up import (
+    STREAM_ABOVE, CleaningTimeout, _atomic_output, _default_pipeline, _time_limit, process_file, process_text,
+    stream_file,
+)
+from .manifest import Manifest
+
+logger = logging.getLogger(__name__)
+
+
+def _clean_saved(task: Tuple[str, Optional[str], str, Optional[int], Optional[float]]) -> Tuple[Optional[str], bool]:
+    """Clean one downloaded work into `output_file`; return the error, if any, and whether it timed out.
+
+    A work whose `text` came along is cleaned from memory; otherwise its file is read once (streamed
+    above `stream_above` bytes). The output is replaced atomically, so a worker that dies midway leaves
+    no partial file for a later `process_directory` run to take for a cleaned one.
+    """
+    input_file, text, output_file, stream_above, timeout = task
+    try:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with _time_limit(timeout):
+            if text is None and stream_above is not None and os.path.getsize(input_file) > stream_above:
+                stream_file(input_file, output_file)
+                return None, False
+            if text is None:
+                cleaned_text = process_file(input_file)
+            else:
+                cleaned_text = process_text(text, os.path.basename(input_file))
+        with _atomic_output(output_file) as f_out:
+            f_out.write(cleaned_text)
+    except Exception as e:
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        if isinstance(e, CleaningTimeout):
+            return str(e), True
+        return f"{type(e).__name__}: {e}", False
+    return None, False
+
+
+class CleaningSink:
+    """Clean works as the downloaders save them, instead of in a second pass over the downloads.
+
+    Pass it as the `sink` of a downloader (or of `CombinedDownloader`): every saved work is handed to a
+    pool of `workers` cleaning processes (0 for one per CPU), and its cleaned text is written to
+    `output_dir` under the same relative path as in `downloads_dir`, as `process_directory` would.
+    A work already in memory (Wikisource) is cleaned from that text; a work streamed to disk (Gutenberg)
+    is read once, by the cleaner, since the downloader already hashed it.
+
+    At most `max_pending` works (by default twice the workers) are waiting or being cleaned; handing
+    over one more blocks the downloader until a worker is free, so memory stays bounded when cleaning
+    falls behind the network.
+
+    Cleaned works are recorded in the manifest of `output_dir` with the hash the downloader computed,
+    so a later `process_directory(downloads_dir, output_dir)` skips them. Works that could not be
+    cleaned within `timeout` seconds are quarantined there. Use it as a context manager, or call
+    `close` to wait for the last works and save the manifest:
+
+        with CleaningSink("downloads", "cleaned_texts") as sink:
+            CombinedDownloader("downloads", sink=sink).download_all("Victor Hugo")
+    """
+
+    def __init__(self, downloads_dir: str, output_dir: str, workers: int = 0, max_pending: Optional[int] = None,
+                 stream_above: Optional[int] = STREAM_ABOVE, timeout: Optional[float] = None):
+        self.downloads_dir = downloads_dir
+        self.output_dir = output_dir
+        self.stream_above = stream_above
+        self.timeout = timeout
+        workers = workers or os.cpu_count() or 1
+        os.makedirs(output_dir, exist_ok=True)
+        self.manifest = Manifest(output_dir, _default_pipeline.fingerprint)
+        self.errors: Dict[str, str] = {}
+        self.cleaned = 0
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * workers)
+        self._lock = threading.Lock()
+
+    def __call__(self, saved) -> None:
+        """Queue a saved work (a `SavedText`) for cleaning, waiting for a free slot if the queue is full."""
+        input_file = str(saved.path)
+        output_file = os.path.join(self.output_dir, os.path.relpath(input_file, self.downloads_dir))
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(
+                _clean_saved, (input_file, saved.text, output_file, self.stream_above, self.timeout)
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda done: self._done(input_file, output_file, saved.sha256, done))
+
+    def _done(self, input_file: str, output_file: str, digest: str, future: Future) -> None:
+        self._slots.release()
+        try:
+            error, timed_out = future.result()
+        except Exception as e:  # the worker died
+            error, timed_out = f"{type(e).__name__}: {e}", False
+        rel_path = os.path.relpath(input_file, self.downloads_dir)
+        with self._lock:
+            try:
+                stat = os.stat(input_file)
+            except OSError as e:
+                error = error or f"{type(e).__name__}: {e}"
+                stat = None
+            outcome = "timeout" if timed_out else "error" if error else "cleaned"
+            metrics.inc(metrics.FILES_CLEANED, outcome=outcome)
+            metrics.event("file", path=rel_path, outcome=outcome, error=error)
+            if error:
+                self.errors[input_file] = error
+                if timed_out and stat:
+                    self.manifest.quarantine(rel_path, stat, error)
+                    logger.error(f"Quarantined {input_file}: {error}")
+                else:
+                    self.manifest.forget(rel_path)
+                    logger.error(f"Error processing {input_file}: {error}")
+                return
+            self.manifest.record(rel_path, stat, digest)
+            self.cleaned += 1
+        logger.info(f"Cleaned file saved to: {output_file}")
+
+    def close(self) -> Dict[str, str]:
+        """Wait for the queued works and save the manifest; return each input that failed with its error."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self.manifest.save()
+        logger.info(f"Cleaned {self.cleaned} downloaded work(s), {len(self.errors)} error(s)")
+        return self.errors
+
+    def __enter__(self) -> "CleaningSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,317 @@
+import codecs
+import io
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .pipeline import CleaningPipeline
+
+READ_SIZE = 1 << 16
+CHUNK_SIZE = 1 << 20
+
+# The steps `StreamingCleaner` knows how to split; the first three need the whole text and are
+# replayed from head/tail scans, the others run chunk by chunk.
+STEP_NAMES = (
+    "header_block", "metadata", "markers",
+    "underscores", "rules", "brackets", "repeated_periods", "asterisk_pairs", "illustrations", "footnotes",
+    "footnote_numbers", "headings", "ordinal_headings", "numeral_lines", "dashes", "quotes",
+    "line_breaks", "whitespace", "chapter_markers", "ornament_lines",
+)
+WHOLE_LINE_STEPS = ("headings", "ordinal_headings", "numeral_lines", "chapter_markers", "ornament_lines")
+# Substitutions that must not reach the line before a cut; the steps in between only rewrite
+# characters a plain line does not contain.
+CHECKED_STEPS = ("rules", "brackets", "repeated_periods", "asterisk_pairs", "illustrations", "footnotes",
+                 "footnote_numbers", "headings", "ordinal_headings", "numeral_lines")
+# Multi-line removals: an opener with no closing bracket after it may run into the next chunk.
+OPENERS = {"illustrations": "[Illustration:", "footnotes": "[Footnotes:"}
+
+# Characters or sequences that some chunk step rewrites, and whitespace other than plain spaces.
+UNSAFE_IN_LINE = re.compile(r"[\[\]_*─|—–«»“”\u2060]|--|\s-\s|\.\s*\.|[^\S ]")
+
+Source = Callable[[], Iterable[str]]
+
+
+def read_text(path: str, size: int = READ_SIZE, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """
+    Read the bytes `start` to `end` of a UTF-8 file as text, decoding `size` bytes at a time,
+    with the same newline handling as `open().read()`.
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while True:
+            data = f.read(size if remaining is None else min(size, remaining))
+            if remaining is not None:
+                remaining -= len(data)
+            piece = decoder.decode(data, final=not data)
+            if piece:
+                yield piece
+            if not data:
+                return
+
+
+def text_blocks(pieces: Iterable[str]) -> Iterator[str]:
+    """Regroup pieces of text into blocks of whole lines: every block but the last ends with a newline."""
+    carry: List[str] = []
+    for piece in pieces:
+        cut = piece.rfind("\n") + 1
+        if cut:
+            carry.append(piece[:cut])
+            yield "".join(carry)
+            carry = [piece[cut:]] if cut < len(piece) else []
+        elif piece:
+            carry.append(piece)
+    if carry:
+        yield "".join(carry)
+
+
+def text_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """Split pieces of text into lines, keeping their newline (the last line may have none)."""
+    for block in text_blocks(pieces):
+        start = 0
+        while start < len(block):
+            end = block.find("\n", start) + 1 or len(block)
+            yield block[start:end]
+            start = end
+
+
+def text_range(pieces: Iterable[str], start: int, end: Optional[int]) -> Iterator[str]:
+    """Streaming `text[start:end]`."""
+    offset = 0
+    for piece in pieces:
+        low, high = max(start - offset, 0), len(piece) if end is None else min(end - offset, len(piece))
+        if low < high:
+            yield piece[low:high]
+        offset += len(piece)
+        if end is not None and offset >= end:
+            return
+
+
+def joined_lines(pieces: Iterable[str], first: int) -> Iterator[str]:
+    """Streaming `"\\n".join(text.splitlines()[first:])`."""
+    index, separator = 0, ""
+    for block in text_blocks(pieces):
+        lines = block.splitlines()
+        kept = lines[max(0, first - index):]
+        index += len(lines)
+        if kept:
+            yield separator + "\n".join(kept)
+            separator = "\n"
+
+
+def strip_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """Streaming `str.strip`: drop leading whitespace, and hold trailing whitespace back until more text follows."""
+    started, held = False, ""
+    for piece in pieces:
+        if not started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            started = True
+        body = piece.rstrip()
+        if body:
+            yield held + body
+            held = piece[len(body):]
+        else:
+            held += piece
+
+
+class StreamingCleaner:
+    """
+    Run a `CleaningPipeline` over a text too large to hold in memory, with the same result as `clean`.
+
+    The text comes from `source`, a callable returning a fresh iterator of pieces, and is read a few
+    times: once to measure it, once to find where the header block and the beginning/ending markers
+    cut it (only the lines of the head and tail windows are matched), and once to clean it. The body
+    is cut into chunks of about `chunk_size` characters between two plain prose lines (no character any
+    rule rewrites, ending a sentence, not a heading), next to each other or a blank line apart, which no
+    rule can match across;
+    each chunk runs through the remaining steps on its own. If a cut turns out to be unsafe while its
+    chunk is cleaned (the line before it was rewritten, or an illustration is left open), the chunk
+    is merged with the next one. Memory use is bounded by a few chunks and the longest line.
+    """
+
+    def __init__(self, pipeline: Optional[CleaningPipeline] = None, chunk_size: int = CHUNK_SIZE):
+        self.pipeline = pipeline or CleaningPipeline()
+        self.chunk_size = chunk_size
+        names = tuple(name for name, _ in self.pipeline.steps)
+        if names != STEP_NAMES:
+            raise ValueError(f"Streaming needs the default cleaning steps, got {names}")
+        steps = dict(self.pipeline.steps)
+        self._metadata = steps["metadata"]
+        self._chunk_steps = self.pipeline.steps[STEP_NAMES.index("markers") + 1:]
+        self._whole_line_patterns = [steps[name].pattern for name in WHOLE_LINE_STEPS]
+
+        # The marker alternations, matched at the start of each line.
+        self._beginnings = self.pipeline._beginning_markers.line_pattern
+        self._endings = self.pipeline._ending_markers.line_pattern
+
+    def clean(self, source: Source, write: Callable[[str], None]) -> None:
+        """Clean the text streamed by `source`, passing the result to `write` piece by piece."""
+        first_line = self._header_end(source)
+
+        def stage() -> Iterator[str]:
+            return self._without_header(source, first_line)
+
+        begin, end = self._marker_bounds(stage)
+        previous, pending = None, ""
+        for chunk, last_line in self._chunks(self._body(stage, begin, end)):
+            pending += chunk
+            cleaned = self._clean_chunk(pending, last_line)
+            if cleaned is None:
+                continue
+            pending = ""
+            if previous is None:
+                cleaned = cleaned.lstrip()
+            else:
+                write(previous + "\n")
+            previous = cleaned
+        write(previous.rstrip())
+
+    # --- Steps that need the whole text ---
+    def _header_end(self, source: Source) -> Optional[int]:
+        """Index of the first line the header block step keeps, or None if it keeps the text as it is."""
+        length, indicator_end = 0, None
+        for block in text_blocks(source()):
+            if indicator_end is None:
+                match = self.pipeline._header_indicators.search(block)
+                if match:
+                    indicator_end = length + match.end()
+            length += len(block)
+        if indicator_end is None or indicator_end > int(length * 0.2):
+            return None
+
+        uppercase_occurrences: Dict[str, List[int]] = {}
+        index = 0
+        for block in text_blocks(source()):
+            for line in block.splitlines():
+                cline = line.strip()
+                if cline and cline.isupper() and 3 < len(cline) < 100:
+                    indices = uppercase_occurrences.setdefault(cline, [])
+                    if len(indices) < 2:
+                        indices.append(index)
+                index += 1
+        for indices in uppercase_occurrences.values():
+            if len(indices) >= 2:
+                return indices[1] + 1
+        return None
+
+    def _without_header(self, source: Source, first_line: Optional[int]) -> Iterator[str]:
+        """The text as the header block and metadata steps leave it."""
+        pieces = text_blocks(source()) if first_line is None else joined_lines(source(), first_line)
+        for piece in pieces:
+            # Pieces hold whole lines, which is all the metadata substitution looks at.
+            yield self._metadata(piece)
+
+    def _marker_bounds(self, stage: Source) -> Tuple[int, Optional[int]]:
+        """Where the markers step cuts the text once its word joiners are removed: (start, end or None)."""
+        total_length = sum(len(block) for block in stage())
+        head_end, tail_start = int(total_length * 0.2), int(total_length * 0.8)
+        # (rank of the marker, position) of the cuts found so far: markers earlier in their list win,
+        # then the first beginning and the last ending of that marker.
+        beginning: Optional[Tuple[int, int]] = None
+        ending: Optional[Tuple[int, int]] = None
+        begin, tail = 0, None
+        offset = 0
+        for line in text_lines(block.replace("\u2060", "") for block in stage()):
+            end = offset + len(line)
+            if offset < head_end:
+                match = self._beginnings.match(line, 0, head_end - offset)
+                if match and (beginning is None or match.lastindex < beginning[0]):
+                    beginning = (match.lastindex, offset + match.end())
+            if tail is None and end >= head_end:
+                # No later line starts in the head window: the beginning cut is settled.
+                begin = beginning[1] if beginning else 0
+                tail = begin + tail_start
+            if tail is not None and end > tail:
+                # A match starts either on the newline before a line or right at the window start.
+                if offset > tail:
+                    segment, start = line, offset - 1
+                else:
+                    segment, start = line[tail - offset:], tail
+                match = self._endings.match(segment)
+                if match and (ending is None or match.lastindex <= ending[0]):
+                    ending = (match.lastindex, start)
+            offset = end
+        if tail is None:
+            begin = beginning[1] if beginning else 0
+        return begin, ending[1] if ending else None
+
+    @staticmethod
+    def _body(stage: Source, begin: int, end: Optional[int]) -> Iterator[str]:
+        """The text between the marker cuts, without word joiners."""
+        return text_range((block.replace("\u2060", "") for block in stage()), begin, end)
+
+    # --- Chunked steps ---
+    def _is_plain(self, line: str) -> bool:
+        """Whether no chunk step can rewrite the line or match across its ends."""
+        return (
+            len(line) > 1 and line[0].isalpha() and line[-1] in ".!?"
+            and not UNSAFE_IN_LINE.search(line)
+            and not any(pattern.search(line) for pattern in self._whole_line_patterns)
+        )
+
+    def _chunks(self, pieces: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Cut the body into chunks of at least `chunk_size` characters, each ending with a plain line
+        followed by another plain line, right away or after a single blank line. A plain line ends a
+        sentence, so line_breaks does not join it to the next one, even without a blank line between
+        them (as in texts saved one paragraph per line). Yields (chunk, its last line) pairs; the last
+        chunk, which takes whatever is left, comes with None.
+        """
+        buffer, searched = "", 0
+        for piece in pieces:
+            buffer += piece
+            while len(buffer) > self.chunk_size:
+                position = buffer.find("\n", max(searched, self.chunk_size))
+                cut = None
+                while position != -1:
+                    # The next line starts right after this newline, or after a single blank line.
+                    start = position + 2 if buffer.startswith("\n\n", position) else position + 1
+                    next_end = buffer.find("\n", start)
+                    if next_end == -1:
+                        break
+                    line = buffer[buffer.rfind("\n", 0, position) + 1:position]
+                    if self._is_plain(line) and self._is_plain(buffer[start:next_end]):
+                        cut = position + 1
+                        break
+                    position = buffer.find("\n", position + 1)
+                if cut is None:
+                    searched = len(buffer) - 1 if position == -1 else position
+                    break
+                yield buffer[:cut], line
+                buffer, searched = buffer[cut:], 0
+        yield buffer, None
+
+    def _clean_chunk(self, text: str, last_line: Optional[str]) -> Optional[str]:
+        """
+        Run the chunk steps; None if the cut after `last_line` proves unsafe on the way, i.e. if a rule
+        matches into that line before line_breaks has run, or if the line does not end the result.
+        """
+        if last_line is None:
+            for _, step in self._chunk_steps:
+                text = step(text)
+            return text
+
+        for name, step in self._chunk_steps:
+            if name not in CHECKED_STEPS:
+                text = step(text)
+                continue
+            opener = OPENERS.get(name)
+            if opener:
+                start = text.rfind(opener)
+                if start != -1 and text.find("]", start) == -1:
+                    return None
+            # Start of the newline before the last line (which earlier steps left in place).
+            limit = max(len(text) - len(last_line) - 2, 0)
+            touched = False
+
+            def replace(match: "re.Match") -> str:
+                nonlocal touched
+                touched = touched or match.end() > limit
+                return match.expand(step.repl)
+
+            text = step.pattern.sub(replace, text)
+            if touched:
+                return None
+        return text if text.endswith(last_line) else None
@@ -0,0 +1,48 @@
+"""The `bibliothecaire` command.
+
+Only the module of the subcommand that is run gets imported, so cleaning starts without loading the
+network stack, and each subcommand parses its own options:
+
+    bibliothecaire download authors.txt -o downloads -w 8
+    bibliothecaire clean downloads cleaned_texts -w 0
+    bibliothecaire clean --help
+"""
+import importlib
+import sys
+from typing import List, Optional
+
+# Subcommand: (module whose `main(argv, prog)` runs it, summary).
+COMMANDS = {
+    "download": ("bibliothecaire.downloaders.combined_downloader", "download the works of the authors listed in a file"),
+    "clean": ("bibliothecaire.cleaner.clean_up", "clean every .txt file under a directory"),
+    "dedup": ("bibliothecaire.cleaner.dedup", "set aside near-duplicate texts in a cleaned folder"),
+    "quality": ("bibliothecaire.cleaner.quality", "score the texts of a cleaned folder and set aside the junk"),
+    "index": ("bibliothecaire.cleaner.index", "build or search a full-text index of a cleaned folder"),
+}
+
+
+def usage() -> str:
+    width = max(map(len, COMMANDS))
+    commands = "\n".join(f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items())
+    return (
+        "usage: bibliothecaire COMMAND [options]\n\n"
+        f"commands:\n{commands}\n\n"
+        "Run `bibliothecaire COMMAND --help` for the options of a command."
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage(), file=sys.stdout if argv else sys.stderr)
+        sys.exit(0 if argv else 2)
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"{usage()}\n\nbibliothecaire: unknown command {command!r}", file=sys.stderr)
+        sys.exit(2)
+    module = importlib.import_module(COMMANDS[command][0])
+    module.main(rest, prog=f"bibliothecaire {command}")
+
+
+if __name__ == "__main__":
+    main()
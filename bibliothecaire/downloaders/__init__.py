@@ -1,3 +1,29 @@
-from .gutenberg_downloader import GutenbergDownloader
-from .wikisource_downloader import WikisourceDownloader
-from .combined_downloader import CombinedDownloader
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# The downloaders are imported on first use (PEP 562): importing a helper module of this package,
+# such as `sessions` or `ledger`, does not load all of them.
+_EXPORTS = {
+    "GutenbergDownloader": ".gutenberg_downloader",
+    "WikisourceDownloader": ".wikisource_downloader",
+    "CombinedDownloader": ".combined_downloader",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .gutenberg_downloader import GutenbergDownloader
+    from .wikisource_downloader import WikisourceDownloader
+    from .combined_downloader import CombinedDownloader
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
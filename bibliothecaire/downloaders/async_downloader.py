@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import random
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+from requests import Response
+
+from .. import metrics
+from .base_downloader import BaseDownloader
+from .utils import SavedFile
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBaseDownloader(BaseDownloader):
+    """
+    Downloader with an asyncio engine next to the blocking one.
+
+    `adownload` processes all works of an author concurrently. At most `max_concurrency` works are in
+    progress and `max_concurrency` requests in flight per host. A work keeps its slot through the polite
+    delay that follows it, so each slot paces its requests like the sequential `download` does, and with
+    max_concurrency=1 the request pattern is the same. Retry backoff and delays are awaited instead of
+    slept, and the blocking HTTP calls and HTML parsing run on a small thread pool so the event loop
+    never waits on a socket or a parser.
+    """
+
+    def __init__(self, *args, max_concurrency: int = 4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._work_slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _check_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._slots_loop:
+            # Semaphores must not outlive the event loop they were used on.
+            self._host_slots, self._work_slots, self._slots_loop = {}, None, loop
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        self._check_loop()
+        host = urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_concurrency)
+        return self._host_slots[host]
+
+    def _work_slot(self) -> asyncio.Semaphore:
+        self._check_loop()
+        if self._work_slots is None:
+            self._work_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._work_slots
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fetch")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _athrottle(self) -> None:
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+
+    async def _aretry_fetch(self, url: str) -> Optional[Response]:
+        async with self._host_slot(url):
+            cached, stale = await self._run_blocking(self._cached, url)
+            if cached:
+                return cached
+            return await self._aretry(url, partial(self._fetch, url, stale))
+
+    async def _aretry_download(self, url: str, path: Path) -> Optional[SavedFile]:
+        async with self._host_slot(url):
+            saved, stale = await self._run_blocking(self._cached_download, url, path)
+            if saved:
+                return saved
+            return await self._aretry(url, partial(self._download, url, path, stale))
+
+    async def _aretry(self, url: str, attempt_once: Callable[[], Any]) -> Any:
+        """`_retry` with the attempts run on the thread pool and the backoff awaited."""
+        attempt = 0  # with no retries, nothing is fetched
+        for attempt in range(1, self.retries + 1):
+            logger.info(f"Fetching: {url} (attempt {attempt}/{self.retries})")
+            if attempt > 1:
+                metrics.inc(metrics.HTTP_RETRIES, source=self.source)
+            error = None
+            try:
+                await self._athrottle()
+                result = await self._run_blocking(attempt_once)
+                if result:
+                    return result
+            except Exception as e:
+                logger.warning(f"Fetch failed for {url}: {e}")
+                error = e
+            sleep_time = self._backoff(url, attempt, error)
+            if sleep_time is None or attempt == self.retries:
+                break
+            if sleep_time:
+                logger.warning(f"Retry {attempt} failed. Sleeping {sleep_time:.2f}s...")
+                await asyncio.sleep(sleep_time)
+        logger.error(f"Failed after {attempt} attempt(s): {url}")
+        return None
+
+    async def _ahand_over(self, path: Path, sha256: Optional[str] = None, text: Optional[str] = None) -> None:
+        """`_hand_over` on a fetch thread, so that a sink that blocks holds back fetches, not the event loop."""
+        if self.sink is not None:
+            await self._run_blocking(self._hand_over, path, sha256, text)
+
+    async def _adelay(self, response: Union[Response, SavedFile, None] = None) -> None:
+        if self.enable_delay and not self.rate_limiter and not self.host_limiter and not getattr(response, "from_cache", False):
+            await asyncio.sleep(random.uniform(*self.delay_range))
+
+    async def adownload(self, author_name: str) -> None:
+        """Download all works of an author concurrently."""
+        author_folder = self._author_folder(author_name)
+        works = await self._alist_works(author_name)
+        if works is None:
+            return
+        results = await asyncio.gather(
+            *(self._arun_work(*work, author_folder) for work in works), return_exceptions=True
+        )
+        for work, result in zip(works, results):
+            if isinstance(result, Exception):
+                self._work_failed(work, result)
+
+    async def _alist_works(self, author_name: str) -> Optional[List[tuple]]:
+        """Asynchronous `_list_works`."""
+        works = self._known_works(author_name)
+        if works is None:
+            works = self._record_works(author_name, await self._adiscover(author_name))
+            if works is None:
+                return None
+        return self._pending_works(works)
+
+    async def _arun_work(self, *args) -> None:
+        """Process a work in one of the `max_concurrency` work slots, held until its polite delay is over."""
+        async with self._work_slot():
+            await self._aprocess_work(*args)
+
+    @abstractmethod
+    async def _adiscover(self, author_name: str) -> Optional[List[tuple]]:
+        """Asynchronous `_discover`."""
+
+    @abstractmethod
+    async def _aprocess_work(self, *args, **kwargs) -> None:
+        pass
@@ -1,13 +1,25 @@
+import hashlib
 import logging
 import random
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
 
+import requests
 from requests import Response
 
-from .utils import sanitize_filename, fetch_page
+from .. import metrics
+from .cache import ResponseCache
+from .ledger import DONE_STATES, FAILED, JobLedger
+from .rate_limit import RETRYABLE_STATUSES, THROTTLE_STATUSES, AdaptiveLimiter, TokenBucket, retry_after
+from .sessions import SessionPool, default_session_pool
+from .utils import CHUNK_SIZE, SavedFile, SavedText, fetch_page, sanitize_filename, stream_to_file, write_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -19,46 +31,339 @@ USER_AGENTS = [
 
 
 class BaseDownloader(ABC):
-    def __init__(self, folder_path: str, retries: int = 3, delay_range: Tuple[int, int] = (1, 4), enable_delay: bool = True):
+    source = "base"
+
+    def __init__(
+        self,
+        folder_path: str,
+        retries: int = 3,
+        delay_range: Tuple[int, int] = (1, 4),
+        enable_delay: bool = True,
+        sessions: Optional[SessionPool] = None,
+        cache: Optional[ResponseCache] = None,
+        ledger: Optional[JobLedger] = None,
+        retry_failed_only: bool = False,
+        rate_limiter: Optional[TokenBucket] = None,
+        sink: Optional[Callable[[SavedText], None]] = None,
+        host_limiter: Optional[AdaptiveLimiter] = None,
+    ):
         """
         Initialize a downloader with retry logic and optional delay between requests.
+        Requests go through `sessions`, or through a pool shared by all downloaders if none is given.
+        With a `cache`, responses are served from disk and revalidated instead of downloaded again.
+        With a `ledger`, finished works are skipped and an interrupted download resumes where it stopped;
+        `retry_failed_only` then limits a run to the works that failed before.
+        A `rate_limiter` paces every request to the source and replaces the random delay between works.
+        Every saved work is handed to `sink`, e.g. a `CleaningSink` that cleans it right away; a sink may
+        block to slow the downloads down.
+        A `host_limiter` adapts the concurrency and pacing of each host to its latency and throttling
+        responses, and also replaces the random delay between works.
         """
         self.folder_path = Path(folder_path)
         self.retries = retries
         self.delay_range = delay_range
         self.enable_delay = enable_delay
+        self.sessions = sessions or default_session_pool()
+        self.cache = cache
+        self.ledger = ledger
+        self.retry_failed_only = retry_failed_only
+        self.rate_limiter = rate_limiter
+        self.sink = sink
+        self.host_limiter = host_limiter
+        self.outcomes: Counter = Counter()
+        # Work file paths handed out during this run, and the URL of the work each belongs to.
+        self._claimed: Dict[Path, str] = {}
+        self._claims_lock = threading.Lock()
 
     @staticmethod
     def _random_headers() -> dict:
         return {"User-Agent": random.choice(USER_AGENTS)}
 
+    def _cached(self, url: str) -> Tuple[Optional[Response], Optional[dict]]:
+        """Return a fresh cached response for a URL, or else the stale cache record to revalidate."""
+        if self.cache is None:
+            return None, None
+        cached = self.cache.lookup(url)
+        if cached and self.cache.is_fresh(cached):
+            try:
+                response = self.cache.response(url, cached)
+            except OSError as e:  # evicted since the lookup
+                logger.warning(f"Cached copy of {url} is unusable, fetching it again: {e}")
+                return None, None
+            metrics.inc(metrics.CACHE_HITS, source=self.source, kind="fresh")
+            return response, None
+        return None, cached
+
+    def _fetch(self, url: str, stale: Optional[dict] = None) -> Optional[Response]:
+        """Make one request for a URL, conditional on the validators of a stale cache record if given."""
+        headers = self._random_headers()
+        if stale:
+            headers.update(self.cache.validators(stale))
+        response = self._request(url, headers)
+        metrics.inc(metrics.HTTP_RECEIVED_BYTES, len(response.content), source=self.source)
+        if self.cache is None:
+            return response
+        if stale and response.status_code == 304:
+            self.cache.refresh(url, stale, response)
+            try:
+                cached = self.cache.response(url, stale, revalidated=True)
+            except OSError as e:
+                logger.warning(f"Cached copy of {url} is unusable, fetching it again: {e}")
+                return self._fetch(url)
+            metrics.inc(metrics.CACHE_HITS, source=self.source, kind="revalidated")
+            return cached
+        self.cache.store(url, response)
+        return response
+
+    def _cached_download(self, url: str, path: Path) -> Tuple[Optional[SavedFile], Optional[dict]]:
+        """
+        `_cached` for `_download`: copy a fresh cached body to `path`, or return the stale record to revalidate.
+        If the body cannot be copied (evicted since the lookup, write error), returns neither, to download it.
+        """
+        if self.cache is None:
+            return None, None
+        cached = self.cache.lookup(url)
+        if cached and self.cache.is_fresh(cached):
+            try:
+                saved = self._copy_from_cache(url, cached, path)
+            except OSError as e:
+                logger.warning(f"Cached copy of {url} is unusable, downloading it again: {e}")
+                return None, None
+            metrics.inc(metrics.CACHE_HITS, source=self.source, kind="fresh")
+            return saved, None
+        return None, cached
+
+    def _copy_from_cache(self, url: str, meta: dict, path: Path, revalidated: bool = False) -> SavedFile:
+        with self.cache.open_body(url, revalidated) as body:
+            size, digest = write_chunks(iter(partial(body.read, CHUNK_SIZE), b""), str(path), meta["encoding"])
+        return SavedFile(path, size, digest, from_cache=True)
+
+    def _download(self, url: str, path: Path, stale: Optional[dict] = None) -> Optional[SavedFile]:
+        """
+        Make one request for a URL and stream its body to `path` (atomically, as UTF-8), so that memory use
+        does not depend on the size of the file. Conditional on the validators of a stale cache record if given.
+        """
+        headers = self._random_headers()
+        if stale:
+            headers.update(self.cache.validators(stale))
+        with self._exchange(url, headers, stream=True) as response:
+            revalidated = stale and response.status_code == 304
+            if revalidated:
+                response.close()
+            else:
+                # Read within the exchange: the transfer holds the host slot and counts in the latency.
+                size, digest = stream_to_file(response, str(path), self.sessions)
+        if revalidated:
+            self.cache.refresh(url, stale, response)
+            try:
+                saved = self._copy_from_cache(url, stale, path, revalidated=True)
+            except OSError as e:
+                logger.warning(f"Cached copy of {url} is unusable, downloading it again: {e}")
+                return self._download(url, path)
+            metrics.inc(metrics.CACHE_HITS, source=self.source, kind="revalidated")
+            return saved
+        metrics.inc(metrics.HTTP_RECEIVED_BYTES, size, source=self.source)
+        if self.cache is not None:
+            self.cache.store_file(url, response, str(path), digest)
+        return SavedFile(path, size, digest)
+
+    def _request(self, url: str, headers: dict) -> Response:
+        """Make one request and read its body; see `_exchange`."""
+        with self._exchange(url, headers) as response:
+            return response
+
+    @contextmanager
+    def _exchange(self, url: str, headers: dict, stream: bool = False) -> Iterator[Response]:
+        """
+        Make one request, through the host limiter if there is one, and report its outcome to it and to
+        the metrics when the `with` block ends: a streamed body read within the block is part of the
+        request, holding its host slot and counting in its latency. Raises `requests.HTTPError` on an
+        error status and `requests.RequestException` on network errors, also while the body is read.
+        """
+        if self.host_limiter is None and not metrics.enabled():
+            yield fetch_page(url, headers=headers, sessions=self.sessions, stream=stream, raise_errors=True)
+            return
+        host = self.host_limiter.acquire(url) if self.host_limiter else urlsplit(url).netloc
+        status = latency = wait = None
+        start = time.perf_counter()
+        try:
+            response = fetch_page(url, headers=headers, sessions=self.sessions, stream=stream, raise_errors=True)
+            status = response.status_code
+            yield response
+            latency = time.perf_counter() - start
+        except requests.HTTPError as e:
+            status, wait = e.response.status_code, retry_after(e.response)
+            raise
+        except requests.RequestException:
+            status = None  # no response, or its body was cut off
+            raise
+        finally:
+            if self.host_limiter:
+                self.host_limiter.release(host, status, latency, wait)
+            if metrics.enabled():
+                seconds = latency if latency is not None else time.perf_counter() - start
+                metrics.inc(metrics.HTTP_REQUESTS, host=host, status=status or 0)
+                metrics.observe(metrics.HTTP_SECONDS, seconds, host=host)
+                metrics.event("request", source=self.source, url=url, status=status, seconds=round(seconds, 4))
+
+    def _backoff(self, url: str, attempt: int, error: Optional[Exception]) -> Optional[float]:
+        """
+        Seconds to wait before retrying `url` after a failed attempt, or None to give up on it:
+        an error status other than a timeout, throttling or transient server error will not change.
+        Throttled requests wait for the server's Retry-After, which the host limiter (if any)
+        already enforces on every request to the host.
+        """
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is not None and status not in RETRYABLE_STATUSES:
+            logger.warning(f"Not retrying {url}: HTTP {status}")
+            return None
+        wait = retry_after(response)
+        if status in THROTTLE_STATUSES or wait is not None:
+            if self.host_limiter:
+                return 0.0
+            if wait is not None:
+                return wait
+        return min(2 ** attempt + random.random(), 10)
+
+    def _throttle(self) -> None:
+        if self.rate_limiter:
+            self.rate_limiter.acquire_blocking()
+
     def _retry_fetch(self, url: str) -> Optional[Response]:
+        cached, stale = self._cached(url)
+        if cached:
+            return cached
+        return self._retry(url, partial(self._fetch, url, stale))
+
+    def _retry_download(self, url: str, path: Path) -> Optional[SavedFile]:
+        saved, stale = self._cached_download(url, path)
+        if saved:
+            return saved
+        return self._retry(url, partial(self._download, url, path, stale))
+
+    def _retry(self, url: str, attempt_once: Callable[[], Any]) -> Any:
+        attempt = 0  # with no retries, nothing is fetched
         for attempt in range(1, self.retries + 1):
             logger.info(f"Fetching: {url} (attempt {attempt}/{self.retries})")
+            if attempt > 1:
+                metrics.inc(metrics.HTTP_RETRIES, source=self.source)
+            error = None
             try:
-                response = fetch_page(url, headers=self._random_headers())
-                if response:
-                    return response
+                self._throttle()
+                result = attempt_once()
+                if result:
+                    return result
             except Exception as e:
                 logger.warning(f"Fetch failed for {url}: {e}")
-            sleep_time = min(2 ** attempt + random.random(), 10)
-            logger.warning(f"Retry {attempt} failed. Sleeping {sleep_time:.2f}s...")
-            time.sleep(sleep_time)
-        logger.error(f"Failed after {self.retries} attempts: {url}")
+                error = e
+            sleep_time = self._backoff(url, attempt, error)
+            if sleep_time is None or attempt == self.retries:
+                break
+            if sleep_time:
+                logger.warning(f"Retry {attempt} failed. Sleeping {sleep_time:.2f}s...")
+                time.sleep(sleep_time)
+        logger.error(f"Failed after {attempt} attempt(s): {url}")
         return None
 
     def _author_folder(self, author: str) -> Path:
-        folder = self.folder_path / sanitize_filename(author)
+        """The folder of an author's works from this source: `<folder_path>/<author>/<source>`."""
+        folder = self.folder_path / sanitize_filename(author) / self.source
         folder.mkdir(parents=True, exist_ok=True)
         return folder
 
-    def _delay(self) -> None:
-        if self.enable_delay:
+    def _work_path(self, author_folder: Path, title: str, url: str) -> Path:
+        """
+        The file to save a work to. Two works whose titles sanitize to the same name (volumes, editions)
+        would overwrite each other: a work whose name belongs to another URL, claimed earlier in this run
+        or recorded as saved there by the ledger, gets a suffix derived from its own URL instead. With a
+        ledger, a name therefore keeps its owner across runs, whatever order the works complete in.
+        """
+        path = author_folder / f"{sanitize_filename(title)}.txt"
+        with self._claims_lock:
+            owner = self._claimed.get(path) or (self.ledger.owner(str(path)) if self.ledger else None)
+            if owner is not None and owner != url:
+                suffix = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+                renamed = path.with_name(f"{path.stem}_{suffix}.txt")
+                logger.warning(f"{path.name} is already taken by {owner}, saving {url} as {renamed.name}")
+                path = renamed
+            self._claimed[path] = url
+        return path
+
+    def _hand_over(self, path: Path, sha256: Optional[str] = None, text: Optional[str] = None) -> None:
+        """Pass a saved work to the sink, with its text when the downloader still has it in memory."""
+        if self.sink is None:
+            return
+        if sha256 is None:
+            sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.sink(SavedText(self.source, path, sha256, text))
+
+    def _delay(self, response: Union[Response, SavedFile, None] = None) -> None:
+        """Polite pause after a saved work; skipped for cached texts and when a rate or host limiter paces requests."""
+        if self.enable_delay and not self.rate_limiter and not self.host_limiter and not getattr(response, "from_cache", False):
             time.sleep(random.uniform(*self.delay_range))
 
-    @abstractmethod
     def download(self, author_name: str) -> None:
-        pass
+        author_folder = self._author_folder(author_name)
+        for work in self._list_works(author_name) or []:
+            try:
+                self._process_work(*work, author_folder)
+            except Exception as e:
+                self._work_failed(work, e)
+
+    def _work_failed(self, work: tuple, error: Exception) -> None:
+        """Record a work whose processing raised, so that one bad work does not stop the others."""
+        logger.error(f"Failed to process {work}: {error}")
+        self._mark(work[-1], FAILED, error=f"{type(error).__name__}: {error}")
+
+    def _list_works(self, author_name: str) -> Optional[List[tuple]]:
+        """Works of the author still to process, from the ledger or a fresh discovery."""
+        works = self._known_works(author_name)
+        if works is None:
+            works = self._record_works(author_name, self._discover(author_name))
+            if works is None:
+                return None
+        return self._pending_works(works)
+
+    def _known_works(self, author_name: str) -> Optional[List[tuple]]:
+        """Works listed for the author by a previous run, if the ledger has them and they have not expired."""
+        return self.ledger.listing(self.source, author_name) if self.ledger else None
+
+    def _record_works(self, author_name: str, works: Optional[List[tuple]]) -> Optional[List[tuple]]:
+        """
+        Record a fresh listing in the ledger and return the works to process. If the search failed or found
+        nothing, the expired listing of an earlier run (if any) is used instead, and nothing is recorded.
+        """
+        if not self.ledger:
+            return works
+        if not works:
+            return self.ledger.listing(self.source, author_name, expired=True) or works
+        self.ledger.record_listing(self.source, author_name, works)
+        return works
+
+    def _pending_works(self, works: List[tuple]) -> List[tuple]:
+        """Drop the works the ledger already has as done (or, in retry mode, everything but failures)."""
+        if not self.ledger:
+            return works
+        if self.retry_failed_only:
+            pending = [work for work in works if self.ledger.state(work[-1]) == FAILED]
+        else:
+            pending = [work for work in works if self.ledger.state(work[-1]) not in DONE_STATES]
+        if len(pending) < len(works):
+            logger.info(f"{self.source}: {len(works) - len(pending)} of {len(works)} works already handled, skipping them")
+        return pending
+
+    def _mark(self, url: str, state: str, **details) -> None:
+        self.outcomes[state] += 1
+        metrics.inc(metrics.WORKS, source=self.source, state=state)
+        metrics.event("work", source=self.source, url=url, state=state, **details)
+        if self.ledger:
+            self.ledger.mark(self.source, url, state, **details)
+
+    @abstractmethod
+    def _discover(self, author_name: str) -> Optional[List[tuple]]:
+        """Return the arguments of `_process_work` for every work of the author (the work URL last),
+        or None if the listing could not be fetched."""
 
     @abstractmethod
     def _extract_links(self, soup) -> list:
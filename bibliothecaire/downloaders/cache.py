@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying from the cache.
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Every entry is a pair of files named after the SHA-256 of the URL: the raw body and a JSON record
+    of its headers, validators (ETag / Last-Modified), body hash and storage time. Entries younger than
+    `ttl` seconds are served without any request; older ones are revalidated with a conditional request,
+    and a 304 answer refreshes them without transferring the body again. When the bodies exceed
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, folder: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 2 * 1024 ** 3):
+        self.folder = Path(folder)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self.folder.glob("*/*.body"))
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = self.folder / key[:2]
+        return folder / f"{key}.body", folder / f"{key}.json"
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Return the stored record for a URL, or None if it is not cached."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if body_path.is_file() else None
+
+    def is_fresh(self, meta: dict) -> bool:
+        return time.time() - meta["stored_at"] < self.ttl
+
+    @staticmethod
+    def validators(meta: dict) -> Dict[str, str]:
+        """Headers turning a request for a cached URL into a conditional one."""
+        headers = {}
+        if meta["headers"].get("ETag"):
+            headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        return headers
+
+    def response(self, url: str, meta: dict, revalidated: bool = False) -> Response:
+        """Rebuild a `requests.Response` from a cached entry and mark it as recently used."""
+        body_path, _ = self._paths(url)
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.encoding = meta["encoding"]
+        response._content = body_path.read_bytes()
+        response.from_cache = True
+        self._used(body_path, revalidated)
+        return response
+
+    def open_body(self, url: str, revalidated: bool = False) -> BinaryIO:
+        """Open the body of a cached entry for streaming, and mark it as recently used."""
+        body_path, _ = self._paths(url)
+        body = open(body_path, "rb")
+        self._used(body_path, revalidated)
+        return body
+
+    def _used(self, body_path: Path, revalidated: bool) -> None:
+        os.utime(body_path)
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+
+    def refresh(self, url: str, meta: dict, not_modified: Response) -> None:
+        """Restart the TTL of an entry after a 304, taking any updated validators."""
+        for header in STORED_HEADERS:
+            if header in not_modified.headers and header != "Content-Type":
+                meta["headers"][header] = not_modified.headers[header]
+        meta["stored_at"] = time.time()
+        self._write_meta(url, meta)
+
+    def store(self, url: str, response: Response) -> None:
+        body = response.content
+        body_path, _ = self._paths(url)
+        body_path.parent.mkdir(exist_ok=True)
+        previous = body_path.stat().st_size if body_path.is_file() else 0
+
+        tmp_path = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, body_path)
+        self._stored(url, response, response.encoding, hashlib.sha256(body).hexdigest(), len(body) - previous)
+
+    def store_file(self, url: str, response: Response, path: str, sha256: str) -> None:
+        """Cache a response whose body was streamed to `path` (as UTF-8), copying the file rather than reading it."""
+        body_path, _ = self._paths(url)
+        body_path.parent.mkdir(exist_ok=True)
+        previous = body_path.stat().st_size if body_path.is_file() else 0
+
+        tmp_path = body_path.with_suffix(f".{threading.get_ident()}.tmp")
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, body_path)
+        self._stored(url, response, "utf-8", sha256, body_path.stat().st_size - previous)
+
+    def _stored(self, url: str, response: Response, encoding: Optional[str], sha256: str, growth: int) -> None:
+        self._write_meta(url, {
+            "url": url,
+            "headers": {header: response.headers[header] for header in STORED_HEADERS if header in response.headers},
+            "encoding": encoding,
+            "sha256": sha256,
+            "stored_at": time.time(),
+        })
+        with self._lock:
+            self.misses += 1
+            self._size += growth
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _write_meta(self, url: str, meta: dict) -> None:
+        _, meta_path = self._paths(url)
+        tmp_path = meta_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache is back under 90% of its size budget."""
+        with self._lock:
+            bodies = []
+            for path in self.folder.glob("*/*.body"):
+                stat = path.stat()
+                bodies.append((stat.st_mtime, stat.st_size, path))
+            bodies.sort(key=lambda item: item[0])
+            size = sum(item[1] for item in bodies)
+            target = int(self.max_bytes * 0.9)
+            for _, body_size, body_path in bodies:
+                if size <= target:
+                    break
+                body_path.unlink(missing_ok=True)
+                body_path.with_suffix(".json").unlink(missing_ok=True)
+                size -= body_size
+            self._size = size
+        logger.info(f"Response cache evicted down to {size / 1e6:.1f} MB")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "bytes": self._size}
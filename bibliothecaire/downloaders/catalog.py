@@ -0,0 +1,160 @@
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Author entries look like "Hugo, Victor, 1802-1885" or "Maquet, Auguste, 1813-1888 [Contributor]".
+ROLE_PATTERN = re.compile(r"\s*\[([^\]]+)\]\s*$")
+NON_LETTERS = re.compile(r"[^a-z]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    languages TEXT NOT NULL,
+    type TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS authors (
+    book_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    role TEXT
+);
+CREATE INDEX IF NOT EXISTS authors_key ON authors (key);
+CREATE INDEX IF NOT EXISTS authors_book ON authors (book_id);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def author_key(name: str) -> str:
+    """
+    Order- and accent-insensitive key of an author name, so that "Victor Hugo" matches the catalog's
+    "Hugo, Victor, 1802-1885" and "Emile Zola" matches "Zola, Émile, 1840-1902".
+    """
+    name = ROLE_PATTERN.sub("", name)
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(sorted(token for token in NON_LETTERS.split(folded) if token))
+
+
+class GutenbergCatalog:
+    """
+    SQLite index of the Project Gutenberg catalog (`pg_catalog.csv`, optionally gzipped).
+
+    The catalog lists every ebook with its title, languages and authors, which is all the downloader
+    needs to pick the French works of an author without fetching a single book page. `refresh` only
+    re-reads the dump when its size or modification time changed, and then only rewrites the rows that
+    differ from the indexed ones, so a daily refresh of the ~75k-row catalog touches a handful of rows.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _read_rows(csv_path: Path) -> Iterator[Dict[str, str]]:
+        opener = gzip.open if csv_path.suffix == ".gz" else open
+        with opener(csv_path, "rb") as raw:
+            with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                yield from csv.DictReader(f)
+
+    def refresh(self, csv_path: str) -> Dict[str, int]:
+        """Bring the index up to date with a catalog dump; return the number of rows added, updated and removed."""
+        csv_path = Path(csv_path)
+        stat = csv_path.stat()
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+        changes = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            if self._meta("source") == signature:
+                return changes
+
+            known = dict(self._db.execute("SELECT id, digest FROM books"))
+            seen = set()
+            with self._db:
+                for row in self._read_rows(csv_path):
+                    try:
+                        book_id = int(row["Text#"])
+                    except (KeyError, ValueError):
+                        continue
+                    seen.add(book_id)
+                    digest = hashlib.sha1(
+                        "\x1f".join((row.get("Title", ""), row.get("Language", ""),
+                                     row.get("Type", ""), row.get("Authors", ""))).encode("utf-8")
+                    ).hexdigest()
+                    if known.get(book_id) == digest:
+                        continue
+                    changes["updated" if book_id in known else "added"] += 1
+                    self._write_book(book_id, row, digest)
+
+                removed = [book_id for book_id in known if book_id not in seen]
+                for book_id in removed:
+                    self._db.execute("DELETE FROM books WHERE id = ?", (book_id,))
+                    self._db.execute("DELETE FROM authors WHERE book_id = ?", (book_id,))
+                changes["removed"] = len(removed)
+                self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('source', ?)", (signature,))
+
+        logger.info(f"Gutenberg catalog {csv_path}: {changes}")
+        return changes
+
+    def _write_book(self, book_id: int, row: Dict[str, str], digest: str) -> None:
+        languages = ";".join(language.strip() for language in row.get("Language", "").split(";") if language.strip())
+        title = " ".join(row.get("Title", "").split())
+        self._db.execute(
+            "INSERT OR REPLACE INTO books (id, title, languages, type, digest) VALUES (?, ?, ?, ?, ?)",
+            (book_id, title, languages, row.get("Type", ""), digest),
+        )
+        self._db.execute("DELETE FROM authors WHERE book_id = ?", (book_id,))
+        for entry in row.get("Authors", "").split(";"):
+            entry = entry.strip()
+            if not entry:
+                continue
+            role = ROLE_PATTERN.search(entry)
+            self._db.execute(
+                "INSERT INTO authors (book_id, name, key, role) VALUES (?, ?, ?, ?)",
+                (book_id, ROLE_PATTERN.sub("", entry), author_key(entry), role.group(1) if role else None),
+            )
+
+    def works(self, author_name: str, language: str = "fr") -> List[Tuple[int, str]]:
+        """Ids and titles of the texts written (not translated, illustrated, ...) by an author in a language."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT books.id, books.title, books.languages FROM authors"
+                " JOIN books ON books.id = authors.book_id"
+                " WHERE authors.key = ? AND authors.role IS NULL AND books.type = 'Text'"
+                " ORDER BY books.id",
+                (author_key(author_name),),
+            ).fetchall()
+        return [(book_id, title) for book_id, title, languages in rows if language in languages.split(";")]
+
+    def book(self, book_id: int) -> Optional[Tuple[str, List[str]]]:
+        """Title and languages of an ebook, or None if it is not in the catalog."""
+        with self._lock:
+            row = self._db.execute("SELECT title, languages FROM books WHERE id = ?", (book_id,)).fetchone()
+        return (row[0], row[1].split(";")) if row else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
@@ -1,7 +1,22 @@
+import argparse
+import asyncio
 import logging
-from typing import Tuple
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from .. import metrics
+from .async_downloader import AsyncBaseDownloader
+from .cache import ResponseCache
+from .catalog import GutenbergCatalog
 from .gutenberg_downloader import GutenbergDownloader
+from .ledger import FAILED, SAVED, JobLedger
+from .rate_limit import AdaptiveLimiter, TokenBucket
+from .scheduler import RoundRobinScheduler
+from .sessions import SessionPool
+from .utils import SavedText
 from .wikisource_downloader import WikisourceDownloader
 
 logger = logging.getLogger(__name__)
@@ -16,6 +31,18 @@ class CombinedDownloader:
         enable_delay: bool = True,
         gutenberg_enabled: bool = True,
         wikisource_enabled: bool = True,
+        max_concurrency: int = 4,
+        sessions: Optional[SessionPool] = None,
+        use_cache: bool = False,
+        cache_ttl: float = 7 * 24 * 3600,
+        use_ledger: bool = False,
+        retry_failed_only: bool = False,
+        listing_ttl: Optional[float] = 7 * 24 * 3600,
+        rate_limits: Optional[Dict[str, float]] = None,
+        gutenberg_catalog: Optional[str] = None,
+        wikisource_api: bool = False,
+        sink: Optional[Callable[[SavedText], None]] = None,
+        adaptive: bool = False,
     ):
         """
         Initializes the downloader with configuration for each source.
@@ -27,6 +54,24 @@ class CombinedDownloader:
             enable_delay (bool): Whether to enable delay between requests.
             gutenberg_enabled (bool): Enable or disable Gutenberg download.
             wikisource_enabled (bool): Enable or disable Wikisource download.
+            max_concurrency (int): Maximum concurrent requests per host in `adownload_all`.
+            sessions (SessionPool): Pooled HTTP sessions (timeouts, pool size) shared by both sources.
+            use_cache (bool): Keep fetched pages in a response cache under `base_folder/.http_cache`.
+            cache_ttl (float): Seconds before a cached page is revalidated with a conditional request.
+            use_ledger (bool): Record every work in `base_folder/.ledger.jsonl` to skip finished works and resume.
+            retry_failed_only (bool): With the ledger, only retry the works that failed in earlier runs.
+            listing_ttl (float): Seconds before the works the ledger lists for an author expire and the author
+                is searched again, to find works added since; None keeps listings forever, 0 always searches.
+            rate_limits (dict): Requests per second allowed on each source, keyed by source name
+                ("gutenberg", "wikisource"). A rate-limited source no longer sleeps between works.
+            gutenberg_catalog (str): Path to Gutenberg's `pg_catalog.csv` (or `.csv.gz`). Its index is kept
+                in `base_folder/.gutenberg_catalog.sqlite` and used instead of the search and book pages.
+            wikisource_api (bool): Read Wikisource works as wikitext through the MediaWiki API, subpages
+                and transcluded scans included, instead of parsing their rendered HTML.
+            sink (callable): Called with every saved work (a `SavedText`) of both sources, e.g. a
+                `CleaningSink` to clean works while the next ones download.
+            adaptive (bool): Adapt the concurrency (up to `max_concurrency`) and pacing of each host to its
+                latency and 429/503 responses, honoring Retry-After, instead of sleeping between works.
         """
         self.base_folder = base_folder
         self.retries = retries
@@ -34,18 +79,45 @@ class CombinedDownloader:
         self.enable_delay = enable_delay
         self.gutenberg_enabled = gutenberg_enabled
         self.wikisource_enabled = wikisource_enabled
+        self.sessions = sessions or SessionPool(pool_maxsize=max(10, max_concurrency))
+        self.cache = ResponseCache(os.path.join(base_folder, ".http_cache"), ttl=cache_ttl) if use_cache else None
+        self.ledger = JobLedger(os.path.join(base_folder, ".ledger.jsonl"), listing_ttl) if use_ledger else None
+        rate_limits = rate_limits or {}
+        self.host_limiter = AdaptiveLimiter(max_concurrency=max_concurrency) if adaptive else None
+        self.catalog = None
+        if gutenberg_catalog:
+            self.catalog = GutenbergCatalog(os.path.join(base_folder, ".gutenberg_catalog.sqlite"))
+            self.catalog.refresh(gutenberg_catalog)
 
         self.gutenberg = GutenbergDownloader(
             folder_path=base_folder,
             retries=retries,
             delay_range=delay_range,
             enable_delay=enable_delay,
+            max_concurrency=max_concurrency,
+            sessions=self.sessions,
+            cache=self.cache,
+            ledger=self.ledger,
+            retry_failed_only=retry_failed_only,
+            rate_limiter=TokenBucket(rate_limits["gutenberg"]) if rate_limits.get("gutenberg") else None,
+            sink=sink,
+            host_limiter=self.host_limiter,
+            catalog=self.catalog,
         )
         self.wikisource = WikisourceDownloader(
             folder_path=base_folder,
             retries=retries,
             delay_range=delay_range,
             enable_delay=enable_delay,
+            max_concurrency=max_concurrency,
+            sessions=self.sessions,
+            cache=self.cache,
+            ledger=self.ledger,
+            retry_failed_only=retry_failed_only,
+            rate_limiter=TokenBucket(rate_limits["wikisource"]) if rate_limits.get("wikisource") else None,
+            sink=sink,
+            host_limiter=self.host_limiter,
+            use_api=wikisource_api,
         )
 
     def download_all(self, author_name: str) -> None:
@@ -69,9 +141,211 @@ class CombinedDownloader:
                 logger.error(f"Error downloading from Wikisource: {e}")
 
         logger.info(f"Completed combined download for author: {author_name}")
+        self._log_usage()
+
+    async def adownload_all(self, author_name: str) -> None:
+        """
+        Download works by the given author from all enabled sources concurrently.
+        Usage: asyncio.run(downloader.adownload_all("Victor Hugo"))
+        """
+        logger.info(f"Starting concurrent combined download for author: {author_name}")
+
+        sources = self._sources()
+        results = await asyncio.gather(
+            *(downloader.adownload(author_name) for _, downloader in sources), return_exceptions=True
+        )
+        for (name, _), result in zip(sources, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error downloading from {name}: {result}")
+
+        logger.info(f"Completed combined download for author: {author_name}")
+        self._log_usage()
+
+
+    def _sources(self) -> List[Tuple[str, AsyncBaseDownloader]]:
+        sources = []
+        if self.gutenberg_enabled:
+            sources.append(("Gutenberg", self.gutenberg))
+        if self.wikisource_enabled:
+            sources.append(("Wikisource", self.wikisource))
+        return sources
+
+    def _log_usage(self) -> None:
+        logger.info(f"HTTP usage so far: {self.sessions.stats.snapshot()}")
+        if self.cache:
+            logger.info(f"Response cache: {self.cache.stats()}")
+        if self.ledger:
+            logger.info(f"Ledger: {self.ledger.counts()}")
+        if self.host_limiter:
+            logger.info(f"Host limits: {self.host_limiter.snapshot()}")
+
+    def download_many(self, authors: Iterable[str], max_workers: int = 8) -> Dict[str, object]:
+        """
+        Download the works of many authors from all enabled sources; see `adownload_many`.
+        """
+        return asyncio.run(self.adownload_many(authors, max_workers=max_workers))
+
+    async def adownload_many(self, authors: Iterable[str], max_workers: int = 8) -> Dict[str, object]:
+        """
+        Download the works of many authors from all enabled sources under one scheduler.
+
+        Every author is looked up on every source, with at most `max_workers` listings in flight. As soon as
+        a listing is known, its works join a round-robin across (author, source) lanes consumed by
+        `max_workers` workers, so authors are interleaved fairly and both hosts stay busy instead of being
+        served one author at a time. Per-host concurrency and rate limits still apply to every request.
+
+        Returns an aggregate report: works handled per source and state, requests, bytes and throughput.
+        """
+        authors = list(dict.fromkeys(author.strip() for author in authors if author.strip()))
+        downloaders = [downloader for _, downloader in self._sources()]
+        logger.info(f"Starting batch download of {len(authors)} authors from {len(downloaders)} sources")
+
+        http_before = self.sessions.stats.snapshot()
+        outcomes_before = {downloader.source: Counter(downloader.outcomes) for downloader in downloaders}
+        start = time.perf_counter()
+
+        scheduler = RoundRobinScheduler()
+        listing_slots = asyncio.Semaphore(max_workers)
+
+        async def discover(downloader: AsyncBaseDownloader, author: str) -> None:
+            async with listing_slots:
+                try:
+                    works = await downloader._alist_works(author)
+                except Exception as e:
+                    logger.error(f"Error listing {author} on {downloader.source}: {e}")
+                    return
+            if works:
+                author_folder = downloader._author_folder(author)
+                scheduler.add((author, downloader.source), ((downloader, work, author_folder) for work in works))
+
+        async def discover_all() -> None:
+            await asyncio.gather(*(discover(downloader, author) for author in authors for downloader in downloaders))
+            scheduler.close()
+
+        async def worker() -> None:
+            while True:
+                job = await scheduler.get()
+                if job is None:
+                    return
+                downloader, work, author_folder = job
+                try:
+                    await downloader._arun_work(*work, author_folder)
+                except Exception as e:
+                    downloader._work_failed(work, e)
+
+        await asyncio.gather(discover_all(), *(worker() for _ in range(max_workers)))
+
+        elapsed = time.perf_counter() - start
+        http = self.sessions.stats.snapshot()
+        by_source = {
+            downloader.source: dict(downloader.outcomes - outcomes_before[downloader.source])
+            for downloader in downloaders
+        }
+        saved = sum(outcomes.get(SAVED, 0) for outcomes in by_source.values())
+        received = http["bytes_received"] - http_before["bytes_received"]
+        report = {
+            "authors": len(authors),
+            "elapsed_s": round(elapsed, 2),
+            "works_saved": saved,
+            "works_failed": sum(outcomes.get(FAILED, 0) for outcomes in by_source.values()),
+            "works_per_s": round(saved / elapsed, 2) if elapsed else 0.0,
+            "requests": http["requests"] - http_before["requests"],
+            "mb_received": round(received / 1e6, 2),
+            "mb_per_s": round(received / 1e6 / elapsed, 2) if elapsed else 0.0,
+            "by_source": by_source,
+        }
+        logger.info(f"Completed batch download: {report}")
+        self._log_usage()
+        return report
+
+
+def read_authors(path: str) -> List[str]:
+    """Read an author list: one name per line, blank lines and lines starting with '#' ignored."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _parse_rate(value: str) -> Tuple[str, float]:
+    source, _, rate = value.partition("=")
+    source = source.strip().lower()
+    sources = (GutenbergDownloader.source, WikisourceDownloader.source)
+    if source not in sources:
+        raise argparse.ArgumentTypeError(f"unknown source {source!r} in {value!r}, expected one of: {', '.join(sources)}")
+    try:
+        return source, float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected SOURCE=REQUESTS_PER_SECOND, got {value!r}")
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    parser = argparse.ArgumentParser(prog=prog, description="Download the works of every author listed in a file.")
+    parser.add_argument("authors_file", help="text file with one author name per line")
+    parser.add_argument("-o", "--output", default="downloads", help="download folder (default: downloads)")
+    parser.add_argument("-w", "--workers", type=int, default=8,
+                        help="works downloaded at the same time across all authors (default: 8)")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="maximum concurrent requests per host (default: 4)")
+    parser.add_argument("--rate", type=_parse_rate, action="append", default=[], metavar="SOURCE=RPS",
+                        help="requests per second for a source, e.g. gutenberg=1 (repeatable)")
+    parser.add_argument("--gutenberg-catalog", metavar="PATH",
+                        help="find Gutenberg works in a local pg_catalog.csv instead of the site search")
+    parser.add_argument("--wikisource-api", action="store_true",
+                        help="read Wikisource works through the MediaWiki API instead of their HTML")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adapt each host's concurrency and pacing to its latency and throttling "
+                             "instead of sleeping between works")
+    parser.add_argument("--no-gutenberg", action="store_true", help="skip Project Gutenberg")
+    parser.add_argument("--no-wikisource", action="store_true", help="skip Wikisource")
+    parser.add_argument("--cache", action="store_true", help="keep fetched pages in a response cache")
+    parser.add_argument("--ledger", action="store_true", help="record progress to skip finished works and resume")
+    parser.add_argument("--retry-failed", action="store_true", help="with --ledger, only retry failed works")
+    parser.add_argument("--listing-ttl", type=float, default=7, metavar="DAYS",
+                        help="with --ledger, search an author again once their listing is older (default: 7)")
+    parser.add_argument("--refresh-listings", action="store_true",
+                        help="with --ledger, search every author again instead of reusing their listing")
+    parser.add_argument("--clean-to", metavar="DIR",
+                        help="also clean every saved work into DIR while the downloads go on "
+                             "(as `bibliothecaire clean OUTPUT DIR` would, without a second pass)")
+    parser.add_argument("--clean-workers", type=int, default=0,
+                        help="with --clean-to, cleaning processes (default: 0, one per CPU)")
+    parser.add_argument("--clean-queue", type=int, metavar="N",
+                        help="with --clean-to, works waiting to be cleaned before downloads pause "
+                             "(default: twice the cleaning processes)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    authors = read_authors(args.authors_file)
+    if not authors:
+        parser.error(f"no authors in {args.authors_file}")
+
+    sink = None
+    if args.clean_to:
+        from ..cleaner.sink import CleaningSink
+        sink = CleaningSink(args.output, args.clean_to, workers=args.clean_workers, max_pending=args.clean_queue)
+
+    downloader = CombinedDownloader(
+        base_folder=args.output,
+        gutenberg_enabled=not args.no_gutenberg,
+        wikisource_enabled=not args.no_wikisource,
+        max_concurrency=args.max_concurrency,
+        use_cache=args.cache,
+        use_ledger=args.ledger or args.retry_failed,
+        retry_failed_only=args.retry_failed,
+        listing_ttl=0 if args.refresh_listings else args.listing_ttl * 24 * 3600,
+        rate_limits=dict(args.rate),
+        gutenberg_catalog=args.gutenberg_catalog,
+        wikisource_api=args.wikisource_api,
+        sink=sink,
+        adaptive=args.adaptive,
+    )
+    with metrics.recording(args.metrics, args.events):
+        try:
+            report = downloader.download_many(authors, max_workers=args.workers)
+        finally:
+            clean_errors = sink.close() if sink else {}
+    sys.exit(1 if report["works_failed"] or clean_errors else 0)
 
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    combined = CombinedDownloader(base_folder="downloads")
-    combined.download_all("Victor Hugo")
+    main()
@@ -4,9 +4,13 @@ from typing import List, Optional, Tuple
 from urllib.parse import quote_plus
 
 from bs4 import BeautifulSoup
+from requests import Response
 
-from .base_downloader import BaseDownloader
-from .utils import sanitize_filename, save_text_to_file
+from .async_downloader import AsyncBaseDownloader
+from .catalog import GutenbergCatalog
+from .ledger import FAILED, SAVED, SKIPPED
+from .parsing import BOOK_PAGE, SEARCH_RESULTS, parse_html
+from .utils import SavedFile
 
 logger = logging.getLogger(__name__)
 
@@ -14,56 +18,147 @@ logger = logging.getLogger(__name__)
 GUTENBERG_BASE_URL = "https://www.gutenberg.org"
 
 
-class GutenbergDownloader(BaseDownloader):
-    def download(self, author_name: str) -> None:
-        author_folder = self._author_folder(author_name)
-        query = quote_plus(author_name)
-        search_url = f"{GUTENBERG_BASE_URL}/ebooks/search/?query={query}"
+class GutenbergDownloader(AsyncBaseDownloader):
+    """
+    Downloader for Project Gutenberg.
 
-        response = self._retry_fetch(search_url)
+    Without a catalog, works are found through the site search, and every book page is fetched to check
+    its language and find its plain text link. With a `catalog` (see `GutenbergCatalog`), the French works
+    of an author are read from the local index and their texts are fetched directly: one request per work.
+    """
+
+    source = "gutenberg"
+    base_url = GUTENBERG_BASE_URL
+
+    def __init__(self, *args, catalog: Optional[GutenbergCatalog] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.catalog = catalog
+
+    def _discover(self, author_name: str) -> Optional[List[Tuple[str]]]:
+        if self.catalog:
+            return self._catalog_works(author_name)
+        response = self._retry_fetch(self._search_url(author_name))
         if not response:
-            return
+            return None
+        return self._parse_search_page(response, author_name)
 
-        soup = BeautifulSoup(response.content, "html.parser")
+    async def _adiscover(self, author_name: str) -> Optional[List[Tuple[str]]]:
+        if self.catalog:
+            return self._catalog_works(author_name)
+        response = await self._aretry_fetch(self._search_url(author_name))
+        if not response:
+            return None
+        return await self._run_blocking(self._parse_search_page, response, author_name)
+
+    def _catalog_works(self, author_name: str) -> List[Tuple[str]]:
+        works = self.catalog.works(author_name, language="fr")
+        if not works:
+            logger.info(f"No French books in the catalog for {author_name}")
+        return [(f"{self.base_url}/ebooks/{book_id}",) for book_id, _ in works]
+
+    def _catalog_entry(self, book_url: str) -> Optional[Tuple[str, bool, str]]:
+        """
+        Title of a book from the catalog, whether it is in French, and its plain text URL, as `_read_book_page`
+        gives them; or None to fall back to its book page. A listing recorded in the ledger before the catalog
+        was used may hold books in any language, so the language is checked here too.
+        """
+        if not self.catalog:
+            return None
+        book_id = book_url.rstrip("/").rsplit("/", 1)[-1]
+        if not book_id.isdigit():
+            return None
+        entry = self.catalog.book(int(book_id))
+        if not entry:
+            return None
+        title, languages = entry
+        return title, "fr" in languages, f"{self.base_url}/ebooks/{book_id}.txt.utf-8"
+
+    def _search_url(self, author_name: str) -> str:
+        return f"{self.base_url}/ebooks/search/?query={quote_plus(author_name)}"
+
+    def _parse_search_page(self, response: Response, author_name: str) -> List[Tuple[str]]:
+        soup = parse_html(response.content, SEARCH_RESULTS)
         book_links = self._extract_links(soup)
         if not book_links:
             logger.info(f"No books found for {author_name}")
-            return
-
-        for book_url in book_links:
-            self._process_work(book_url, author_folder)
+        return [(book_url,) for book_url in book_links]
 
     def _extract_links(self, soup: BeautifulSoup) -> List[str]:
         return [
-            GUTENBERG_BASE_URL + link['href']
+            self.base_url + link['href']
             for link in soup.select("li.booklink a[href^='/ebooks/']")
         ]
 
     def _process_work(self, book_url: str, author_folder: Path) -> None:
-        page = self._retry_fetch(book_url)
-        if not page:
-            logger.warning(f"Could not fetch book page: {book_url}")
+        book = self._catalog_entry(book_url)
+        if not book:
+            page = self._retry_fetch(book_url)
+            if not page:
+                logger.warning(f"Could not fetch book page: {book_url}")
+                self._mark(book_url, FAILED, error="book page")
+                return
+            book = self._read_book_page(page)
+
+        found = self._check_book(book_url, *book)
+        if not found:
             return
+        title, text_url = found
 
-        soup = BeautifulSoup(page.text, "html.parser")
+        file_path = self._work_path(author_folder, title, book_url)
+        saved = self._retry_download(text_url, file_path)
+        if not saved:
+            self._mark(book_url, FAILED, error="text file")
+            return
+        self._saved(book_url, saved)
+        self._hand_over(saved.path, saved.sha256)
+        self._delay(saved)
+
+    async def _aprocess_work(self, book_url: str, author_folder: Path) -> None:
+        book = self._catalog_entry(book_url)
+        if not book:
+            page = await self._aretry_fetch(book_url)
+            if not page:
+                logger.warning(f"Could not fetch book page: {book_url}")
+                self._mark(book_url, FAILED, error="book page")
+                return
+            book = await self._run_blocking(self._read_book_page, page)
+
+        found = self._check_book(book_url, *book)
+        if not found:
+            return
+        title, text_url = found
+
+        file_path = self._work_path(author_folder, title, book_url)
+        saved = await self._aretry_download(text_url, file_path)
+        if not saved:
+            self._mark(book_url, FAILED, error="text file")
+            return
+        self._saved(book_url, saved)
+        await self._ahand_over(saved.path, saved.sha256)
+        await self._adelay(saved)
+
+    def _read_book_page(self, page: Response) -> Tuple[str, bool, Optional[str]]:
+        """The title of a book page, whether the book is in French, and its plain text URL if any."""
+        soup = parse_html(page.text, BOOK_PAGE)
         title, is_french = self._extract_metadata(soup)
+        return title, is_french, self._extract_text_link(soup)
+
+    def _check_book(self, book_url: str, title: str, is_french: bool,
+                    text_url: Optional[str]) -> Optional[Tuple[str, str]]:
+        """Return the title and plain text URL of a French book, or mark it skipped and return None."""
         if not is_french:
             logger.info(f"Skipping non-French book: {title}")
-            return
-
-        text_url = self._extract_text_link(soup)
+            self._mark(book_url, SKIPPED, reason="not French")
+            return None
         if not text_url:
             logger.warning(f"No text URL found for {title}")
-            return
+            self._mark(book_url, SKIPPED, reason="no plain text")
+            return None
+        return title, text_url
 
-        text_response = self._retry_fetch(text_url)
-        if text_response:
-            file_path = author_folder / f"{sanitize_filename(title)}.txt"
-            try:
-                save_text_to_file(text_response.text, str(file_path))
-            except Exception as e:
-                logger.error(f"Failed to save file {file_path}: {e}")
-            self._delay()
+    def _saved(self, book_url: str, saved: SavedFile) -> None:
+        logger.info(f"Saved: {saved.path}")
+        self._mark(book_url, SAVED, path=str(saved.path), bytes=saved.size, sha256=saved.sha256)
 
     @staticmethod
     def _extract_metadata(soup: BeautifulSoup) -> Tuple[str, bool]:
@@ -83,11 +178,10 @@ class GutenbergDownloader(BaseDownloader):
                     title = val_text
         return title, is_french
 
-    @staticmethod
-    def _extract_text_link(soup: BeautifulSoup) -> Optional[str]:
+    def _extract_text_link(self, soup: BeautifulSoup) -> Optional[str]:
         for link in soup.find_all('a', href=True):
             if 'txt.utf-8' in link['href']:
-                return GUTENBERG_BASE_URL + link['href']
+                return self.base_url + link['href']
         return None
 
 
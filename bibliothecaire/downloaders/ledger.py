@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DISCOVERED = "discovered"
+FETCHED = "fetched"
+SAVED = "saved"
+SKIPPED = "skipped"  # fetched, but intentionally not saved (not French, too short, ...)
+FAILED = "failed"
+
+DONE_STATES = (SAVED, SKIPPED)
+
+
+class JobLedger:
+    """
+    Persistent, append-only JSONL log of download jobs.
+
+    Two kinds of records are appended: the list of works discovered for an author on a source, and
+    every state change of a work (keyed by its URL). Replaying the file on startup gives the latest
+    state of every work, so a restarted download can skip finished works and resume the others
+    without any request, including the author search itself.
+
+    A listing older than `listing_ttl` seconds has expired: the author is searched again, so that works
+    added since are found (None keeps listings forever, 0 searches every time). Empty listings are
+    never recorded, as they more likely come from a search that failed than from an author with no works.
+    """
+
+    def __init__(self, path: str, listing_ttl: Optional[float] = None):
+        self.path = Path(path)
+        self.listing_ttl = listing_ttl
+        self._lock = threading.Lock()
+        self._states: Dict[str, str] = {}
+        # Saved file path -> URL of the work saved there
+        self._paths: Dict[str, str] = {}
+        # (source, author) -> (works, time recorded)
+        self._listings: Dict[Tuple[str, str], Tuple[List[tuple], float]] = {}
+        if self.path.is_file():
+            self._replay()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _replay(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave a partial last line; everything before it is still valid.
+                    logger.warning(f"Ignoring malformed ledger line {line_number} in {self.path}")
+                    continue
+                if "works" in record:
+                    if record["works"]:  # older ledgers may hold empty listings
+                        works = [tuple(work) for work in record["works"]]
+                        self._listings[(record["source"], record["author"])] = (works, record.get("ts", 0.0))
+                else:
+                    self._states[record["url"]] = record["state"]
+                    if record["state"] == SAVED and "path" in record:
+                        self._paths[record["path"]] = record["url"]
+
+    def _append(self, record: dict) -> None:
+        record["ts"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_listing(self, source: str, author: str, works: List[tuple]) -> None:
+        """Remember the works found for an author; each work tuple ends with the work URL. Empty lists are ignored."""
+        if not works:
+            return
+        record = {"source": source, "author": author, "works": [list(work) for work in works]}
+        self._append(record)
+        self._listings[(source, author)] = ([tuple(work) for work in works], record["ts"])
+        for work in works:
+            if work[-1] not in self._states:
+                self.mark(source, work[-1], DISCOVERED)
+
+    def listing(self, source: str, author: str, expired: bool = False) -> Optional[List[tuple]]:
+        """The works last recorded for an author, or None if there are none or, unless `expired`, they expired."""
+        entry = self._listings.get((source, author))
+        if entry is None:
+            return None
+        works, recorded = entry
+        if not expired and self.listing_ttl is not None and time.time() - recorded >= self.listing_ttl:
+            return None
+        return works
+
+    def mark(self, source: str, url: str, state: str, **details) -> None:
+        self._states[url] = state
+        if state == SAVED and "path" in details:
+            self._paths[details["path"]] = url
+        self._append({"source": source, "url": url, "state": state, **details})
+
+    def state(self, url: str) -> Optional[str]:
+        return self._states.get(url)
+
+    def owner(self, path: str) -> Optional[str]:
+        """The URL of the work last saved to a file, or None if the ledger has not seen it saved."""
+        return self._paths.get(path)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for state in self._states.values():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
@@ -0,0 +1,54 @@
+import os
+from typing import Callable, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # beautifulsoup4 < 4.13
+    ElementFilter = None
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+# Tree builder used by the downloaders: lxml's C parser when it is installed (`pip install .[lxml]`),
+# else the pure-Python one from the standard library. BIBLIOTHECAIRE_HTML_PARSER overrides the choice.
+HTML_PARSER = os.environ.get("BIBLIOTHECAIRE_HTML_PARSER", DEFAULT_PARSER)
+
+
+def _has_class(attrs: dict, name: str) -> bool:
+    classes = attrs.get("class") or ""
+    return name in (classes.split() if isinstance(classes, str) else classes)
+
+
+def tag_filter(predicate: Callable[[str, dict], bool]):
+    """`parse_only` filter keeping the top-level tags for which `predicate(name, attrs)` holds, with their content."""
+    if ElementFilter is None:
+        # Older SoupStrainers call a function given as `name` with the tag name and attributes while parsing.
+        return SoupStrainer(predicate)
+
+    class PredicateFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            return predicate(name, attrs or {})
+
+        def allow_string_creation(self, string) -> bool:
+            return False
+
+    return PredicateFilter()
+
+
+# Only the parts of each page the downloaders read are built into a tree; everything else is skipped.
+SEARCH_RESULTS = SoupStrainer("li", class_="booklink")
+BOOK_PAGE = tag_filter(
+    lambda name, attrs: (name == "table" and _has_class(attrs, "bibrec"))
+    or (name == "a" and "txt.utf-8" in (attrs.get("href") or ""))
+)
+WIKISOURCE_CONTENT = SoupStrainer("div", class_="mw-parser-output")
+
+
+def parse_html(markup: Union[str, bytes], parse_only=None) -> BeautifulSoup:
+    """Parse a page with the configured backend, building only the elements matched by `parse_only`."""
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=parse_only)
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Token bucket limiting requests to `rate` per second with bursts of up to `capacity`.
+
+    Callers reserve a token and wait until it becomes available, so concurrent callers (threads or
+    coroutines) are served in arrival order and the long-run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt, and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire_blocking(self) -> None:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+# Statuses worth retrying: timeouts, throttling and transient server errors. Any other 4xx or 5xx
+# (404, 410, 403, ...) will not change on a retry.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+# Longest Retry-After honored; a server asking for more is waited on this long, then tried again.
+MAX_RETRY_AFTER = 120.0
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds a response's Retry-After header asks to wait (delay-seconds or an HTTP date), if any."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return min(max(0.0, (when - datetime.now(timezone.utc)).total_seconds()), MAX_RETRY_AFTER)
+
+
+class _HostState:
+    __slots__ = ("limit", "in_flight", "interval", "next_start", "blocked_until", "latency", "baseline",
+                 "requests", "throttled", "errors")
+
+    def __init__(self):
+        self.limit = 1.0
+        self.in_flight = 0
+        self.interval = 0.0
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.requests = self.throttled = self.errors = 0
+
+
+class AdaptiveLimiter:
+    """
+    Per-host concurrency and pacing driven by how the server responds (AIMD).
+
+    Every host starts with one request at a time. Each healthy response adds 1/limit to its
+    concurrency limit (about one more slot per round of requests), up to `max_concurrency`, and
+    shortens the pause between request starts. Responses much slower than the host's best
+    (`slow_factor` times its smoothed latency) shrink the limit a little. Errors halve it. Throttling
+    (429, 503) also doubles the pause, from at least `backoff` seconds, and holds every request to
+    the host until the Retry-After the server asked for.
+
+    `acquire` blocks the calling thread (the async downloaders make requests on a thread pool), and
+    each acquire must be followed by a `release` with the outcome.
+    """
+
+    def __init__(self, max_concurrency: int = 4, min_interval: float = 0.0, max_interval: float = 30.0,
+                 backoff: float = 0.25, slow_factor: float = 2.0):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.slow_factor = slow_factor
+        self._hosts: Dict[str, _HostState] = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, url: str) -> str:
+        """Wait until the host of `url` may take one more request; returns the host, for `release`."""
+        host = urlsplit(url).netloc
+        with self._condition:
+            state = self._hosts.setdefault(host, _HostState())
+            while True:
+                now = time.monotonic()
+                wait = max(state.blocked_until, state.next_start) - now
+                if wait <= 0 and state.in_flight < int(state.limit):
+                    break
+                self._condition.wait(wait if wait > 0 else None)
+            state.in_flight += 1
+            state.requests += 1
+            state.next_start = now + state.interval
+            return host
+
+    def release(self, host: str, status: Optional[int], latency: Optional[float] = None,
+                wait: Optional[float] = None) -> None:
+        """
+        Record the outcome of a request: its HTTP status (None if it got no response), the time it took
+        (body included), and the Retry-After it carried.
+        """
+        with self._condition:
+            state = self._hosts[host]
+            state.in_flight -= 1
+            if status in THROTTLE_STATUSES or (wait is not None and status is not None and status >= 400):
+                state.throttled += 1
+                state.limit = max(1.0, state.limit / 2)
+                state.interval = min(self.max_interval, max(self.backoff, state.interval * 2))
+                pause = wait if wait is not None else state.interval
+                state.blocked_until = max(state.blocked_until, time.monotonic() + pause)
+            elif status is None or status in RETRYABLE_STATUSES:
+                state.errors += 1
+                state.limit = max(1.0, state.limit / 2)
+            elif status < 400:
+                self._healthy(state, latency)
+            # Other client errors (404, 410, ...) say nothing about the server's load.
+            self._condition.notify_all()
+
+    def _healthy(self, state: _HostState, latency: Optional[float]) -> None:
+        slow = False
+        if latency is not None:
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            state.baseline = state.latency if state.baseline is None else min(state.baseline, state.latency)
+            slow = state.latency > self.slow_factor * state.baseline
+        if slow:
+            state.limit = max(1.0, state.limit * 0.9)
+        else:
+            state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+        state.interval = max(self.min_interval, state.interval * 0.75 if state.interval > 0.01 else 0.0)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current limit, pause and latency of every host, with its request, throttle and error counts."""
+        with self._condition:
+            return {
+                host: {
+                    "limit": round(state.limit, 2),
+                    "interval_s": round(state.interval, 3),
+                    "latency_ms": round(state.latency * 1000, 1) if state.latency is not None else None,
+                    "requests": state.requests,
+                    "throttled": state.throttled,
+                    "errors": state.errors,
+                }
+                for host, state in self._hosts.items()
+            }
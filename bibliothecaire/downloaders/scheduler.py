@@ -0,0 +1,55 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, Optional
+
+
+class RoundRobinScheduler:
+    """
+    Job queue serving several lanes (e.g. one per author and source) in round-robin order.
+
+    Lanes can be added while workers are already consuming, so downloading starts as soon as the first
+    listing is known, and no lane waits for another one to be exhausted. `get` waits for more jobs
+    until `close` has been called and every job has been handed out. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._lanes: Dict[Hashable, Deque[Any]] = {}
+        self._order: Deque[Hashable] = deque()
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def add(self, lane: Hashable, jobs: Iterable[Any]) -> None:
+        jobs = deque(jobs)
+        if not jobs:
+            return
+        if lane in self._lanes:
+            self._lanes[lane].extend(jobs)
+        else:
+            self._lanes[lane] = jobs
+            self._order.append(lane)
+        self._changed.set()
+
+    def close(self) -> None:
+        """No more lanes will be added; idle consumers are released once the queue is drained."""
+        self._closed = True
+        self._changed.set()
+
+    async def get(self) -> Optional[Any]:
+        """Next job in round-robin order, or None when the scheduler is closed and empty."""
+        while not self._order:
+            if self._closed:
+                return None
+            self._changed.clear()
+            await self._changed.wait()
+
+        lane = self._order.popleft()
+        jobs = self._lanes[lane]
+        job = jobs.popleft()
+        if jobs:
+            self._order.append(lane)
+        else:
+            del self._lanes[lane]
+        return job
+
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self._lanes.values())
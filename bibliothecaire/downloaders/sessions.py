@@ -0,0 +1,134 @@
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+# "gzip,deflate", plus "br" when brotli is installed (urllib3 then decodes it transparently).
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class SessionStats:
+    """Thread-safe counters shared by the sessions of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def record(self, wire_bytes: int, decoded_bytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += wire_bytes
+            self.bytes_decoded += decoded_bytes
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "connections_opened": self.connections_opened,
+                "requests": self.requests,
+                "bytes_received": self.bytes_received,
+                "bytes_decoded": self.bytes_decoded,
+            }
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new TCP connection."""
+
+    def __init__(self, stats: SessionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.connection_opened()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.connection_opened()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+class SessionPool:
+    """
+    One keep-alive `requests.Session` per host, shared by all downloaders using the pool.
+
+    Connections are reused across requests (up to `pool_maxsize` per host, which should be at least
+    the downloader's `max_concurrency`), responses are negotiated compressed, and every request gets
+    a (connect, read) timeout so a stalled socket cannot block a worker forever.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        pool_connections: int = 4,
+        pool_maxsize: int = 10,
+    ):
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.stats = SessionStats()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+                adapter = _CountingAdapter(
+                    self.stats, pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def record(self, response: requests.Response, decoded_bytes: Optional[int] = None) -> None:
+        """
+        Count the bytes of a fully read response, as sent over the wire and after decompression.
+        A streamed response has no `content`; pass the number of bytes read from it instead.
+        """
+        if decoded_bytes is None:
+            decoded_bytes = len(response.content)
+        wire_bytes = response.raw.tell() if response.raw is not None else decoded_bytes
+        self.stats.record(wire_bytes, decoded_bytes)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_pool: Optional[SessionPool] = None
+
+
+def default_session_pool() -> SessionPool:
+    """The pool shared by downloaders that are not given one explicitly."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SessionPool()
+    return _default_pool
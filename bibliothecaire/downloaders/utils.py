@@ -1,14 +1,37 @@
+import codecs
+import hashlib
+import os
 import re
 import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Tuple
 import requests
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+from .sessions import SessionPool
+
+logger = logging.getLogger(__name__)
 
 # Constants
 INVALID_FILENAME_CHARS = r'[\\/*?:"<>|]'
+CHUNK_SIZE = 64 * 1024
+
+
+class SavedFile(NamedTuple):
+    """A downloaded file: where it is, its size in bytes and SHA-256, and whether it came from the cache."""
+    path: Path
+    size: int
+    sha256: str
+    from_cache: bool = False
+
+
+class SavedText(NamedTuple):
+    """A saved work handed to a downloader's sink: its source, file and SHA-256, and its text if still in memory."""
+    source: str
+    path: Path
+    sha256: str
+    text: Optional[str] = None
 
 
 def sanitize_filename(filename: str) -> str:
@@ -20,27 +43,103 @@ def sanitize_filename(filename: str) -> str:
     return cleaned
 
 
-def fetch_page(url: str, headers: Optional[dict] = None) -> Optional[requests.Response]:
+def fetch_page(
+    url: str, headers: Optional[dict] = None, sessions: Optional[SessionPool] = None, stream: bool = False,
+    raise_errors: bool = False,
+) -> Optional[requests.Response]:
     """
     Fetch a web page with optional HTTP headers.
-    Returns the response object if successful, else None.
+    With a session pool, the request reuses the pooled connection to the host and is bounded by the pool's timeouts.
+    With `stream`, the body is left unread for `iter_content`; the caller must close the response.
+    Returns the response object if successful, else None. With `raise_errors`, failures are raised
+    instead: an error status as `requests.HTTPError`, whose `response` has the status code and headers.
     """
     try:
-        response = requests.get(url, headers=headers or {})
-        response.raise_for_status()
+        if sessions is None:
+            response = requests.get(url, headers=headers or {}, stream=stream)
+        else:
+            response = sessions.session_for(url).get(url, headers=headers or {}, timeout=sessions.timeout, stream=stream)
+            if not stream:
+                sessions.record(response)
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
         return response
     except requests.RequestException as e:
-        logging.error(f"Failed to fetch {url}: {e}")
+        if raise_errors:
+            raise
+        logger.error(f"Failed to fetch {url}: {e}")
         return None
 
 
-def save_text_to_file(text: str, path: str) -> None:
+@contextmanager
+def atomic_open(path: str) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file next to `path` for binary writing, and move it into place only once it is
+    completely written. A crash or an error midway leaves any previous file untouched and no partial one.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_chunks(chunks: Iterable[bytes], path: str, encoding: Optional[str] = "utf-8") -> Tuple[int, str]:
+    """
+    Atomically write a stream of bytes in `encoding` to `path` as UTF-8, one chunk at a time.
+    Bytes that are invalid in `encoding` (UTF-8 included) are replaced by U+FFFD, as `response.text` does,
+    so the file always reads back as UTF-8. Returns the size and SHA-256 of the written file.
+    """
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    digest = hashlib.sha256()
+    size = 0
+    with atomic_open(path) as f:
+        for chunk in chunks:
+            chunk = decoder.decode(chunk).encode("utf-8")
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        chunk = decoder.decode(b"", final=True).encode("utf-8")
+        f.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def stream_to_file(response: requests.Response, path: str, sessions: Optional[SessionPool] = None) -> Tuple[int, str]:
+    """
+    Write the body of a streamed response to `path` as UTF-8 without holding it in memory.
+    Returns the size and SHA-256 of the written file.
+    """
+    # Unlike `response.text`, no charset detection: a text/* response without a charset is assumed to be UTF-8.
+    encoding = response.encoding if "charset" in response.headers.get("Content-Type", "") else "utf-8"
+    with response:
+        size, digest = write_chunks(response.iter_content(CHUNK_SIZE), path, encoding)
+        if sessions is not None:
+            sessions.record(response, decoded_bytes=size)
+    return size, digest
+
+
+def save_text_to_file(text: str, path: str) -> bool:
     """
     Save a given text string to a file at the specified path.
+    The file is replaced atomically, so it is never left half written.
+    Returns whether the file was written.
     """
     try:
-        file_path = Path(path)
-        file_path.write_text(text, encoding="utf-8")
-        logging.info(f"Saved: {file_path}")
+        with atomic_open(path) as f:
+            f.write(text.encode("utf-8"))
+        logger.info(f"Saved: {path}")
+        return True
     except IOError as e:
-        logging.error(f"Error saving file {path}: {e}")
+        logger.error(f"Error saving file {path}: {e}")
+        return False
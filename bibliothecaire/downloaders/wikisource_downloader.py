@@ -1,37 +1,73 @@
 import logging
+import re
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Generator, List, Optional, Tuple
+from urllib.parse import unquote, urlencode, urlsplit
 
 from bs4 import BeautifulSoup
+from requests import Response
 
-from .base_downloader import BaseDownloader
+from .async_downloader import AsyncBaseDownloader
+from .ledger import FAILED, FETCHED, SAVED, SKIPPED
+from .parsing import WIKISOURCE_CONTENT, parse_html
 from .utils import sanitize_filename, save_text_to_file
+from .wikitext import pages_tags, transcluded_pages, wikitext_to_text
 
 logger = logging.getLogger(__name__)
 
 
 WIKISOURCE_BASE_URL = "https://fr.wikisource.org"
 CHARS_THRESHOLD = 1000
+API_BATCH = 50  # titles per `prop=revisions` request, the API limit for anonymous clients
 
+# An API conversation: yields API URLs, is sent their decoded JSON (None on failure), returns its result.
+ApiSteps = Generator[str, Optional[dict], Optional[object]]
 
-class WikisourceDownloader(BaseDownloader):
-    def download(self, author_name: str) -> None:
-        author_folder = self._author_folder(author_name)
-        url = f"{WIKISOURCE_BASE_URL}/wiki/Auteur:{author_name.replace(' ', '_')}"
 
-        response = self._retry_fetch(url)
+def _natural_key(title: str) -> list:
+    """Sort key putting "Chapitre 2" before "Chapitre 10"."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", title)]
+
+
+class WikisourceDownloader(AsyncBaseDownloader):
+    """
+    Downloader for French Wikisource.
+
+    By default, the rendered HTML of each work page is parsed and its paragraphs kept. With `use_api`,
+    works are read as wikitext through the MediaWiki API instead: the page and all its subpages
+    (chapters, volumes) are fetched `API_BATCH` titles per request, along with the scanned Page: pages
+    their `<pages index=...>` tags transclude, and converted to plain text by `wikitext_to_text`.
+    A complete work then costs a few requests, subpages included.
+    """
+
+    source = "wikisource"
+    base_url = WIKISOURCE_BASE_URL
+
+    def __init__(self, *args, use_api: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_api = use_api
+
+    def _discover(self, author_name: str) -> Optional[List[Tuple[str, str]]]:
+        response = self._retry_fetch(self._author_url(author_name))
         if not response:
-            return
+            return None
+        return self._parse_author_page(response)
+
+    async def _adiscover(self, author_name: str) -> Optional[List[Tuple[str, str]]]:
+        response = await self._aretry_fetch(self._author_url(author_name))
+        if not response:
+            return None
+        return await self._run_blocking(self._parse_author_page, response)
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        work_links = self._extract_links(soup)
+    def _parse_author_page(self, response: Response) -> List[Tuple[str, str]]:
+        return self._extract_links(parse_html(response.text, WIKISOURCE_CONTENT))
 
-        for title, work_url in work_links:
-            self._process_work(title, work_url, author_folder)
+    def _author_url(self, author_name: str) -> str:
+        return f"{self.base_url}/wiki/Auteur:{author_name.replace(' ', '_')}"
 
     def _extract_links(self, soup: BeautifulSoup) -> List[Tuple[str, str]]:
         return [
-            (link.text.strip(), WIKISOURCE_BASE_URL + link['href'])
+            (link.text.strip(), self.base_url + link['href'])
             for link in soup.select("div.mw-parser-output ul li a")
             if link.get('href', '').startswith('/wiki/')
             and "poésies" not in link.text.lower()
@@ -41,17 +77,161 @@ class WikisourceDownloader(BaseDownloader):
     def _process_work(self, title: str, url: str, author_folder: Path) -> None:
         title = sanitize_filename(title)
         if not title:
+            self._mark(url, SKIPPED, reason="empty title")
             return
 
-
-        response = self._retry_fetch(url)
-        if not response:
+        if self.use_api:
+            text = self._drive(self._api_text(url))
+            if text is None:
+                self._mark(url, FAILED, error="api")
+                return
+            response = None
+        else:
+            response = self._retry_fetch(url)
+            if not response:
+                self._mark(url, FAILED, error="work page")
+                return
+            text = self._extract_text(response)
+
+        self._mark(url, FETCHED)
+        file_path = self._save_text(url, title, text, author_folder)
+        if file_path:
+            self._hand_over(file_path, text=text)
+            self._delay(response)
+
+    async def _aprocess_work(self, title: str, url: str, author_folder: Path) -> None:
+        title = sanitize_filename(title)
+        if not title:
+            self._mark(url, SKIPPED, reason="empty title")
             return
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        if self.use_api:
+            text = await self._adrive(self._api_text(url))
+            if text is None:
+                self._mark(url, FAILED, error="api")
+                return
+            response = None
+        else:
+            response = await self._aretry_fetch(url)
+            if not response:
+                self._mark(url, FAILED, error="work page")
+                return
+            text = await self._run_blocking(self._extract_text, response)
+
+        self._mark(url, FETCHED)
+        file_path = self._save_text(url, title, text, author_folder)
+        if file_path:
+            await self._ahand_over(file_path, text=text)
+            await self._adelay(response)
+
+    def _save_text(self, url: str, title: str, text: Optional[str], author_folder: Path) -> Optional[Path]:
+        """Save the text of a work and return its file, or None if it has no usable text."""
+        if not text or len(text) < CHARS_THRESHOLD:
+            self._mark(url, SKIPPED, reason="no text")
+            return None
+
+        file_path = self._work_path(author_folder, title, url)
+        if not save_text_to_file(text, str(file_path)):
+            self._mark(url, FAILED, error="save")
+            return None
+        self._mark(url, SAVED, path=str(file_path))
+        return file_path
+
+    def _api_url(self, **params) -> str:
+        params = {"action": "query", "format": "json", "formatversion": "2", **params}
+        return f"{self.base_url}/w/api.php?{urlencode(params)}"
+
+    @staticmethod
+    def _page_title(url: str) -> str:
+        return unquote(urlsplit(url).path[len("/wiki/"):]).replace("_", " ")
+
+    def _drive(self, steps: ApiSteps) -> Optional[object]:
+        """Run an API conversation with blocking requests."""
+        try:
+            url = next(steps)
+            while True:
+                url = steps.send(self._api_json(self._retry_fetch(url)))
+        except StopIteration as done:
+            return done.value
+
+    async def _adrive(self, steps: ApiSteps) -> Optional[object]:
+        """Run an API conversation with asynchronous requests."""
+        try:
+            url = next(steps)
+            while True:
+                url = steps.send(self._api_json(await self._aretry_fetch(url)))
+        except StopIteration as done:
+            return done.value
+
+    @staticmethod
+    def _api_json(response: Optional[Response]) -> Optional[dict]:
+        if response is None:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        if "error" in data:
+            logger.warning(f"Wikisource API error for {response.url}: {data['error']}")
+            return None
+        return data
+
+    def _api_text(self, url: str) -> ApiSteps:
+        """The plain text of a work page, its subpages and the scanned pages they transclude."""
+        title = self._page_title(url)
+        subpages: List[str] = []
+        params = {"list": "allpages", "apprefix": title + "/", "apnamespace": 0, "aplimit": "max"}
+        while True:
+            data = yield self._api_url(**params)
+            if data is None:
+                return None
+            subpages += [page["title"] for page in data["query"]["allpages"]]
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+
+        titles = [title] + sorted(subpages, key=_natural_key)
+        wikitexts = yield from self._api_wikitexts(titles)
+        if wikitexts is None:
+            return None
+
+        scans = list(dict.fromkeys(
+            page
+            for title in titles
+            for tag in pages_tags(wikitexts.get(title, ""))
+            for page in transcluded_pages(tag) or []
+        ))
+        pages = yield from self._api_wikitexts(scans)
+        if pages is None:
+            return None
+
+        texts = (wikitext_to_text(wikitexts[title], pages) for title in titles if title in wikitexts)
+        return "\n".join(text for text in texts if text)
+
+    def _api_wikitexts(self, titles: List[str]) -> ApiSteps:
+        """Current wikitext of pages by title, `API_BATCH` titles per request; missing pages are left out."""
+        wikitexts: Dict[str, str] = {}
+        for start in range(0, len(titles), API_BATCH):
+            data = yield self._api_url(
+                prop="revisions", rvprop="content", rvslots="main", titles="|".join(titles[start:start + API_BATCH])
+            )
+            if data is None:
+                return None
+            aliases = {item["to"]: item["from"] for item in data["query"].get("normalized", [])}
+            for page in data["query"].get("pages", []):
+                if page.get("revisions"):
+                    content = page["revisions"][0]["slots"]["main"]["content"]
+                    wikitexts[page["title"]] = content
+                    if page["title"] in aliases:
+                        wikitexts[aliases[page["title"]]] = content
+        return wikitexts
+
+    @staticmethod
+    def _extract_text(response: Response) -> Optional[str]:
+        soup = parse_html(response.text, WIKISOURCE_CONTENT)
         content_block = soup.find("div", class_="mw-parser-output")
         if not content_block:
-            return
+            return None
 
         paragraphs = [
             p.get_text().strip()
@@ -60,15 +240,9 @@ class WikisourceDownloader(BaseDownloader):
         ]
 
         if not paragraphs:
-            return
-
-        text = "\n".join(paragraphs)
-        if len(text) < CHARS_THRESHOLD:
-            return
+            return None
 
-        file_path = author_folder / f"{title}.txt"
-        save_text_to_file(text, str(file_path))
-        self._delay()
+        return "\n".join(paragraphs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import html
+import re
+from typing import Dict, List, Optional
+
+# Formatting templates whose text is their first (or, for these few, second) positional parameter;
+# any other template ({{nr|...}}, {{Table|...}}, {{—}}, ...) is layout or metadata and is dropped.
+FIRST_PARAM_TEMPLATES = {
+    "c", "centré", "centre", "sc", "pc", "t", "t2", "t3", "t4", "t5", "taille", "g", "gauche", "d", "droite",
+    "nobr", "sm", "gras", "it", "i", "romain", "rom", "rom-maj", "rom-min", "souligné", "u", "ls", "espacé",
+    "lettrine", "di", "personnage", "didascalie", "bloc centré", "a", "s", "p",
+}
+SECOND_PARAM_TEMPLATES = {"lang", "corr"}
+
+COMMENT = re.compile(r"<!--.*?-->", re.S)
+NOINCLUDE = re.compile(r"<noinclude>.*?</noinclude>", re.S | re.I)
+REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+PAGES_TAG = re.compile(r"<pages\s([^>]*?)/?>(?:\s*</pages>)?", re.I)
+ATTRIBUTE = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'/>]+))""")
+POEM = re.compile(r"<poem[^>]*>(.*?)</poem>", re.S | re.I)
+TABLE = re.compile(r"^\{\|.*?^\|\}", re.S | re.M)
+INNER_TEMPLATE = re.compile(r"\{\{([^{}]*)\}\}")
+LINK = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]")
+EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+HEADING = re.compile(r"^(=+)\s*(.*?)\s*\1\s*$", re.M)
+BOLD_ITALIC = re.compile(r"'{2,}")
+BR = re.compile(r"<br\s*/?>", re.I)
+TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+MAGIC_WORD = re.compile(r"__[A-Z]+__")
+LIST_ITEM = re.compile(r"^[*#:;]+\s*(.*)$", re.M)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+HIDDEN_LINK_PREFIXES = ("fichier:", "file:", "image:", "catégorie:", "category:")
+
+LINE_BREAK = "\x0b"
+
+
+def pages_tags(wikitext: str) -> List[Dict[str, str]]:
+    """Attributes of the `<pages index=... from=... to=... />` transclusion tags of a page."""
+    tags = []
+    for match in PAGES_TAG.finditer(wikitext):
+        tags.append({
+            name.lower(): next(value for value in values if value)
+            for name, *values in ATTRIBUTE.findall(match.group(1))
+            if any(values)
+        })
+    return tags
+
+
+def transcluded_pages(tag: Dict[str, str]) -> Optional[List[str]]:
+    """
+    Titles of the Page: namespace pages a `<pages>` tag transcludes, or None if they cannot be derived
+    from the tag alone (indexes that are not a single DjVu/PDF file number their pages in the Livre: page).
+    """
+    index = tag.get("index", "")
+    if not index.lower().endswith((".djvu", ".pdf")):
+        return None
+    try:
+        first, last = int(tag.get("from", 1)), int(tag.get("to", tag.get("from", 1)))
+    except ValueError:
+        return None
+    numbers = list(range(first, last + 1))
+    for number in tag.get("include", "").replace(",", " ").split():
+        if number.isdigit() and int(number) not in numbers:
+            numbers.append(int(number))
+    excluded = {int(number) for number in tag.get("exclude", "").replace(",", " ").split() if number.isdigit()}
+    return [f"Page:{index}/{number}" for number in sorted(numbers) if number not in excluded]
+
+
+def _render_template(match: "re.Match") -> str:
+    name, *params = match.group(1).split("|")
+    name = name.strip().lower()
+    positional = [param.strip() for param in params if "=" not in param]
+    if name in FIRST_PARAM_TEMPLATES and positional:
+        return positional[0]
+    if name in SECOND_PARAM_TEMPLATES and len(positional) > 1:
+        return positional[1]
+    if name == "tiret2" and len(positional) > 1:
+        # A word hyphenated across two pages: {{tiret|exem|ple}} ends one page, {{tiret2|exem|ple}}
+        # starts the next one, and the transcluded text shows the whole word once.
+        return positional[0] + positional[1]
+    return ""
+
+
+def _render_link(match: "re.Match") -> str:
+    target, label = match.group(1), match.group(2)
+    if target.strip().lower().startswith(HIDDEN_LINK_PREFIXES):
+        return ""
+    return label if label is not None else target.lstrip(":/")
+
+
+def wikitext_to_text(wikitext: str, pages: Optional[Dict[str, str]] = None) -> str:
+    """
+    Convert the wikitext of a Wikisource page to plain text, one paragraph per line.
+
+    `<pages>` transclusion tags are replaced by the wikitext of the transcluded Page: pages found in `pages`
+    (by title). Formatting templates keep their text, other templates, references, tables, files and
+    categories are dropped, links keep their label, and `<poem>` blocks keep their line breaks.
+    """
+    if pages is not None:
+        def transclude(match: "re.Match") -> str:
+            titles = transcluded_pages(pages_tags(match.group(0))[0]) or []
+            return "\n".join(NOINCLUDE.sub("", pages.get(title, "")) for title in titles)
+        wikitext = PAGES_TAG.sub(transclude, wikitext)
+
+    text = COMMENT.sub("", wikitext)
+    text = NOINCLUDE.sub("", text)
+    text = REF.sub("", text)
+    text = POEM.sub(lambda match: BR.sub("\n", match.group(1)).strip().replace("\n", LINE_BREAK), text)
+    text = TABLE.sub("", text)
+    text = LINK.sub(_render_link, text)
+    while True:
+        text, count = INNER_TEMPLATE.subn(_render_template, text)
+        if not count:
+            break
+    text = EXTERNAL_LINK.sub(r"\1", text)
+    text = HEADING.sub(r"\n\n\2\n\n", text)
+    text = BOLD_ITALIC.sub("", text)
+    text = BR.sub(LINE_BREAK, text)
+    text = TAG.sub("", text)
+    text = MAGIC_WORD.sub("", text)
+    text = LIST_ITEM.sub(LINE_BREAK + r"\1" + LINE_BREAK, text)
+    text = html.unescape(text).replace("\xa0", " ")
+
+    paragraphs = []
+    for block in PARAGRAPH_BREAK.split(text):
+        lines = [" ".join(line.split()) for line in " ".join(block.split("\n")).split(LINE_BREAK)]
+        paragraph = "\n".join(line for line in lines if line)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n".join(paragraphs)
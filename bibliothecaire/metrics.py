@@ -0,0 +1,217 @@
+"""Counters, histograms and structured events shared by the downloaders and the cleaner.
+
+Metrics are off by default: the module functions (`inc`, `observe`, `event`) then return at once, so
+instrumented code pays one call per update. `enable` installs a `MetricsRegistry` for the process,
+which can be written as a Prometheus text file or a JSON snapshot, and optionally streams every event
+as one JSON line:
+
+    with metrics.recording("run.prom", events_path="events.jsonl"):
+        process_directory("downloads", "cleaned_texts")
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Metric names, with their type and help text.
+HTTP_REQUESTS = "bibliothecaire_http_requests_total"
+HTTP_SECONDS = "bibliothecaire_http_request_seconds"
+HTTP_RECEIVED_BYTES = "bibliothecaire_http_received_bytes_total"
+HTTP_RETRIES = "bibliothecaire_http_retries_total"
+CACHE_HITS = "bibliothecaire_cache_hits_total"
+WORKS = "bibliothecaire_works_total"
+FILES_CLEANED = "bibliothecaire_files_cleaned_total"
+CLEAN_SECONDS = "bibliothecaire_clean_seconds"
+CLEANED_BYTES = "bibliothecaire_cleaned_bytes_total"
+RULE_REMOVED_CHARS = "bibliothecaire_rule_removed_chars_total"
+
+METRICS: Dict[str, Tuple[str, str]] = {
+    HTTP_REQUESTS: ("counter", "HTTP requests made, by host and status (0 when no response came)"),
+    HTTP_SECONDS: ("histogram", "Time to the response headers, by host"),
+    HTTP_RECEIVED_BYTES: ("counter", "Decoded bytes received, by source"),
+    HTTP_RETRIES: ("counter", "Attempts that retried a failed request, by source"),
+    CACHE_HITS: ("counter", "Responses served from the response cache, by source and kind (fresh, revalidated)"),
+    WORKS: ("counter", "Works handled, by source and final state"),
+    FILES_CLEANED: ("counter", "Files handled by the cleaner, by outcome"),
+    CLEAN_SECONDS: ("histogram", "Time to clean one file"),
+    CLEANED_BYTES: ("counter", "Bytes read and written by the cleaner, by direction (in, out)"),
+    RULE_REMOVED_CHARS: ("counter", "Characters removed by each cleaning rule"),
+}
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Labelled counters and histograms of one process, safe to update from several threads.
+
+    Counters only go up; histograms count observations in `buckets` (cumulative in the Prometheus
+    output). `snapshot` also gives the rate of every counter over the registry's lifetime, e.g. bytes
+    per second. With `events_path`, `event` appends one JSON object per line there.
+    """
+
+    def __init__(self, events_path: Optional[str] = None, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._lock = threading.Lock()
+        self._events = open(events_path, "a", encoding="utf-8") if events_path else None
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def event(self, kind: str, **fields) -> None:
+        if self._events is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 6), "event": kind, **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            self._events.write(line + "\n")
+
+    def snapshot(self) -> dict:
+        """Every series as plain data: counters with their rate per second, histograms with their buckets."""
+        elapsed = time.monotonic() - self._start
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value, "per_s": value / elapsed if elapsed else 0.0}
+                       for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [{"labels": dict(key), "count": h.count, "sum": h.sum,
+                        "buckets": dict(zip([*map(str, self.buckets), "+Inf"], h.counts))}
+                       for key, h in series.items()]
+                for name, series in self._histograms.items()
+            }
+        return {"started": self.started, "elapsed_s": elapsed, "counters": counters, "histograms": histograms}
+
+    def prometheus(self) -> str:
+        """The series in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._histograms)):
+                kind, help_text = METRICS.get(name, ("histogram" if name in self._histograms else "counter", name))
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for key, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip([*map(str, self.buckets), "+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write a JSON snapshot if `path` ends with .json, else the Prometheus text; replaced atomically."""
+        content = json.dumps(self.snapshot(), indent=2) if path.lower().endswith(".json") else self.prometheus()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def close(self) -> None:
+        if self._events is not None:
+            self._events.close()
+            self._events = None
+
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+
+# The registry of this process, or None while metrics are disabled.
+registry: Optional[MetricsRegistry] = None
+
+
+def enable(events_path: Optional[str] = None) -> MetricsRegistry:
+    """Start recording metrics in a new registry (closing any previous one) and return it."""
+    global registry
+    disable()
+    registry = MetricsRegistry(events_path)
+    return registry
+
+
+def disable() -> None:
+    global registry
+    if registry is not None:
+        registry.close()
+    registry = None
+
+
+def enabled() -> bool:
+    """Whether metrics are recorded; check it before computing a costly value to record."""
+    return registry is not None
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    if registry is not None:
+        registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if registry is not None:
+        registry.observe(name, value, **labels)
+
+
+def event(kind: str, **fields) -> None:
+    if registry is not None:
+        registry.event(kind, **fields)
+
+
+@contextmanager
+def recording(metrics_path: Optional[str] = None, events_path: Optional[str] = None) -> Iterator[Optional[MetricsRegistry]]:
+    """
+    Record metrics for the duration of the block if either path is given, then write them to
+    `metrics_path` (see `MetricsRegistry.write`) and disable them again. Without paths, does nothing.
+    """
+    if not metrics_path and not events_path:
+        yield None
+        return
+    current = enable(events_path)
+    try:
+        yield current
+    finally:
+        if metrics_path:
+            current.write(metrics_path)
+        disable()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The --metrics and --events options of the commands, for `recording`."""
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write metrics when done: a JSON snapshot if PATH ends with .json, else Prometheus text")
+    parser.add_argument("--events", metavar="PATH", help="append a JSON line per request, work and file to PATH")
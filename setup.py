@@ -23,10 +23,16 @@ setup(
         "requests",
         "beautifulsoup4"
     ],
+    extras_require={
+        "brotli": ["brotli"],
+        "lxml": ["lxml"],
+        "numpy": ["numpy"],
+    },
     entry_points={
         'console_scripts': [
-            'process_file = bibliothecaire:process_file',
-            'process_directory = bibliothecaire:process_directory',
+            'bibliothecaire = bibliothecaire.cli:main',
+            'process_directory = bibliothecaire.cleaner.clean_up:main',
+            'download_many = bibliothecaire.downloaders.combined_downloader:main',
         ]
     },
     classifiers=[
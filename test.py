@@ -1,17 +1,14 @@
-from bibliothecaire import CombinedDownloader, process_directory
+from bibliothecaire import CleaningSink, CombinedDownloader
 
 
-def download_hugo(downloads_folder):
-    downloader = CombinedDownloader(base_folder=downloads_folder)
-    downloader.download_all("Victor Hugo")
-
-def clean_hugo(downloads_folder):
-    process_directory(downloads_folder + "/Victor_Hugo", downloads_folder + "/cleaned_Victor_Hugo")
+def download_and_clean_hugo(downloads_folder, cleaned_folder):
+    # Works are cleaned by a pool of processes as they are saved, while the next ones download.
+    with CleaningSink(downloads_folder, cleaned_folder) as sink:
+        downloader = CombinedDownloader(base_folder=downloads_folder, sink=sink)
+        downloader.download_all("Victor Hugo")
 
 def main():
-    downloads_folder = "downloads"
-    download_hugo(downloads_folder)
-    clean_hugo(downloads_folder)
+    download_and_clean_hugo("downloads", "cleaned_texts")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.fixture_server import start_server
+
+
+@pytest.fixture
+def fixture_server():
+    """Start the local Gutenberg/Wikisource stand-in with the given settings; returns its base URL."""
+    servers = []
+
+    def start(**settings) -> str:
+        settings.setdefault("latency", 0.0)
+        settings.setdefault("text_size", 5_000)
+        server, base_url = start_server(**settings)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
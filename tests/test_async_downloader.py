@@ -0,0 +1,39 @@
+import asyncio
+
+from bibliothecaire.downloaders import GutenbergDownloader
+
+AUTHOR = "Auteur Test"
+DELAY = 0.1
+
+
+def _downloader(folder, base_url, max_concurrency=4):
+    downloader = GutenbergDownloader(str(folder), delay_range=(DELAY, DELAY), max_concurrency=max_concurrency)
+    downloader.base_url = base_url
+    return downloader
+
+
+def test_single_slot_replays_the_sequential_request_pattern(fixture_server, tmp_path):
+    sequential_log, concurrent_log = [], []
+    _downloader(tmp_path / "sync", fixture_server(n_works=5, log=sequential_log)).download(AUTHOR)
+    downloader = _downloader(tmp_path / "async", fixture_server(n_works=5, log=concurrent_log), max_concurrency=1)
+    asyncio.run(downloader.adownload(AUTHOR))
+
+    assert [path for _, path in concurrent_log] == [path for _, path in sequential_log]
+    # Every saved text is followed by the polite delay before the next book page is requested.
+    for (arrival, path), (next_arrival, _) in zip(concurrent_log, concurrent_log[1:]):
+        if path.endswith(".txt.utf-8"):
+            assert next_arrival - arrival >= DELAY * 0.9
+    assert downloader.outcomes["saved"] == 4
+
+
+def test_delays_space_the_requests_of_each_slot(fixture_server, tmp_path):
+    log = []
+    downloader = _downloader(tmp_path, fixture_server(n_works=12, log=log), max_concurrency=3)
+    asyncio.run(downloader.adownload(AUTHOR))
+
+    texts = [arrival for arrival, path in log if path.endswith(".txt.utf-8")]
+    assert len(texts) == downloader.outcomes["saved"] == 10
+    # A slot waits out the delay after each saved text, so two of any four texts in a row
+    # came through the same slot, a delay apart.
+    for first, fourth in zip(texts, texts[3:]):
+        assert fourth - first >= DELAY * 0.9
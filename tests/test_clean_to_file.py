@@ -0,0 +1,41 @@
+import importlib
+
+import pytest
+
+from bibliothecaire.cleaner.streaming import StreamingCleaner
+
+# The package re-exports the `clean_up` function under the module's name.
+clean_up = importlib.import_module("bibliothecaire.cleaner.clean_up")
+
+TEXT = "Il était une fois une maison.\n\nLa nuit tombait sur le jardin.\n" * 50
+
+
+def _failing_clean(self, source, write):
+    write("Il était une fois")
+    raise ValueError("disk trouble")
+
+
+def test_failed_stream_leaves_no_partial_output(tmp_path, monkeypatch):
+    input_file, output_file = tmp_path / "livre.txt", tmp_path / "out" / "livre.txt"
+    input_file.write_text(TEXT, encoding="utf-8")
+    output_file.parent.mkdir()
+    output_file.write_text("earlier output", encoding="utf-8")
+    monkeypatch.setattr(StreamingCleaner, "clean", _failing_clean)
+
+    result = clean_up._clean_to_file((str(input_file), str(output_file), None, 0, None, False))
+    assert result.error == "ValueError: disk trouble" and not result.timed_out
+    assert list(output_file.parent.iterdir()) == []
+
+
+def test_stream_file_replaces_the_output_only_when_done(tmp_path, monkeypatch):
+    input_file, output_file = tmp_path / "livre.txt", tmp_path / "sortie.txt"
+    input_file.write_text(TEXT, encoding="utf-8")
+    output_file.write_text("earlier output", encoding="utf-8")
+    clean_up.stream_file(str(input_file), str(output_file))
+    assert output_file.read_text(encoding="utf-8") == clean_up.process_file(str(input_file))
+
+    monkeypatch.setattr(StreamingCleaner, "clean", _failing_clean)
+    with pytest.raises(ValueError):
+        clean_up.stream_file(str(input_file), str(output_file))
+    assert output_file.read_text(encoding="utf-8") == clean_up.process_file(str(input_file))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["livre.txt", "sortie.txt"]
@@ -0,0 +1,41 @@
+"""Golden-file tests: cleaning must stay byte-identical to the original `clean_up`.
+
+The inputs in fixtures/cleaning are a Gutenberg file, a Wikisource export, a text packed with beginning and
+ending markers and other rule triggers, one with a "Produced by" header block, and plain prose. The files in
+fixtures/cleaning/expected were produced by the original, unoptimized `clean_up` and `process_file`
+(`<name>.txt` and `<name>.file.txt`); never regenerate them from the current code.
+"""
+from pathlib import Path
+
+import pytest
+
+from bibliothecaire.cleaner import CleaningPipeline, clean_up, process_file, process_text
+
+FIXTURES = Path(__file__).parent / "fixtures" / "cleaning"
+INPUTS = sorted(FIXTURES.glob("*.txt"))
+
+
+def _read(path: Path) -> str:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.fixture(params=INPUTS, ids=[path.stem for path in INPUTS])
+def fixture(request) -> Path:
+    return request.param
+
+
+def test_clean_up_matches_golden(fixture):
+    assert clean_up(_read(fixture)) == _read(FIXTURES / "expected" / fixture.name)
+
+
+def test_fresh_pipeline_matches_golden(fixture):
+    assert CleaningPipeline().clean(_read(fixture)) == _read(FIXTURES / "expected" / fixture.name)
+
+
+def test_process_file_matches_golden(fixture):
+    assert process_file(str(fixture)) == _read(FIXTURES / "expected" / f"{fixture.stem}.file.txt")
+
+
+def test_process_text_matches_process_file(fixture):
+    assert process_text(_read(fixture), fixture.name) == _read(FIXTURES / "expected" / f"{fixture.stem}.file.txt")
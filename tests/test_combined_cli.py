@@ -0,0 +1,16 @@
+import argparse
+
+import pytest
+
+from bibliothecaire.downloaders.combined_downloader import _parse_rate
+
+
+def test_rate_of_a_known_source():
+    assert _parse_rate(" Gutenberg=2") == ("gutenberg", 2.0)
+    assert _parse_rate("wikisource=0.5") == ("wikisource", 0.5)
+
+
+@pytest.mark.parametrize("value", ["gutenburg=2", "=2", "gutenberg=vite", "gutenberg"])
+def test_bad_rate_is_rejected(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        _parse_rate(value)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from bibliothecaire.cleaner import process_file
+from bibliothecaire.downloaders import GutenbergDownloader
+from bibliothecaire.downloaders.cache import ResponseCache
+from bibliothecaire.downloaders.ledger import FAILED, SAVED, JobLedger
+from bibliothecaire.downloaders.utils import write_chunks
+
+AUTHOR = "Auteur Test"
+
+
+def _downloader(tmp_path, base_url, **kwargs):
+    downloader = GutenbergDownloader(str(tmp_path / "downloads"), enable_delay=False, retries=1,
+                                     cache=ResponseCache(str(tmp_path / "cache")),
+                                     ledger=JobLedger(tmp_path / "ledger.jsonl"), **kwargs)
+    downloader.base_url = base_url
+    return downloader
+
+
+def _evicted(*args, **kwargs):
+    raise FileNotFoundError("cache body evicted")
+
+
+@pytest.mark.parametrize("engine", ["sync", "async"])
+def test_evicted_cache_body_is_downloaded_again(fixture_server, tmp_path, engine):
+    base_url = fixture_server(n_works=4)
+    first = _downloader(tmp_path, base_url)
+    first.download(AUTHOR)
+
+    downloader = _downloader(tmp_path, base_url)
+    downloader.ledger = JobLedger(tmp_path / "fresh.jsonl")
+    downloader.cache.open_body = _evicted
+    downloader.cache.response = _evicted
+    if engine == "sync":
+        downloader.download(AUTHOR)
+    else:
+        asyncio.run(downloader.adownload(AUTHOR))
+    assert downloader.outcomes[SAVED] == first.outcomes[SAVED] > 0
+    assert not downloader.outcomes[FAILED]
+
+
+def test_a_work_that_raises_is_marked_failed_and_the_others_go_on(fixture_server, tmp_path):
+    downloader = _downloader(tmp_path, fixture_server(n_works=4))
+    works = downloader._list_works(AUTHOR)
+    process_work = downloader._process_work
+
+    def flaky(book_url, author_folder):
+        if book_url == works[0][0]:
+            raise OSError("disk full")
+        process_work(book_url, author_folder)
+
+    downloader._process_work = flaky
+    downloader.download(AUTHOR)
+    assert downloader.ledger.state(works[0][0]) == FAILED
+    # Every other work was processed: English books (ids divisible by 5) are skipped, the rest saved.
+    french = [url for (url,) in works[1:] if int(url.rsplit("/", 1)[-1]) % 5]
+    assert downloader.outcomes[SAVED] == len(french) > 0
+
+
+def test_invalid_utf8_bytes_are_replaced(tmp_path):
+    path = tmp_path / "livre.txt"
+    # An invalid byte, then "é" split across two chunks, then a truncated sequence at the very end.
+    chunks = [b"caf\xff ", b"caf\xc3", b"\xa9 \xe2\x80"]
+    size, _ = write_chunks(chunks, str(path))
+    assert path.read_text(encoding="utf-8") == "caf� café �"
+    assert size == path.stat().st_size
+    assert process_file(str(path))
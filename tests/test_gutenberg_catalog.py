@@ -0,0 +1,34 @@
+from benchmarks.fixture_server import write_catalog
+from bibliothecaire.downloaders import GutenbergDownloader
+from bibliothecaire.downloaders.catalog import GutenbergCatalog
+from bibliothecaire.downloaders.ledger import SAVED, SKIPPED, JobLedger
+
+AUTHOR = "Auteur Test"
+
+
+def test_catalog_mode_skips_non_french_books_of_a_recorded_listing(fixture_server, tmp_path):
+    log = []
+    base_url = fixture_server(n_works=10, log=log)
+    csv_path = tmp_path / "pg_catalog.csv"
+    write_catalog(str(csv_path), [AUTHOR], n_works=10)
+    catalog = GutenbergCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.refresh(str(csv_path))
+
+    # A search-mode run listed every book of the author, English ones included, then stopped.
+    ledger = JobLedger(tmp_path / "ledger.jsonl")
+    search = GutenbergDownloader(str(tmp_path / "downloads"), enable_delay=False, ledger=ledger)
+    search.base_url = base_url
+    listing = search._list_works(AUTHOR)
+    assert len(listing) == 10
+
+    downloader = GutenbergDownloader(str(tmp_path / "downloads"), enable_delay=False, ledger=ledger, catalog=catalog)
+    downloader.base_url = base_url
+    log.clear()
+    downloader.download(AUTHOR)
+
+    english = [url for (url,) in listing if int(url.rsplit("/", 1)[-1]) % 5 == 0]
+    assert english and all(ledger.state(url) == SKIPPED for url in english)
+    assert downloader.outcomes[SAVED] == 10 - len(english)
+    # Only the French texts were requested: no book pages, no English texts.
+    assert all(path.endswith(".txt.utf-8") for _, path in log)
+    assert len(log) == 10 - len(english)
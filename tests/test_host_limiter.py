@@ -0,0 +1,27 @@
+from bibliothecaire.downloaders import GutenbergDownloader
+from bibliothecaire.downloaders.rate_limit import AdaptiveLimiter
+
+
+class RecordingLimiter(AdaptiveLimiter):
+    """Records, at each release, the outcome reported and whether the file being downloaded is complete."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.released = []
+
+    def release(self, host, status, latency=None, wait=None):
+        self.released.append((status, latency, self.path.is_file()))
+        super().release(host, status, latency, wait)
+
+
+def test_streamed_download_holds_its_host_slot_until_the_file_is_written(fixture_server, tmp_path):
+    base_url = fixture_server(text_size=200_000)
+    path = tmp_path / "livre.txt"
+    limiter = RecordingLimiter(path)
+    downloader = GutenbergDownloader(str(tmp_path), enable_delay=False, host_limiter=limiter)
+
+    saved = downloader._download(f"{base_url}/ebooks/2.txt.utf-8", path)
+    assert saved.size == path.stat().st_size > 200_000
+    [(status, latency, written)] = limiter.released
+    assert status == 200 and latency > 0 and written
@@ -0,0 +1,80 @@
+import json
+
+from bibliothecaire.downloaders import GutenbergDownloader
+from bibliothecaire.downloaders.ledger import DISCOVERED, SAVED, JobLedger
+
+WORKS = [("https://www.gutenberg.org/ebooks/1",), ("https://www.gutenberg.org/ebooks/2",)]
+
+
+def test_listing_is_replayed(tmp_path):
+    JobLedger(tmp_path / "ledger.jsonl").record_listing("gutenberg", "Auteur", WORKS)
+    ledger = JobLedger(tmp_path / "ledger.jsonl")
+    assert ledger.listing("gutenberg", "Auteur") == WORKS
+    assert ledger.state(WORKS[0][-1]) == DISCOVERED
+
+
+def test_empty_listing_is_not_recorded(tmp_path):
+    ledger = JobLedger(tmp_path / "ledger.jsonl")
+    ledger.record_listing("gutenberg", "Auteur", [])
+    assert ledger.listing("gutenberg", "Auteur") is None
+    assert not (tmp_path / "ledger.jsonl").exists()
+
+
+def test_empty_listing_of_an_older_ledger_is_ignored(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    JobLedger(path).record_listing("gutenberg", "Auteur", WORKS)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"source": "gutenberg", "author": "Auteur", "works": [], "ts": 0}) + "\n")
+    assert JobLedger(path).listing("gutenberg", "Auteur") == WORKS
+
+
+def test_listing_expires(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    JobLedger(path).record_listing("gutenberg", "Auteur", WORKS)
+    assert JobLedger(path, listing_ttl=3600).listing("gutenberg", "Auteur") == WORKS
+    expired = JobLedger(path, listing_ttl=0)
+    assert expired.listing("gutenberg", "Auteur") is None
+    assert expired.listing("gutenberg", "Auteur", expired=True) == WORKS
+
+
+def _downloader(tmp_path, base_url, ledger):
+    downloader = GutenbergDownloader(str(tmp_path / "downloads"), enable_delay=False, retries=1, ledger=ledger)
+    downloader.base_url = base_url
+    return downloader
+
+
+def test_expired_listing_is_searched_again(fixture_server, tmp_path):
+    log = []
+    base_url = fixture_server(n_works=3, log=log)
+    ledger = JobLedger(tmp_path / "ledger.jsonl", listing_ttl=0)
+    ledger.record_listing("gutenberg", "Auteur Test", [(f"{base_url}/ebooks/1",)])
+    _downloader(tmp_path, base_url, ledger).download("Auteur Test")
+    assert any(path.startswith("/ebooks/search/") for _, path in log)
+    assert len(JobLedger(tmp_path / "ledger.jsonl").listing("gutenberg", "Auteur Test")) == 3
+
+
+def test_failed_search_falls_back_to_the_expired_listing(tmp_path):
+    ledger = JobLedger(tmp_path / "ledger.jsonl", listing_ttl=0)
+    ledger.record_listing("gutenberg", "Auteur Test", WORKS)
+    downloader = _downloader(tmp_path, "http://127.0.0.1:9", ledger)  # nothing listens there
+    assert downloader._list_works("Auteur Test") == WORKS
+    assert downloader._list_works("Auteur Inconnu") is None
+
+
+def test_colliding_titles_keep_their_files_across_runs(tmp_path):
+    folder = tmp_path / "downloads" / "Auteur" / "gutenberg"
+    folder.mkdir(parents=True)
+    first, second = WORKS[0][-1], WORKS[1][-1]
+
+    ledger = JobLedger(tmp_path / "ledger.jsonl")
+    downloader = _downloader(tmp_path, "http://127.0.0.1:9", ledger)
+    path = downloader._work_path(folder, "Titre", first)
+    assert path == folder / "Titre.txt"
+    downloader._mark(first, SAVED, path=str(path))
+
+    # A resumed run skips the saved work, so only the ledger knows whose file Titre.txt is.
+    for order in ([second, first], [first, second]):
+        resumed = _downloader(tmp_path, "http://127.0.0.1:9", JobLedger(tmp_path / "ledger.jsonl"))
+        paths = {url: resumed._work_path(folder, "Titre", url) for url in order}
+        assert paths[first] == folder / "Titre.txt"
+        assert paths[second].parent == folder and paths[second].name.startswith("Titre_")
@@ -0,0 +1,14 @@
+from bibliothecaire.cleaner import process_directory
+
+TEXT = "".join(f"Le jardin {i} de la maison était grand, et la nuit y tombait tard.\n\n" for i in range(200))
+
+
+def test_dropped_duplicates_leave_no_empty_folders(tmp_path):
+    input_dir, output_dir = tmp_path / "downloads", tmp_path / "cleaned"
+    for author, source in (("Auteur", "gutenberg"), ("Dup", "wikisource")):
+        (input_dir / author / source).mkdir(parents=True)
+        (input_dir / author / source / "Titre.txt").write_text(TEXT, encoding="utf-8")
+
+    assert process_directory(str(input_dir), str(output_dir), dedup="gutenberg") == {}
+    assert (output_dir / "Auteur" / "gutenberg" / "Titre.txt").is_file()
+    assert not (output_dir / "Dup").exists()
@@ -0,0 +1,69 @@
+import csv
+import tracemalloc
+
+from bibliothecaire.cleaner import quality
+from bibliothecaire.cleaner.dedup import corpus_documents
+
+TEXT = "Il était une fois, dans la maison de la rue, une femme et un homme qui lisaient des livres. " * 40
+
+
+def _corpus(tmp_path):
+    folder = tmp_path / "corpus"
+    (folder / "Auteur" / "gutenberg").mkdir(parents=True)
+    (folder / "Auteur" / "gutenberg" / "Conte.txt").write_text(TEXT, encoding="utf-8")
+    (folder / "Auteur" / "gutenberg" / "Court.txt").write_text("Trop court, l'été.", encoding="utf-8")
+    return folder
+
+
+def _rows(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _no_tally(paths):
+    raise AssertionError(f"features of unchanged files were computed again: {paths}")
+
+
+def test_unchanged_files_reuse_the_table_across_runs(tmp_path, monkeypatch):
+    documents = corpus_documents(str(_corpus(tmp_path)))
+    table = tmp_path / "quality_stats.csv"
+    verdicts = quality.assess(documents, table_path=str(table))
+    first = _rows(table)
+    assert [row["bytes"] for row in first] == [str(len(TEXT.encode("utf-8"))), str(len("Trop court, l'été.".encode("utf-8")))]
+
+    monkeypatch.setattr(quality, "_file_stats", _no_tally)
+    # Twice: the table written from reused features must be reusable in turn.
+    for _ in range(2):
+        assert quality.assess(documents, table_path=str(table)) == verdicts
+        assert _rows(table) == first
+
+
+def test_counts_written_as_floats_by_older_tables_are_read(tmp_path, monkeypatch):
+    documents = corpus_documents(str(_corpus(tmp_path)))
+    table = tmp_path / "quality_stats.csv"
+    verdicts = quality.assess(documents, table_path=str(table))
+    rows = _rows(table)
+    with open(table, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "bytes": f"{row['bytes']}.0", "chars": f"{row['chars']}.0"})
+
+    monkeypatch.setattr(quality, "_file_stats", _no_tally)
+    assert quality.assess(documents, table_path=str(table)) == verdicts
+    assert _rows(table) == rows
+
+
+def test_large_files_are_tallied_block_by_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(quality, "BLOCK_SIZE", 1 << 16)
+    path = tmp_path / "long.txt"
+    path.write_text(TEXT * 500, encoding="utf-8")
+    tracemalloc.start()
+    try:
+        [stats, same] = quality._file_stats([str(path), str(path)])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < path.stat().st_size / 8
+    assert stats == same
+    assert stats["bytes"] == path.stat().st_size and stats["chars"] == len(TEXT * 500)
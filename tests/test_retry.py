@@ -0,0 +1,23 @@
+import asyncio
+
+from bibliothecaire.downloaders import GutenbergDownloader
+
+URL = "https://www.gutenberg.org/ebooks/1"
+
+
+def _never_called():
+    raise AssertionError("no attempt should be made")
+
+
+def test_no_retries_makes_no_attempt(tmp_path):
+    downloader = GutenbergDownloader(str(tmp_path), retries=0)
+    assert downloader._retry(URL, _never_called) is None
+    assert asyncio.run(downloader._aretry(URL, _never_called)) is None
+
+
+def test_last_attempt_gives_up(tmp_path):
+    attempts = []
+    downloader = GutenbergDownloader(str(tmp_path), retries=2)
+    downloader._backoff = lambda url, attempt, error: 0.0
+    assert downloader._retry(URL, lambda: attempts.append(1)) is None
+    assert len(attempts) == 2
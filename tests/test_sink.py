@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from bibliothecaire.cleaner import sink
+
+TEXT = "Il était une fois une maison.\n\nLa nuit tombait sur le jardin.\n" * 50
+
+
+def test_worker_killed_while_writing_leaves_the_earlier_output(tmp_path, monkeypatch):
+    output_file = tmp_path / "cleaned" / "Auteur" / "wikisource" / "Titre.txt"
+    output_file.parent.mkdir(parents=True)
+    output_file.write_text("earlier output", encoding="utf-8")
+
+    def killed(*args):
+        raise SystemExit("worker killed")
+
+    # The worker dies once the new text is written, before it is moved into place.
+    monkeypatch.setattr(os, "replace", killed)
+    with pytest.raises(SystemExit):
+        sink._clean_saved((str(tmp_path / "Titre.txt"), TEXT, str(output_file), None, None))
+    monkeypatch.undo()
+
+    assert output_file.read_text(encoding="utf-8") == "earlier output"
+    assert os.listdir(output_file.parent) == ["Titre.txt"]
+    assert sink._clean_saved((str(tmp_path / "Titre.txt"), TEXT, str(output_file), None, None)) == (None, False)
+    assert output_file.read_text(encoding="utf-8").startswith("Il était une fois une maison.")
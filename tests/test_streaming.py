@@ -0,0 +1,77 @@
+"""`stream_file` must write exactly what `process_file` returns, wherever its chunks are cut.
+
+fixtures/streaming/boundaries.txt alternates short plain paragraphs, each one a place where a chunk may end,
+with what a cut must not split: numeral lines, quotes spanning several lines, illustrations and footnotes
+running over blank lines, footnote numbers, spaced dashes, headings and ornaments, between beginning and
+ending markers. Small chunk sizes put a cut next to almost every one of them.
+"""
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from bibliothecaire.cleaner.clean_up import process_file, stream_file
+from bibliothecaire.cleaner.streaming import StreamingCleaner
+
+FIXTURES = Path(__file__).parent / "fixtures"
+INPUTS = [FIXTURES / "streaming" / "boundaries.txt"] + sorted((FIXTURES / "cleaning").glob("*.txt"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 64, 300, 1000, 1 << 20])
+@pytest.mark.parametrize("fixture", INPUTS, ids=[path.stem for path in INPUTS])
+def test_stream_file_matches_process_file(fixture, chunk_size, tmp_path):
+    output = tmp_path / "streamed.txt"
+    stream_file(str(fixture), str(output), chunk_size=chunk_size)
+    assert output.read_text(encoding="utf-8") == process_file(str(fixture))
+
+
+def _one_paragraph_per_line(tmp_path):
+    """The boundaries fixture without blank lines, as the Wikisource downloader saves texts."""
+    text = (FIXTURES / "streaming" / "boundaries.txt").read_text(encoding="utf-8")
+    path = tmp_path / "paragraphs.txt"
+    path.write_text("\n".join(line for line in text.split("\n") if line.strip()), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("blank_lines", [True, False], ids=["blank_lines", "one_paragraph_per_line"])
+def test_every_cut_of_the_boundaries_fixture(blank_lines, tmp_path):
+    fixture = FIXTURES / "streaming" / "boundaries.txt" if blank_lines else _one_paragraph_per_line(tmp_path)
+    expected = process_file(str(fixture))
+    output = tmp_path / "streamed.txt"
+    # Sizes a few characters apart move each cut to the next paragraph break, one after the other.
+    for chunk_size in range(1, 2000, 17):
+        stream_file(str(fixture), str(output), chunk_size=chunk_size)
+        assert output.read_text(encoding="utf-8") == expected, f"chunk_size={chunk_size}"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 64, 300, 1000])
+def test_text_without_blank_lines_is_cut_into_chunks(chunk_size, tmp_path, monkeypatch):
+    fixture = _one_paragraph_per_line(tmp_path)
+    chunks = []
+    cut = StreamingCleaner._chunks
+
+    def counted(self, pieces):
+        for chunk in cut(self, pieces):
+            chunks.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(StreamingCleaner, "_chunks", counted)
+    output = tmp_path / "streamed.txt"
+    stream_file(str(fixture), str(output), chunk_size=chunk_size)
+    assert output.read_text(encoding="utf-8") == process_file(str(fixture))
+    assert len(chunks) > 10
+
+
+def test_memory_stays_bounded_without_blank_lines(tmp_path):
+    paragraphs = [f"Le jardin {i} de la maison est grand, et la nuit y tombe tard." for i in range(40_000)]
+    fixture = tmp_path / "paragraphs.txt"
+    fixture.write_text("\n".join(paragraphs), encoding="utf-8")
+    output = tmp_path / "streamed.txt"
+    tracemalloc.start()
+    try:
+        stream_file(str(fixture), str(output), chunk_size=1 << 14)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < fixture.stat().st_size / 4
+    assert output.read_text(encoding="utf-8") == process_file(str(fixture))
@@ -0,0 +1,93 @@
+"""The Wikisource API mode against recorded MediaWiki API responses.
+
+fixtures/wikisource holds recorded `action=query` exchanges (`formatversion=2`): `subpages.json` for a work
+with 60 chapter subpages, listed by `list=allpages` in two continued batches and read in two
+`prop=revisions` batches, and `transclusion.json` for a work transcluding scanned `Page:` pages through a
+`<pages>` tag whose index is written with underscores, so the API normalizes the requested titles.
+fixtures/wikisource/expected holds the text each work converts to.
+"""
+import asyncio
+import json
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from bibliothecaire.downloaders import WikisourceDownloader
+from bibliothecaire.downloaders.wikisource_downloader import API_BATCH
+from bibliothecaire.downloaders.wikitext import wikitext_to_text
+
+FIXTURES = Path(__file__).parent / "fixtures" / "wikisource"
+
+
+def _recordings(name: str) -> list:
+    with open(FIXTURES / f"{name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _expected(name: str) -> str:
+    with open(FIXTURES / "expected" / f"{name}.txt", "r", encoding="utf-8", newline="") as f:
+        return f.read().rstrip("\n")
+
+
+def _api_requests(log) -> list:
+    return [{name: values[0] for name, values in parse_qs(urlsplit(path).query).items()} for _, path in log]
+
+
+def _api_text(base_url: str, title: str, engine: str):
+    downloader = WikisourceDownloader("downloads", use_api=True, retries=1, enable_delay=False)
+    downloader.base_url = base_url
+    steps = downloader._api_text(f"{base_url}/wiki/{title}")
+    if engine == "sync":
+        return downloader._drive(steps)
+    return asyncio.run(downloader._adrive(steps))
+
+
+@pytest.mark.parametrize("engine", ["sync", "async"])
+def test_subpages_are_listed_and_read_in_batches(fixture_server, engine):
+    log = []
+    base_url = fixture_server(recordings=_recordings("subpages"), log=log)
+    assert _api_text(base_url, "Histoire_de_ma_vie", engine) == _expected("subpages")
+
+    requests = _api_requests(log)
+    listings = [request for request in requests if request.get("list") == "allpages"]
+    assert len(listings) == 2 and listings[1]["apcontinue"] == "Histoire_de_ma_vie/Chapitre_46"
+    batches = [request["titles"].split("|") for request in requests if "titles" in request]
+    assert [len(batch) for batch in batches] == [API_BATCH, 61 - API_BATCH]
+    # The work page comes first, then its subpages in natural order, whatever order the API listed them in.
+    assert batches[0][:3] == ["Histoire de ma vie", "Histoire de ma vie/Chapitre 1", "Histoire de ma vie/Chapitre 2"]
+    assert batches[1][-1] == "Histoire de ma vie/Chapitre 60"
+
+
+@pytest.mark.parametrize("engine", ["sync", "async"])
+def test_pages_tag_transcludes_the_scanned_pages(fixture_server, engine):
+    log = []
+    base_url = fixture_server(recordings=_recordings("transclusion"), log=log)
+    assert _api_text(base_url, "Le_Horla", engine) == _expected("transclusion")
+
+    # from=3 to=5 exclude=4 include=7, requested under the index name of the tag.
+    scans = _api_requests(log)[-1]["titles"].split("|")
+    index = "Page:Maupassant_-_Le_Horla,_Ollendorff,_1908.djvu"
+    assert scans == [f"{index}/3", f"{index}/5", f"{index}/7"]
+
+
+def test_unrecorded_request_fails_the_work(fixture_server):
+    base_url = fixture_server(recordings=_recordings("transclusion"))
+    assert _api_text(base_url, "Une_autre_œuvre", "sync") is None
+
+
+@pytest.mark.parametrize("name", ["subpages", "transclusion"])
+def test_wikitext_to_text_on_recorded_wikitext(name):
+    wikitexts = {}
+    for exchange in _recordings(name):
+        aliases = {item["to"]: item["from"] for item in exchange["response"]["query"].get("normalized", [])}
+        for page in exchange["response"]["query"].get("pages", []):
+            content = page["revisions"][0]["slots"]["main"]["content"]
+            wikitexts[aliases.get(page["title"], page["title"])] = content
+
+    pages = {title: text for title, text in wikitexts.items() if title.startswith("Page:")}
+    works = [title for title in wikitexts if not title.startswith("Page:")]
+    works.sort(key=lambda title: (title.count("/"), int(title.rpartition(" ")[2]) if "/" in title else 0))
+    texts = [wikitext_to_text(wikitexts[title], pages) for title in works]
+    assert "\n".join(text for text in texts if text) == _expected(name)
+    assert "{{" not in "".join(texts) and "<ref" not in "".join(texts) and "[[" not in "".join(texts)